@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+""" Per-iteration timing and solver counters of the estimation loop.
+
+An Instrumentation records, for each optimizer iteration, the wall time of the phases of the
+iteration (parameter screening, forward solve, adjoint solve, gradient assembly, parameter
+update, I/O) and the statistics of the adaptive solvers (LSODA, IDA): number of steps, model
+and jacobian evaluations and error test failures. Phases nest, and the time of a phase
+excludes the time of its nested phases, so the phase times of an iteration add up to its wall
+time. Each iteration is appended as a JSON line to the metrics file, if given, and the totals
+are aggregated for the run summary.
+"""
+import contextlib
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+PHASES = ["screen", "forward", "adjoint", "gradient", "update", "io"]
+
+
+class Instrumentation(object):
+    """ Timings and solver statistics of the iterations of one estimation.
+
+    Args:
+        filename: str
+            If given, JSON lines file the iteration records are appended to.
+        name: str
+            Name of the estimation, written to each record.
+    """
+
+    def __init__(self, filename: Optional[str] = None, name: str = "vocal_fold"):
+        self.filename = filename
+        self.name = name
+        self.num_iterations = 0
+        self.time = defaultdict(float)  # phase -> total time, s
+        self.stats = defaultdict(lambda: defaultdict(int))  # phase -> counter -> total
+        self._stack = []  # time of the nested phases of the open phases
+        self._record = self._new_record()
+        if filename is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+
+    @staticmethod
+    def _new_record() -> Dict:
+        return {"time": defaultdict(float), "stats": defaultdict(lambda: defaultdict(int))}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """ Time a phase of the current iteration, excluding its nested phases. """
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._record["time"][name] += elapsed - self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def count(self, phase: str, stats: Dict):
+        """ Add solver statistics, e.g. of ode_solver or DAESession.solve, to a phase of the
+        current iteration.
+        """
+        for key, value in stats.items():
+            self._record["stats"][phase][key] += int(value)
+
+    def end_iteration(self, **fields):
+        """ Close the record of the current iteration, with extra fields, e.g. the residual,
+        append it to the metrics file and add it to the totals.
+        """
+        record = self._record
+        for phase, elapsed in record["time"].items():
+            self.time[phase] += elapsed
+        for phase, stats in record["stats"].items():
+            for key, value in stats.items():
+                self.stats[phase][key] += value
+        if self.filename is not None:
+            line = dict(name=self.name, **fields)
+            line["time"] = dict(record["time"])
+            line["stats"] = {phase: dict(stats) for phase, stats in record["stats"].items()}
+            with open(self.filename, "a") as f:  # appended per iteration, survives crashes
+                f.write(json.dumps(line) + "\n")
+        self.num_iterations += 1
+        self._record = self._new_record()
+
+    def summary(self) -> Dict:
+        """ Totals over the iterations.
+
+        Returns:
+            summary: Dict
+                num_iterations, time (phase -> total s) and stats (phase -> counter -> total).
+        """
+        return dict(
+            num_iterations=self.num_iterations,
+            time=dict(self.time),
+            stats={phase: dict(stats) for phase, stats in self.stats.items()},
+        )
+
+
+def summarize_metrics(filenames: List[str]) -> Dict:
+    """ Aggregate the JSON lines files of Instrumentation, e.g. of all files of a run.
+
+    Args:
+        filenames: List[str]
+            Metrics files. Glob patterns are expanded.
+
+    Returns:
+        summary: Dict
+            num_iterations, time (phase -> total s) and stats (phase -> counter -> total).
+    """
+    num_iterations = 0
+    total_time = defaultdict(float)
+    total_stats = defaultdict(lambda: defaultdict(int))
+    for pattern in filenames:
+        for filename in sorted(glob.glob(pattern)):
+            with open(filename) as f:
+                for line in f:
+                    record = json.loads(line)
+                    num_iterations += 1
+                    for phase, elapsed in record["time"].items():
+                        total_time[phase] += elapsed
+                    for phase, stats in record["stats"].items():
+                        for key, value in stats.items():
+                            total_stats[phase][key] += value
+    return dict(
+        num_iterations=num_iterations,
+        time=dict(total_time),
+        stats={phase: dict(stats) for phase, stats in total_stats.items()},
+    )
+
+
+def log_summary(summary: Dict, logger: logging.Logger, title: str = "Timing"):
+    """ Log a summary of summarize_metrics or Instrumentation.summary: time per phase, total,
+    share and mean per iteration, and the solver statistics.
+    """
+    num_iterations = max(summary["num_iterations"], 1)
+    total = sum(summary["time"].values())
+    phases = [p for p in PHASES if p in summary["time"]]
+    phases += sorted(p for p in summary["time"] if p not in PHASES)
+    logger.info(
+        f"{title}: {summary['num_iterations']:d} iterations, {total:.2f} s "
+        f"({1e3 * total / num_iterations:.1f} ms/iteration)"
+    )
+    for phase in phases:
+        elapsed = summary["time"][phase]
+        stats = summary["stats"].get(phase, {})
+        logger.info(
+            f"    {phase:10s}{elapsed:10.2f} s{100 * elapsed / max(total, 1e-12):7.1f} %"
+            f"{1e3 * elapsed / num_iterations:10.2f} ms/iteration"
+            + "".join(f"   {key} = {value:d}" for key, value in sorted(stats.items()))
+        )
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+""" Multi-start estimation of one file with early cancellation of the losing starts.
+
+K estimators start from independent random initial parameters and are advanced concurrently
+in rounds of check_interval iterations. After each round, starts whose best L2 residual trails
+the leader by more than the relative cancel_margin are stopped, so the compute goes to the
+promising basins. With decimation, the residuals are only compared between the starts at the
+same resolution, and a start is never cancelled before its first successful solve at its
+current resolution (e.g. right after its promotion to the full rate). The best result over the
+starts is returned.
+"""
+import logging
+import logging.config
+import multiprocessing
+import os
+import zlib
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from PhonationModeling.estimation.vocal_fold_estimator import (
+    EstimationResult,
+    EstimatorOptions,
+    VocalFoldEstimator,
+    discard_checkpoint,
+)
+
+
+class MultiStartOptions(NamedTuple):
+    """ Options of the multi-start estimation.
+
+    Attributes:
+        num_starts: int
+            Number of initializations. 1: single start.
+        check_interval: int
+            Number of iterations of each start between the residual comparisons.
+        cancel_margin: float
+            A start is cancelled if its best residual > (1 + cancel_margin) * leader's.
+    """
+
+    num_starts: int = 1
+    check_interval: int = 20
+    cancel_margin: float = 0.1
+
+    @classmethod
+    def from_configs(cls, configs: Dict, **kwargs) -> "MultiStartOptions":
+        """ Options from the keys of a configure dict, overridden by kwargs. """
+        options = {key: configs[key] for key in cls._fields if key in configs}
+        options.update(kwargs)
+        return cls(**options)
+
+
+def start_rng(name: str, start: int, seed: int = 0) -> np.random.RandomState:
+    """ Random state of a start, seeded by the experiment seed, the CRC32 of the file name and
+    the start index.
+    """
+    return np.random.RandomState([seed, zlib.crc32(name.encode("utf-8")), start])
+
+
+class Progress(NamedTuple):
+    """ Progress of an estimator after a number of iterations.
+
+    Attributes:
+        Rk_best: float
+            Best L2 residual at the current resolution.
+        done: bool
+            Whether the estimator is done.
+        iteration: int
+            Optimizer iteration.
+        decimation: int
+            Decimation of the current resolution.
+        solved: bool
+            Whether a solve succeeded at the current resolution, i.e. Rk_best is a residual.
+    """
+
+    Rk_best: float
+    done: bool
+    iteration: int
+    decimation: int
+    solved: bool
+
+
+def _advance(estimator: VocalFoldEstimator, num_iterations: int) -> Progress:
+    """ Run up to num_iterations iterations. """
+    for _ in range(num_iterations):
+        if estimator.done:
+            break
+        estimator.step()
+    return Progress(
+        estimator.Rk_best,
+        estimator.done,
+        estimator.iteration,
+        estimator.decimation,
+        estimator.best is not None,
+    )
+
+
+def _finish(estimator: VocalFoldEstimator) -> Optional[EstimationResult]:
+    try:
+        return estimator.result() if estimator.has_result else None
+    finally:
+        estimator.close()
+
+
+class LocalRunner(object):
+    """ Estimator advanced in this process: submit(n) iterations, collect() the progress, stop()
+    for the result.
+    """
+
+    def __init__(self, estimator_kwargs: Dict):
+        self.estimator = VocalFoldEstimator(**estimator_kwargs)
+        self._num_iterations = 0
+
+    def submit(self, num_iterations: int):
+        self._num_iterations = num_iterations
+
+    def collect(self) -> Progress:
+        return _advance(self.estimator, self._num_iterations)
+
+    def stop(self) -> Optional[EstimationResult]:
+        return _finish(self.estimator)
+
+
+def _runner_worker(conn, estimator_kwargs: Dict, log_configs: Optional[Dict]):
+    """ Process of a ProcessRunner: advance on ("step", n), return the result on ("stop",). """
+    from PhonationModeling.estimation.parallel import worker_log_configs
+
+    if log_configs is not None:
+        logging.config.dictConfig(worker_log_configs(log_configs, str(os.getpid())))
+    estimator = VocalFoldEstimator(**estimator_kwargs)
+    while True:
+        command = conn.recv()
+        if command[0] == "step":
+            conn.send(_advance(estimator, command[1]))
+        else:
+            conn.send(_finish(estimator))
+            break
+    conn.close()
+
+
+class ProcessRunner(object):
+    """ Estimator advanced in a child process, with the interface of LocalRunner. """
+
+    def __init__(self, estimator_kwargs: Dict, log_configs: Optional[Dict]):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_runner_worker, args=(child_conn, estimator_kwargs, log_configs), daemon=True
+        )
+        self.process.start()
+
+    def submit(self, num_iterations: int):
+        self.conn.send(("step", num_iterations))
+
+    def collect(self) -> Progress:
+        return self.conn.recv()
+
+    def stop(self) -> Optional[EstimationResult]:
+        self.conn.send(("stop",))
+        result = self.conn.recv()
+        self.process.join()
+        return result
+
+
+def estimate_multistart(
+    glottal_flow: np.ndarray,
+    sample_rate: int,
+    options: EstimatorOptions = EstimatorOptions(),
+    multistart_options: MultiStartOptions = MultiStartOptions(),
+    init_params: Optional[List[List[float]]] = None,
+    seed: int = 0,
+    jobs: int = 1,
+    log_configs: Optional[Dict] = None,
+    logger: Optional[logging.Logger] = None,
+    name: str = "vocal_fold",
+) -> EstimationResult:
+    """ Estimate the vocal fold model parameters of a glottal flow from multiple starts.
+
+    Args:
+        glottal_flow: np.ndarray[float], shape (T,)
+            Target glottal flow, normalized.
+        sample_rate: int
+            Sample rate.
+        options: EstimatorOptions
+            Estimator options of every start.
+        multistart_options: MultiStartOptions
+            Multi-start options.
+        init_params: List[List[float]]
+            Initial parameters [alpha, beta, delta] of each start, None for random (see
+            VocalFoldEstimator). Default: all random.
+        seed: int
+            Experiment seed.
+        jobs: int
+            1: advance the starts in this process, else in one child process per start.
+        log_configs: Dict
+            Logging dict config of the child processes.
+        logger: logging.Logger
+            Logger.
+        name: str
+            Name of the estimation.
+
+    Returns:
+        result: EstimationResult
+            Best result over the starts.
+    """
+    logger = logger if logger is not None else logging.getLogger(__name__)
+    num_starts = multistart_options.num_starts
+    starts = dict()
+    for k in range(num_starts):
+        logger.info(f"{name}: start {k:d}")
+        estimator_kwargs = dict(
+            glottal_flow=glottal_flow,
+            sample_rate=sample_rate,
+            options=options,
+            init_params=None if init_params is None else init_params[k],
+            rng=start_rng(name, k, seed),
+            logger=logger,
+            name=f"{name}.{k:d}",
+        )
+        if jobs > 1:
+            starts[k] = ProcessRunner(estimator_kwargs, log_configs)
+        else:
+            starts[k] = LocalRunner(estimator_kwargs)
+
+    results = dict()
+    active = list(starts)
+    rounds = 0
+    try:
+        while active:
+            for k in active:  # advance concurrently
+                starts[k].submit(multistart_options.check_interval)
+            progress = {k: starts[k].collect() for k in active}
+            rounds += 1
+
+            resolutions = defaultdict(list)  # decimation -> solved starts, compared together
+            for k in active:
+                if progress[k].solved:
+                    resolutions[progress[k].decimation].append(k)
+            thresholds = dict()
+            for decimation, compared in sorted(resolutions.items()):
+                leader = min(compared, key=lambda k: progress[k].Rk_best)
+                thresholds[decimation] = (
+                    (1 + multistart_options.cancel_margin) * progress[leader].Rk_best
+                )
+                logger.info(
+                    f"{name}: round {rounds:d}"
+                    + (f" x{decimation:d}" if decimation > 1 else "")
+                    + f" | leader {leader:d}: L2 Residual = {progress[leader].Rk_best:.4f} | "
+                    + "   ".join(f"{k:d}: {progress[k].Rk_best:.4f}" for k in compared)
+                )
+            for k in list(active):
+                Rk, done = progress[k].Rk_best, progress[k].done
+                threshold = thresholds.get(progress[k].decimation, np.inf)
+                if done or (progress[k].solved and Rk > threshold):
+                    if not done:
+                        logger.info(
+                            f"{name}: cancel start {k:d}: L2 Residual = {Rk:.4f} > "
+                            f"{threshold:.4f}"
+                        )
+                    results[k] = starts[k].stop()
+                    active.remove(k)
+    finally:
+        for k in active:  # stop the remaining starts on error
+            try:
+                starts[k].stop()
+            except Exception:  # e.g. a dead child process, not masking the error
+                pass
+
+    results = {k: result for k, result in results.items() if result is not None}
+    if not results:
+        raise RuntimeError(f"{name}: no successful start")
+    best = min(results, key=lambda k: results[k].Rk)
+    for k in range(num_starts):  # the starts checkpoint separately, resumed until all finish
+        discard_checkpoint(options, f"{name}.{k:d}")
+    logger.info(
+        f"{name}: BEST start {best:d} of {num_starts:d} after {rounds:d} rounds: "
+        f"L2 Residual = {results[best].Rk:.4f}"
+    )
+    return results[best]
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+""" Parallel estimation over a list of files with a process pool.
+
+Files are independent, so each is estimated by one worker process. The initial parameters of
+a file are drawn from its own random state, seeded by the experiment seed and the CRC32 of the
+file name, so the results do not depend on the number of workers or on the completion order.
+Each worker logs to its own file, named after the configured log file and the worker pid, and
+the results are merged in the order of the file list. With multiple starts per file, the
+starts run in child processes if the files are estimated serially, else in the file's worker.
+With a surrogate table, the starts are initialized at the nearest table entries to the file's
+glottal flow instead of randomly. With a results store, each result is stored as soon as its
+file is finished, and on resume the files already in the store are skipped.
+"""
+import copy
+import logging
+import logging.config
+import os
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.estimation.multistart import MultiStartOptions, estimate_multistart
+from PhonationModeling.estimation.results_store import ResultsStore
+from PhonationModeling.estimation.surrogate import SurrogateTable
+from PhonationModeling.estimation.vocal_fold_estimator import (
+    EstimationResult,
+    EstimatorOptions,
+    estimate_parameters,
+)
+
+if TYPE_CHECKING:
+    from PhonationModeling.estimation.scheduler import SchedulerOptions
+
+
+def file_rng(name: str, seed: int = 0) -> np.random.RandomState:
+    """ Random state of a file, seeded by the experiment seed and the CRC32 of the file name. """
+    return np.random.RandomState([seed, zlib.crc32(name.encode("utf-8"))])
+
+
+def worker_log_configs(log_configs: Dict, worker_id: str) -> Dict:
+    """ Copy of a logging dict config with the handler files suffixed by the worker id,
+    e.g. run.log -> run.worker-<id>.log.
+    """
+    log_configs = copy.deepcopy(log_configs)
+    for handler in log_configs.get("handlers", {}).values():
+        if "filename" in handler:
+            root, ext = os.path.splitext(handler["filename"])
+            handler["filename"] = f"{root}.worker-{worker_id}{ext}"
+    return log_configs
+
+
+def surrogate_init_params(
+    surrogate: Optional[SurrogateTable],
+    glottal_flow: np.ndarray,
+    sample_rate: int,
+    num_starts: int,
+    name: str,
+    logger: logging.Logger,
+) -> Optional[List]:
+    """ Initial parameters of the starts of a file from a surrogate table, padded with None
+    (random) if the table has fewer entries. None if no table or the flow is not periodic.
+    """
+    if surrogate is None:
+        return None
+    seeds = surrogate.query(glottal_flow, sample_rate, k=num_starts)
+    if not seeds:
+        logger.warning(f"{name}: not periodic, random initial parameters")
+        return None
+    logger.info(
+        f"{name}: surrogate initial parameters "
+        + "   ".join("(" + ", ".join(f"{p:.4f}" for p in params) + ")" for params in seeds)
+    )
+    return seeds + [None] * (num_starts - len(seeds))
+
+
+# State of a pool worker, set once per process by _init_worker
+_worker_logger: Optional[logging.Logger] = None
+_worker_surrogate: Optional[SurrogateTable] = None
+
+
+def _init_worker(
+    log_configs: Optional[Dict], logger_name: str, surrogate: Optional[SurrogateTable]
+):
+    global _worker_logger, _worker_surrogate
+    if log_configs is not None:
+        logging.config.dictConfig(worker_log_configs(log_configs, str(os.getpid())))
+    _worker_logger = logging.getLogger(logger_name)
+    _worker_surrogate = surrogate
+
+
+def _estimate_worker_file(
+    load_data: Callable[[str], Tuple[np.ndarray, int]],
+    name: str,
+    options: EstimatorOptions,
+    seed: int,
+    multistart_options: MultiStartOptions,
+) -> Optional[EstimationResult]:
+    """ _estimate_file in a pool worker, with the worker's logger and surrogate table. """
+    return _estimate_file(
+        load_data,
+        name,
+        options,
+        seed,
+        _worker_logger,
+        multistart_options=multistart_options,
+        surrogate=_worker_surrogate,
+    )
+
+
+def _estimate_file(
+    load_data: Callable[[str], Tuple[np.ndarray, int]],
+    name: str,
+    options: EstimatorOptions,
+    seed: int,
+    logger: logging.Logger,
+    multistart_options: MultiStartOptions = MultiStartOptions(),
+    start_jobs: int = 1,
+    log_configs: Optional[Dict] = None,
+    surrogate: Optional[SurrogateTable] = None,
+) -> Optional[EstimationResult]:
+    """ Load and estimate one file. Returns None if the file is skipped. """
+    try:
+        glottal_flow, sample_rate = load_data(name)
+        init_params = surrogate_init_params(
+            surrogate, glottal_flow, sample_rate, multistart_options.num_starts, name, logger
+        )
+        if multistart_options.num_starts > 1:
+            return estimate_multistart(
+                glottal_flow,
+                sample_rate,
+                options=options,
+                multistart_options=multistart_options,
+                init_params=init_params,
+                seed=seed,
+                jobs=start_jobs,
+                log_configs=log_configs,
+                logger=logger,
+                name=os.path.basename(name),
+            )
+        return estimate_parameters(
+            glottal_flow,
+            sample_rate,
+            options=options,
+            init_params=None if init_params is None else init_params[0],
+            rng=file_rng(name, seed),
+            logger=logger,
+            name=os.path.basename(name),
+        )
+    except Exception as e:  # e.g. an unreadable file, skipped without stopping the others
+        logger.error(f"{name}: {type(e).__name__}: {e}")
+        logger.warning("Skip")
+        return None
+
+
+def estimate_files(
+    load_data: Callable[[str], Tuple[np.ndarray, int]],
+    names: List[str],
+    options: EstimatorOptions = EstimatorOptions(),
+    multistart_options: MultiStartOptions = MultiStartOptions(),
+    jobs: int = 1,
+    seed: int = 0,
+    log_configs: Optional[Dict] = None,
+    logger: Optional[logging.Logger] = None,
+    surrogate: Optional[SurrogateTable] = None,
+    store: Optional[ResultsStore] = None,
+    scheduler_options: Optional["SchedulerOptions"] = None,
+    resume: bool = False,
+) -> Dict[str, EstimationResult]:
+    """ Estimate the vocal fold model parameters of a list of files.
+
+    Args:
+        load_data: Callable[[str], Tuple[np.ndarray, int]]
+            Loader of a file name to the normalized glottal flow and the sample rate.
+            Must be picklable (module level) if jobs > 1.
+        names: List[str]
+            File names.
+        options: EstimatorOptions
+            Estimator options.
+        multistart_options: MultiStartOptions
+            Multi-start options of each file.
+        jobs: int
+            Number of worker processes. 1: estimate in this process.
+        seed: int
+            Experiment seed.
+        log_configs: Dict
+            Logging dict config of the workers, whose handler files are suffixed by the
+            worker pid.
+        logger: logging.Logger
+            Logger.
+        surrogate: SurrogateTable
+            If given, surrogate table of the initial parameters.
+        store: ResultsStore
+            If given, store of the results, written per file.
+        scheduler_options: SchedulerOptions
+            If given with a budget > 0, the files share a corpus budget, see scheduler.
+        resume: bool
+            Whether to skip the files already in the store.
+
+    Returns:
+        results: Dict[str, EstimationResult]
+            Best results of the estimated and stored files, in the order of names.
+    """
+    logger = logger if logger is not None else logging.getLogger(__name__)
+    results = dict()
+    todo = names
+    if store is not None and resume:
+        results.update(store.results(names))
+        todo = [name for name in names if name not in results]
+        if results:
+            logger.info(f"Resume: {len(results):d} files already stored, {len(todo):d} to go")
+
+    def finish(name: str, result: Optional[EstimationResult]):
+        results[name] = result
+        if store is not None and result is not None:
+            store.save(name, result)
+
+    if scheduler_options is not None and scheduler_options.budget > 0:
+        from PhonationModeling.estimation.scheduler import estimate_scheduled
+
+        assert multistart_options.num_starts == 1, "Budget scheduling runs a single start"
+        estimate_scheduled(
+            load_data,
+            todo,
+            options,
+            scheduler_options,
+            jobs=jobs,
+            seed=seed,
+            log_configs=log_configs,
+            logger=logger,
+            surrogate=surrogate,
+            on_result=finish,
+        )
+    elif jobs <= 1:
+        for name in todo:
+            finish(
+                name,
+                _estimate_file(
+                    load_data,
+                    name,
+                    options,
+                    seed,
+                    logger,
+                    multistart_options=multistart_options,
+                    start_jobs=multistart_options.num_starts,  # one child process per start
+                    log_configs=log_configs,
+                    surrogate=surrogate,
+                ),
+            )
+    else:
+        logger.info(f"Estimating {len(todo):d} files with {jobs:d} workers")
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(log_configs, logger.name, surrogate),  # once per worker, not per file
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _estimate_worker_file, load_data, name, options, seed, multistart_options
+                ): name
+                for name in todo
+            }
+            for k, future in enumerate(as_completed(futures)):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # e.g. a worker killed or an unpicklable result
+                    logger.error(f"{name}: {type(e).__name__}: {e}")
+                    logger.warning("Skip")
+                    result = None
+                finish(name, result)
+                logger.info(f"[{k + 1:d}/{len(todo):d}] Finished {name}")
+
+    # Ordered merge
+    return OrderedDict(
+        (name, results[name]) for name in names if results.get(name) is not None
+    )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+""" Crash-safe, columnar store of the estimation results.
+
+The store directory holds a small scalar table, scalars.npz, with one row per file: file name,
+configuration hash, alpha, beta, delta, Rk and iteration, and the per-file arrays R, sol and
+u0 as .npy files under arrays/<configuration hash>/. The arrays are read lazily by memory
+mapping, so summaries read only the scalar table.
+
+Each file's result is stored as soon as the file is estimated: the arrays first, then the
+scalar table, each written to a temporary file and atomically renamed, so a crash leaves the
+table of the previous files. A resumed run skips the files whose rows match its configuration
+hash; a run that is not resumed writes to a new store directory.
+"""
+import datetime
+import hashlib
+import itertools
+import json
+import logging
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult
+
+# Options that do not affect the results, excluded from the configuration hash
+UNHASHED_FIELDS = ("trajectory_dir", "checkpoint_dir", "checkpoint_interval", "metrics_dir")
+
+SCALARS_FILE = "scalars.npz"
+SCALAR_FIELDS = ("name", "config_hash", "alpha", "beta", "delta", "Rk", "iteration")
+ARRAY_FIELDS = ("R", "sol", "u0")
+
+
+def config_hash(*options: NamedTuple, **extra: Any) -> str:
+    """ Hash of the estimation configuration: options tuples and extra keys, e.g. the seed.
+
+    Returns:
+        hash: str
+            Hex digest.
+    """
+    config = [
+        {key: value for key, value in o._asdict().items() if key not in UNHASHED_FIELDS}
+        for o in options
+    ]
+    config.append(extra)
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def atomic_write(filename: str, write: Callable[[IO[bytes]], None]):
+    """ Write a binary file by write(f) to a temporary file in the target directory, fsync it
+    and atomically rename it to filename.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=".tmp.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, filename)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
+def atomic_pickle(obj: Any, filename: str):
+    """ Atomically pickle an object to filename. """
+    atomic_write(filename, lambda f: pickle.dump(obj, f))
+
+
+def load_pickle(filename: str) -> Optional[Any]:
+    """ Unpickle a file. Returns None if it does not exist or is unreadable. """
+    try:
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _non_empty(directory: str) -> bool:
+    return os.path.isdir(directory) and bool(os.listdir(directory))
+
+
+def load_scalars(directory: str) -> Dict[str, np.ndarray]:
+    """ Scalar table of a store, without reading the arrays.
+
+    Args:
+        directory: str
+            Store directory.
+
+    Returns:
+        scalars: Dict[str, np.ndarray], keys SCALAR_FIELDS
+            Columns of the scalar table, one row per file. Empty columns if no file is stored.
+    """
+    filename = os.path.join(directory, SCALARS_FILE)
+    if not os.path.isfile(filename):
+        return {
+            key: np.array([], dtype=str if key in ("name", "config_hash") else float)
+            for key in SCALAR_FIELDS
+        }
+    with np.load(filename) as data:
+        return {key: data[key] for key in SCALAR_FIELDS}
+
+
+class ResultsStore(object):
+    """ Directory of the scalar table and the per-file arrays of the results.
+
+    Args:
+        directory: str
+            Store directory, created if needed.
+        config_hash: str
+            Hash of the estimation configuration, see config_hash.
+        logger: logging.Logger
+            Logger.
+    """
+
+    def __init__(
+        self, directory: str, config_hash: str, logger: Optional[logging.Logger] = None
+    ):
+        self.directory = directory
+        self.config_hash = config_hash
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.array_dir = os.path.join(directory, "arrays", config_hash[:12])
+        os.makedirs(self.array_dir, exist_ok=True)
+        scalars = load_scalars(directory)
+        self._rows = OrderedDict(  # file -> row of the scalar table
+            (name, {key: scalars[key][i].item() for key in SCALAR_FIELDS})
+            for i, name in enumerate(scalars["name"])
+        )
+
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        config_hash: str,
+        resume: bool = False,
+        logger: Optional[logging.Logger] = None,
+    ) -> "ResultsStore":
+        """ Open a store to resume, or a new store. A new store does not reuse a non-empty
+        directory, but is suffixed by the date, as the scripts' result files, and by a counter
+        if the dated directory is not empty either.
+        """
+        logger = logger if logger is not None else logging.getLogger(__name__)
+        if not resume and _non_empty(directory):
+            logger.warning(f"folder {directory} already exists")
+            dated = directory + f".{datetime.datetime.now().date()}"
+            directory = dated
+            for k in itertools.count(1):
+                if not _non_empty(directory):
+                    break
+                directory = f"{dated}.{k:d}"
+        return cls(directory, config_hash, logger=logger)
+
+    @property
+    def checkpoint_dir(self) -> str:
+        """ Directory of the estimator checkpoints, created if needed. """
+        checkpoint_dir = os.path.join(self.directory, "checkpoints")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        return checkpoint_dir
+
+    def _array_file(self, name: str, key: str) -> str:
+        return os.path.join(self.array_dir, f"{quote(name, safe='')}.{key}.npy")
+
+    def __contains__(self, name: str) -> bool:
+        row = self._rows.get(name)
+        return row is not None and row["config_hash"] == self.config_hash
+
+    def load(self, name: str, mmap_mode: Optional[str] = "r") -> Optional["EstimationResult"]:
+        """ Result of a file, None if absent or of another configuration.
+
+        Args:
+            name: str
+                File name.
+            mmap_mode: str
+                Memory mapping mode of the arrays, see np.load. None: read into memory.
+
+        Returns:
+            result: EstimationResult
+        """
+        from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult
+
+        if name not in self:
+            return None
+        row = self._rows[name]
+        arrays = {
+            key: np.load(self._array_file(name, key), mmap_mode=mmap_mode) for key in ARRAY_FIELDS
+        }
+        return EstimationResult(
+            iteration=row["iteration"],
+            Rk=row["Rk"],
+            alpha=row["alpha"],
+            beta=row["beta"],
+            delta=row["delta"],
+            **arrays,
+        )
+
+    def save(self, name: str, result: "EstimationResult"):
+        """ Atomically write the arrays of a file, then its row of the scalar table. """
+        for key in ARRAY_FIELDS:
+            array = np.asarray(getattr(result, key))
+            atomic_write(self._array_file(name, key), lambda f: np.save(f, array))
+
+        self._rows.pop(name, None)  # the table is in save order
+        self._rows[name] = dict(
+            name=name,
+            config_hash=self.config_hash,
+            alpha=float(result.alpha),
+            beta=float(result.beta),
+            delta=float(result.delta),
+            Rk=float(result.Rk),
+            iteration=int(result.iteration),
+        )
+        rows = list(self._rows.values())
+        scalars = {key: np.array([row[key] for row in rows]) for key in SCALAR_FIELDS}
+        atomic_write(
+            os.path.join(self.directory, SCALARS_FILE), lambda f: np.savez(f, **scalars)
+        )
+        self.logger.info(f"Stored {name} to {self.directory}")
+
+    def results(self, names: List[str]) -> Dict[str, "EstimationResult"]:
+        """ Stored results of the configuration, in the order of names, with memory mapped
+        arrays.
+        """
+        return OrderedDict((name, self.load(name)) for name in names if name in self)
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+""" Corpus-wide budget scheduler of the file estimations.
+
+Instead of running every file until its patience is exhausted, the estimators of the files
+are advanced in slices of slice_iterations iterations, and each file is granted an initial
+budget, in iterations or seconds. A priority queue over the corpus serves first the files
+within their own budget, then the files whose budget is spent but which are still improving,
+from a shared pool of the budget left over by the files that finished early. Within each
+tier the file with the highest recent improvement rate (relative residual improvement per
+budget unit over its last slice) is served first. A file stops when its estimator is done,
+when its relative improvement at the full rate has stayed below flat_rtol for flat_slices
+slices, or when its budget is spent and the pool is exhausted. A file stopped in the coarse
+phase of decimation, or before its first full rate solve, returns its best coarse result
+interpolated to the full rate.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.estimation.multistart import LocalRunner, ProcessRunner, Progress
+from PhonationModeling.estimation.parallel import file_rng, surrogate_init_params
+from PhonationModeling.estimation.surrogate import SurrogateTable
+from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult, EstimatorOptions
+
+BUDGET_UNITS = ["iterations", "seconds"]
+
+
+class SchedulerOptions(NamedTuple):
+    """ Options of the budget scheduler.
+
+    Attributes:
+        budget: float
+            Initial budget of each file, in budget_unit. 0: no scheduling, every file runs
+            until its patience is exhausted.
+        budget_unit: str
+            Unit of the budget, iterations or seconds (wall time of the slices).
+        slice_iterations: int
+            Number of iterations of a file per scheduling decision.
+        flat_rtol: float
+            A slice is flat if the best residual improved by less than flat_rtol (relative).
+        flat_slices: int
+            Number of consecutive flat slices after which a file is stopped.
+        max_active: int
+            Maximum number of files whose estimators are alive at once.
+    """
+
+    budget: float = 0
+    budget_unit: str = "iterations"
+    slice_iterations: int = 20
+    flat_rtol: float = 1e-3
+    flat_slices: int = 3
+    max_active: int = 16
+
+    @classmethod
+    def from_configs(cls, configs: Dict, **kwargs) -> "SchedulerOptions":
+        """ Options from the keys of a configure dict, overridden by kwargs. """
+        options = {key: configs[key] for key in cls._fields if key in configs}
+        options.update(kwargs)
+        return cls(**options)
+
+
+class _FileState(object):
+    """ Scheduling state of a started file. """
+
+    def __init__(self, name: str, runner, budget: float):
+        self.name = name
+        self.runner = runner
+        self.budget = budget  # remaining own budget
+        self.spent = 0.0
+        self.progress = None  # last Progress
+        self.rate = math.inf  # relative improvement per budget unit over the last slice
+        self.flat = 0  # number of consecutive flat slices
+        self.reserve = 0.0  # budget reserved for the running slice
+        self.from_pool = False  # whether the running slice is funded by the pool
+        self.start_time = 0.0
+
+
+def estimate_scheduled(
+    load_data: Callable[[str], Tuple[np.ndarray, int]],
+    names: List[str],
+    options: EstimatorOptions = EstimatorOptions(),
+    scheduler_options: SchedulerOptions = SchedulerOptions(budget=100),
+    jobs: int = 1,
+    seed: int = 0,
+    log_configs: Optional[Dict] = None,
+    logger: Optional[logging.Logger] = None,
+    surrogate: Optional[SurrogateTable] = None,
+    on_result: Optional[Callable[[str, Optional[EstimationResult]], None]] = None,
+) -> Dict[str, EstimationResult]:
+    """ Estimate the vocal fold model parameters of a list of files under a corpus budget.
+
+    Args:
+        load_data: Callable[[str], Tuple[np.ndarray, int]]
+            Loader of a file name to the normalized glottal flow and the sample rate.
+        names: List[str]
+            File names.
+        options: EstimatorOptions
+            Estimator options.
+        scheduler_options: SchedulerOptions
+            Scheduler options, with budget > 0.
+        jobs: int
+            Number of slices run concurrently, each file's estimator in a child process.
+            1: all estimators in this process.
+        seed: int
+            Experiment seed.
+        log_configs: Dict
+            Logging dict config of the child processes.
+        logger: logging.Logger
+            Logger.
+        surrogate: SurrogateTable
+            If given, surrogate table of the initial parameters.
+        on_result: Callable[[str, Optional[EstimationResult]], None]
+            If given, called with each file's result (None if skipped) as soon as it stops.
+
+    Returns:
+        results: Dict[str, EstimationResult]
+            Best results of the estimated files, in the order of names.
+    """
+    logger = logger if logger is not None else logging.getLogger(__name__)
+    sched = scheduler_options
+    assert sched.budget > 0, "Budget scheduling needs a budget > 0"
+    assert sched.budget_unit in BUDGET_UNITS, f"Unknown budget unit: {sched.budget_unit}"
+    seconds = sched.budget_unit == "seconds"
+    max_active = max(sched.max_active, jobs)
+    logger.info(
+        f"Scheduling {len(names):d} files: budget = {sched.budget:g} {sched.budget_unit} "
+        f"per file, {jobs:d} concurrent slices"
+    )
+
+    results = dict()
+    pending = deque(names)  # files not started
+    queue = []  # heap of (tier, -rate, seq, name); tier 0: own budget left, 1: pool
+    seq = itertools.count()
+    active = dict()  # name -> _FileState, started and not stopped
+    running = dict()  # name -> _FileState, with a slice in progress
+    pool = 0.0  # budget left over by the files that stopped early
+
+    def start(name: str) -> Optional[_FileState]:
+        try:
+            glottal_flow, sample_rate = load_data(name)
+            init_params = surrogate_init_params(
+                surrogate, glottal_flow, sample_rate, 1, name, logger
+            )
+            estimator_kwargs = dict(
+                glottal_flow=glottal_flow,
+                sample_rate=sample_rate,
+                options=options,
+                init_params=None if init_params is None else init_params[0],
+                rng=file_rng(name, seed),
+                logger=logger,
+                name=os.path.basename(name),  # of the metrics and checkpoints, as in parallel
+            )
+            if jobs > 1:
+                runner = ProcessRunner(estimator_kwargs, log_configs)
+            else:
+                runner = LocalRunner(estimator_kwargs)
+        except Exception as e:  # e.g. an unreadable file, skipped without stopping the others
+            logger.error(f"{name}: {type(e).__name__}: {e}")
+            logger.warning("Skip")
+            finish_result(name, None)
+            return None
+        state = _FileState(name, runner, sched.budget)
+        active[name] = state
+        return state
+
+    def finish_result(name: str, result: Optional[EstimationResult]):
+        results[name] = result
+        if on_result is not None:
+            on_result(name, result)
+
+    def stop(state: _FileState, reason: str):
+        nonlocal pool
+        del active[state.name]
+        pool += max(state.budget, 0.0)  # leftover budget
+        logger.info(
+            f"{state.name}: STOP ({reason}) after {state.spent:.4g} {sched.budget_unit}: "
+            f"L2 Residual = {state.progress.Rk_best if state.progress else math.inf:.4f} | "
+            f"pool = {pool:.4g}"
+        )
+        try:
+            finish_result(state.name, state.runner.stop())
+        except Exception as e:
+            logger.error(f"{state.name}: {type(e).__name__}: {e}")
+            logger.warning("Skip")
+            finish_result(state.name, None)
+
+    def fail(state: _FileState, error: Exception):
+        """ Skip a file whose slice failed, e.g. on an estimator error or a dead child process,
+        without stopping the others.
+        """
+        nonlocal pool
+        del running[state.name]
+        del active[state.name]
+        pool += max(state.budget, 0.0) + (state.reserve if state.from_pool else 0.0)
+        logger.error(f"{state.name}: {type(error).__name__}: {error}")
+        logger.warning("Skip")
+        try:  # release the estimator, the result is discarded
+            state.runner.stop()
+        except Exception:
+            pass
+        finish_result(state.name, None)
+
+    def push(state: _FileState):
+        tier = 0 if state.budget > 0 else 1
+        heapq.heappush(queue, (tier, -state.rate, next(seq), state.name))
+
+    def submit(state: _FileState, from_pool: bool):
+        nonlocal pool
+        num_iterations = sched.slice_iterations
+        if from_pool:  # reserve the expected cost of the slice from the pool
+            expected = state.spent / max(state.progress.iteration, 1) * num_iterations
+            if not seconds:
+                num_iterations = max(1, min(num_iterations, int(pool)))
+                expected = num_iterations
+            state.reserve = min(expected, pool)
+            pool -= state.reserve
+        elif not seconds:
+            num_iterations = max(1, min(num_iterations, int(math.ceil(state.budget))))
+        state.from_pool = from_pool
+        state.start_time = time.perf_counter()
+        state.runner.submit(num_iterations)
+        running[state.name] = state
+
+    def next_slice() -> bool:
+        """ Submit the next slice by priority. Returns False if nothing can be submitted. """
+        while True:
+            if pending and (not queue or queue[0][0] == 1) and len(active) < max_active:
+                state = start(pending.popleft())
+                if state is not None:
+                    submit(state, from_pool=False)
+                    return True
+                continue
+            if not queue:
+                return False
+            tier, _, _, name = queue[0]
+            if tier == 1 and pending and len(active) >= max_active:
+                heapq.heappop(queue)  # make room for a file not started
+                stop(active[name], "budget spent")
+                continue
+            if tier == 1 and pool <= 0:
+                if running:  # the running slices may return budget to the pool
+                    return False
+                heapq.heappop(queue)
+                stop(active[name], "budget spent")
+                continue
+            heapq.heappop(queue)
+            submit(active[name], from_pool=tier == 1)
+            return True
+
+    def collect(state: _FileState, progress: Progress):
+        nonlocal pool
+        del running[state.name]
+        elapsed = time.perf_counter() - state.start_time
+        last = state.progress
+        done_iterations = progress.iteration - (last.iteration if last else 0)
+        cost = elapsed if seconds else float(done_iterations)
+        state.spent += cost
+        if state.from_pool:
+            pool += state.reserve - cost
+        else:
+            state.budget -= cost
+        state.progress = progress
+        if progress.done:
+            stop(state, "converged")
+            return
+
+        if last is None or last.decimation != progress.decimation:  # new resolution
+            state.rate, state.flat = math.inf, 0
+        else:
+            improvement = (last.Rk_best - progress.Rk_best) / last.Rk_best
+            state.rate = improvement / max(cost, 1e-12)
+            flat = improvement < sched.flat_rtol and progress.decimation == 1
+            state.flat = state.flat + 1 if flat else 0  # a stalled coarse phase is promoted
+        logger.info(
+            f"{state.name}: slice of {done_iterations:d} iterations: L2 Residual = "
+            f"{progress.Rk_best:.4f} | rate = {state.rate:.4g} | budget = {state.budget:.4g} | "
+            f"pool = {pool:.4g}"
+        )
+        if state.flat >= sched.flat_slices:
+            stop(state, "flattened")
+            return
+        push(state)
+
+    try:
+        while True:
+            while len(running) < jobs and next_slice():
+                pass
+            if not running:
+                break
+            if jobs > 1:  # first finished slice
+                conns = {state.runner.conn: state for state in running.values()}
+                state = conns[wait(list(conns))[0]]
+            else:
+                state = next(iter(running.values()))
+            try:
+                progress = state.runner.collect()
+            except Exception as e:
+                fail(state, e)
+                continue
+            collect(state, progress)
+    finally:
+        for state in list(active.values()):  # stop the remaining files on error
+            try:
+                state.runner.stop()
+            except Exception:
+                pass
+
+    return OrderedDict(
+        (name, results[name]) for name in names if results.get(name) is not None
+    )
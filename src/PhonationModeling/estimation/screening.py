@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+""" Screening of the vocal fold model parameters before the full forward solve.
+
+A candidate (alpha, beta, delta) is classified as decaying (to the rest state), oscillating or
+diverging over the duration of the glottal flow, in model time. First from the eigenvalues of
+the model jacobian at the rest state: the amplitude of the linearized model grows by
+exp(max Re(lambda) * duration), so a clearly stable rest state decays, and a clearly unstable
+complex pair grows into the limit cycle bounded by the nonlinear damping. The other candidates,
+near marginal stability or with an unstable real eigenvalue (relaxation oscillation or negative
+stiffness), are pre-integrated on a coarse grid for a few periods with the compiled RK4 kernel,
+and classified by the growth rate of their amplitude envelope, extrapolated to the duration, or
+as diverging if they still blow up with refined steps (the coarse steps may be unstable for
+stiff relaxation oscillations). Only oscillating candidates can reproduce a voiced glottal flow.
+"""
+from typing import List, NamedTuple
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.jit_kernels import vdp_rk4_jit
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_init_state,
+    vdp_jacobian_batch,
+)
+
+CLASSES = ["decaying", "oscillating", "diverging"]
+
+
+class ScreeningOptions(NamedTuple):
+    """ Options of the parameter screening.
+
+    Attributes:
+        decay_ratio: float
+            Amplitude ratio over the duration below which a candidate is decaying; its
+            inverse is the growth ratio above which an unstable complex pair is oscillating.
+        num_periods: float
+            Duration of the pre-integration, in periods of the uncoupled linear oscillator.
+        steps_per_period: int
+            Number of RK4 steps per period of the pre-integration.
+        max_amplitude: float
+            Bound of the absolute model states of the pre-integration, beyond which a
+            candidate is diverging.
+        refine_substeps: int
+            Number of RK4 substeps per step of the re-integration of the candidates that blow
+            up at the coarse steps, over as many fewer periods, at the cost of the coarse pass.
+    """
+
+    decay_ratio: float = 0.01
+    num_periods: float = 10.0
+    steps_per_period: int = 32
+    max_amplitude: float = 1e3
+    refine_substeps: int = 8
+
+
+def origin_eigenvalues(model_params: np.ndarray) -> np.ndarray:
+    """ Eigenvalues of the model jacobian at the rest state.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta].
+
+    Returns:
+        eigenvalues: np.ndarray[complex], shape (N, 4)
+            Eigenvalues, in model time.
+    """
+    model_params = np.atleast_2d(np.asarray(model_params, dtype=float))
+    J = vdp_jacobian_batch(0.0, np.zeros((len(model_params), 4)), *model_params.T)
+    return np.linalg.eigvals(J)
+
+
+def envelope_growth(
+    model_params: np.ndarray, options: ScreeningOptions, num_substeps: int = 1
+) -> np.ndarray:
+    """ Growth rate of the amplitude envelope of a coarse pre-integration from the initial
+    state, in model time.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta].
+        options: ScreeningOptions
+            Screening options.
+        num_substeps: int
+            Number of RK4 substeps per step, over num_periods / num_substeps periods.
+
+    Returns:
+        growth: np.ndarray[float], shape (N,)
+            Log amplitude growth per unit of model time, from the first to the last period.
+            inf if the states blow up beyond max_amplitude or turn NaN/Inf.
+    """
+    model_params = np.atleast_2d(np.asarray(model_params, dtype=float))
+    steps = options.steps_per_period * num_substeps
+    num_periods = max(int(np.ceil(options.num_periods / num_substeps)), 2)
+    h = 2 * np.pi / steps  # the linear oscillators have unit angular frequency
+    init_state = np.array(vdp_init_state)
+    envelope = np.empty((len(model_params), num_periods))
+    with np.errstate(over="ignore", invalid="ignore"):
+        for n, (alpha, beta, delta) in enumerate(model_params):
+            sol = vdp_rk4_jit(init_state, h, num_periods * steps, alpha, beta, delta)
+            amplitude = np.maximum(np.abs(sol[:, 0]), np.abs(sol[:, 2]))
+            envelope[n] = amplitude.reshape(num_periods, steps).max(axis=1)
+        growth = np.log(envelope[:, -1] / envelope[:, 0]) / ((num_periods - 1) * 2 * np.pi)
+    blown_up = ~(envelope.max(axis=1) < options.max_amplitude)  # also NaN
+    growth[blown_up] = np.inf
+    if np.any(blown_up) and num_substeps < options.refine_substeps:
+        growth[blown_up] = envelope_growth(
+            model_params[blown_up], options, num_substeps=options.refine_substeps
+        )
+    return np.where(np.isnan(growth), -np.inf, growth)  # 0 / 0: at rest
+
+
+def screen(
+    model_params: np.ndarray, duration: float, options: ScreeningOptions = ScreeningOptions()
+) -> List[str]:
+    """ Classify candidate parameters as decaying, oscillating or diverging over a glottal
+    flow duration.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3) or (3,)
+            Model parameters [alpha, beta, delta].
+        duration: float
+            Duration of the glottal flow, s.
+        options: ScreeningOptions
+            Screening options.
+
+    Returns:
+        classes: List[str]
+            Class of each candidate, see CLASSES.
+    """
+    model_params = np.atleast_2d(np.asarray(model_params, dtype=float))
+    horizon = duration * B / (model_params[:, 1] * M)  # model time of the duration
+    log_ratio = -np.log(options.decay_ratio)  # > 0
+
+    # Linearization at the rest state
+    eigenvalues = origin_eigenvalues(model_params)
+    leading = eigenvalues[np.arange(len(eigenvalues)), np.argmax(eigenvalues.real, axis=1)]
+    growth = leading.real * horizon
+    classes = np.full(len(model_params), "", dtype=object)
+    classes[growth < -log_ratio] = "decaying"
+    complex_pair = np.abs(leading.imag) > 1e-12 * np.maximum(np.abs(leading.real), 1.0)
+    classes[(growth > log_ratio) & complex_pair] = "oscillating"
+
+    # Pre-integration of the marginal candidates
+    marginal = classes == ""
+    if np.any(marginal):
+        growth = envelope_growth(model_params[marginal], options) * horizon[marginal]
+        classes[marginal] = np.where(
+            np.isinf(growth) & (growth > 0),
+            "diverging",
+            np.where(growth < -log_ratio, "decaying", "oscillating"),
+        )
+    return list(classes)
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+""" Surrogate lookup table of the vocal fold displacement model for initializing the
+parameter estimation.
+
+Offline, the model is simulated over a dense (alpha, beta, delta) grid with the ensemble
+solver, and each oscillating glottal flow is summarized by a descriptor: its normalized mean
+cycle shape, log2 F0 and low order real cepstrum (spectral envelope), weighted and
+concatenated. The descriptors are indexed by a KD-tree, and at estimation time the parameters
+of the nearest descriptors to the observed glottal flow's serve as initial parameters.
+"""
+from fractions import Fraction
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from scipy import signal
+from scipy.spatial import cKDTree
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_coupled_batch,
+    vdp_init_state,
+    x0,
+)
+from PhonationModeling.solvers.ode_solvers.ensemble_solver import ensemble_ode_solver
+
+
+class DescriptorOptions(NamedTuple):
+    """ Options of the glottal flow descriptor.
+
+    Attributes:
+        cycle_length: int
+            Number of samples of the normalized mean cycle.
+        num_cepstra: int
+            Number of real cepstral coefficients, c[1], ..., c[num_cepstra].
+        f0_min: float
+            Lowest F0, Hz.
+        f0_max: float
+            Highest F0, Hz.
+        voicing_threshold: float
+            Minimum normalized autocorrelation at the F0 lag of a periodic flow.
+        shape_weight: float
+            Weight of the cycle shape.
+        f0_weight: float
+            Weight of log2 F0.
+        cepstrum_weight: float
+            Weight of the cepstrum.
+    """
+
+    cycle_length: int = 32
+    num_cepstra: int = 12
+    f0_min: float = 50.0
+    f0_max: float = 800.0
+    voicing_threshold: float = 0.3
+    shape_weight: float = 1.0
+    f0_weight: float = 1.0
+    cepstrum_weight: float = 0.5
+
+
+def estimate_f0(
+    flow: np.ndarray, sample_rate: float, options: DescriptorOptions
+) -> Optional[float]:
+    """ F0 from the autocorrelation peak, with parabolic interpolation of the lag.
+
+    Returns:
+        f0: float
+            F0, Hz. None if the flow is not periodic.
+    """
+    x = flow - np.mean(flow)
+    energy = np.dot(x, x)
+    if energy <= 0:
+        return None
+    n = len(x)
+    r = np.fft.irfft(np.abs(np.fft.rfft(x, 2 * n)) ** 2)[:n] / energy
+    lag_min = max(int(sample_rate / options.f0_max), 2)
+    lag_max = min(int(sample_rate / options.f0_min), n // 2)
+    if lag_max <= lag_min + 1:
+        return None
+    lag = lag_min + int(np.argmax(r[lag_min:lag_max]))
+    if r[lag] < options.voicing_threshold or lag in (lag_min, lag_max - 1):
+        return None
+    denom = r[lag - 1] - 2 * r[lag] + r[lag + 1]
+    shift = 0.5 * (r[lag - 1] - r[lag + 1]) / denom if denom != 0 else 0.0
+    return sample_rate / (lag + shift)
+
+
+def flow_descriptor(
+    flow: np.ndarray, sample_rate: float, options: DescriptorOptions = DescriptorOptions()
+) -> Optional[np.ndarray]:
+    """ Weighted descriptor [cycle shape, log2 F0, cepstrum] of a glottal flow.
+
+    Args:
+        flow: np.ndarray[float], shape (T,)
+            Glottal flow.
+        sample_rate: float
+            Sample rate.
+        options: DescriptorOptions
+            Descriptor options.
+
+    Returns:
+        descriptor: np.ndarray[float], shape (cycle_length + 1 + num_cepstra,)
+            Descriptor. None if the flow is not periodic.
+    """
+    f0 = estimate_f0(flow, sample_rate, options)
+    if f0 is None:
+        return None
+
+    # Mean cycle over the whole cycles, circularly aligned at its minimum
+    period = sample_rate / f0
+    num_cycles = int((len(flow) - 1) // period)
+    phase = np.arange(options.cycle_length) / float(options.cycle_length)
+    t = period * (np.arange(num_cycles)[:, None] + phase[None, :])
+    cycle = np.mean(np.interp(t, np.arange(len(flow)), flow), axis=0)
+    cycle = cycle - np.mean(cycle)
+    cycle_norm = np.linalg.norm(cycle)
+    if cycle_norm <= 0:
+        return None
+    cycle = np.roll(cycle / cycle_norm, -int(np.argmin(cycle)))
+
+    # Real cepstrum of the windowed flow
+    x = (flow - np.mean(flow)) * np.hanning(len(flow))
+    spectrum = np.abs(np.fft.rfft(x))
+    cepstrum = np.fft.irfft(np.log(spectrum + 1e-8 * np.max(spectrum)))
+    cepstrum = cepstrum[1 : options.num_cepstra + 1]
+
+    return np.concatenate(
+        [
+            options.shape_weight * cycle,
+            [options.f0_weight * np.log2(f0)],
+            options.cepstrum_weight * cepstrum,
+        ]
+    )
+
+
+def simulate_flows(
+    model_params: np.ndarray,
+    sample_rate: float,
+    num_tsteps: int,
+    num_substeps: int = 2,
+    dtype: type = np.float32,
+) -> np.ndarray:
+    """ Unnormalized glottal flows x_r + x_l + 2 * x0 of the displacement model for a batch of
+    parameters, on the sample grid.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta].
+        sample_rate: float
+            Sample rate.
+        num_tsteps: int
+            Number of samples.
+        num_substeps: int
+            Number of RK4 steps per sample.
+        dtype: type
+            Data type of the trajectories.
+
+    Returns:
+        flows: np.ndarray[float], shape (N, num_tsteps)
+            Glottal flows.
+    """
+    model_params = np.atleast_2d(model_params)
+    time_scaling = B / (model_params[:, 1] * M)  # t -> s
+    sol = ensemble_ode_solver(
+        vdp_coupled_batch,
+        None,
+        model_params,
+        np.tile(vdp_init_state, (len(model_params), 1)),
+        0.0,
+        time_scaling / float(sample_rate),  # dt -> ds
+        num_tsteps,
+        method="rk4",  # ros2 is not accurate enough for the seeds
+        num_substeps=num_substeps,
+        dtype=dtype,
+    )
+    return sol[:, :, 0] + sol[:, :, 2] + 2 * x0
+
+
+class SurrogateTable(object):
+    """ KD-tree indexed table of glottal flow descriptors of the displacement model.
+
+    Args:
+        params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta] of the entries.
+        descriptors: np.ndarray[float], shape (N, D)
+            Glottal flow descriptors of the entries.
+        sample_rate: float
+            Sample rate of the simulated flows.
+        options: DescriptorOptions
+            Descriptor options.
+    """
+
+    def __init__(
+        self,
+        params: np.ndarray,
+        descriptors: np.ndarray,
+        sample_rate: float,
+        options: DescriptorOptions = DescriptorOptions(),
+    ):
+        self.params = params
+        self.descriptors = descriptors
+        self.sample_rate = sample_rate
+        self.options = options
+        self.tree = cKDTree(descriptors)
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+    @classmethod
+    def build(
+        cls,
+        alphas: np.ndarray,
+        betas: np.ndarray,
+        deltas: np.ndarray,
+        sample_rate: float,
+        duration: float,
+        transient: float = 0.5,
+        options: DescriptorOptions = DescriptorOptions(),
+        batch_size: int = 1024,
+        num_substeps: int = 2,
+    ) -> "SurrogateTable":
+        """ Simulate the displacement model over the parameter grid and tabulate the
+        descriptors of the oscillating flows.
+
+        Args:
+            alphas, betas, deltas: np.ndarray[float]
+                Grid values of the parameters.
+            sample_rate: float
+                Sample rate.
+            duration: float
+                Simulated duration, s.
+            transient: float
+                Fraction of the duration discarded as onset transient.
+            options: DescriptorOptions
+                Descriptor options.
+            batch_size: int
+                Number of systems integrated together.
+            num_substeps: int
+                Number of RK4 steps per sample.
+
+        Returns:
+            table: SurrogateTable
+        """
+        grid = np.stack(np.meshgrid(alphas, betas, deltas, indexing="ij"), axis=-1)
+        grid = grid.reshape(-1, 3)
+        num_tsteps = int(duration * sample_rate)
+        onset = int(transient * num_tsteps)
+
+        params, descriptors = [], []
+        for start in range(0, len(grid), batch_size):
+            batch = grid[start : start + batch_size]
+            with np.errstate(over="ignore", invalid="ignore"):
+                flows = simulate_flows(batch, sample_rate, num_tsteps, num_substeps)
+            for p, flow in zip(batch, flows):
+                flow = flow[onset:].astype(float)
+                if not np.all(np.isfinite(flow)):  # diverged
+                    continue
+                descriptor = flow_descriptor(flow, sample_rate, options)
+                if descriptor is not None:
+                    params.append(p)
+                    descriptors.append(descriptor)
+        assert params, "No oscillating flow in the parameter grid"
+        return cls(np.array(params), np.array(descriptors), sample_rate, options)
+
+    def query(self, glottal_flow: np.ndarray, sample_rate: float, k: int = 1) -> List[np.ndarray]:
+        """ Parameters of the nearest entries to a glottal flow.
+
+        Args:
+            glottal_flow: np.ndarray[float], shape (T,)
+                Observed glottal flow.
+            sample_rate: float
+                Sample rate of the glottal flow, resampled to the table's if different.
+            k: int
+                Number of entries.
+
+        Returns:
+            params: List[np.ndarray[float]]
+                Model parameters [alpha, beta, delta] of up to k entries, nearest first.
+                Empty if the glottal flow is not periodic.
+        """
+        if sample_rate != self.sample_rate:
+            ratio = Fraction(self.sample_rate / float(sample_rate)).limit_denominator(1000)
+            glottal_flow = signal.resample_poly(glottal_flow, ratio.numerator, ratio.denominator)
+        descriptor = flow_descriptor(glottal_flow, self.sample_rate, self.options)
+        if descriptor is None:
+            return []
+        k = min(k, len(self))
+        _, index = self.tree.query(descriptor, k=k)
+        return [self.params[i] for i in np.atleast_1d(index)]
+
+    def save(self, filename: str):
+        """ Save the table to a .npz file. """
+        np.savez(
+            filename,
+            params=self.params,
+            descriptors=self.descriptors,
+            sample_rate=self.sample_rate,
+            **{f"options.{key}": value for key, value in self.options._asdict().items()},
+        )
+
+    @classmethod
+    def load(cls, filename: str) -> "SurrogateTable":
+        """ Load a table saved by save; the KD-tree is rebuilt. """
+        with np.load(filename) as data:
+            options = DescriptorOptions(
+                **{
+                    key: type(default)(data[f"options.{key}"])
+                    for key, default in DescriptorOptions()._asdict().items()
+                }
+            )
+            return cls(data["params"], data["descriptors"], float(data["sample_rate"]), options)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+""" Cancellation of the multi-start rounds across the promotion of decimated starts. """
+import numpy as np
+import pytest
+
+from PhonationModeling.estimation import multistart
+from PhonationModeling.estimation.multistart import (
+    MultiStartOptions,
+    Progress,
+    estimate_multistart,
+)
+from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult, EstimatorOptions
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import rk4_solver
+
+UNSOLVED = 1e16  # Rk_best of a resolution without a successful solve
+
+# Progress of each start per round: (Rk_best, done, decimation, solved)
+SCRIPTS = {
+    0: [
+        (0.5, False, 4, True),
+        (UNSOLVED, False, 1, False),  # promoted, not compared to the coarse starts
+        (0.2, False, 1, True),
+        (0.19, True, 1, True),
+    ],
+    1: [
+        (0.52, False, 4, True),  # within the margin of start 0
+        (0.51, False, 4, True),  # leader of the coarse starts
+        (UNSOLVED, False, 1, False),  # promoted, never cancelled before its first solve
+        (0.3, False, 1, True),  # > 1.1 * 0.19
+        (0.25, False, 1, True),
+    ],
+    2: [(0.9, False, 4, True)],  # > 1.1 * 0.5
+}
+
+
+class ScriptedRunner(object):
+    """ LocalRunner replaying the progress of SCRIPTS. """
+
+    stopped = []
+
+    def __init__(self, estimator_kwargs):
+        self.start = int(estimator_kwargs["name"].rsplit(".", 1)[1])
+        self.rounds = 0
+        self.progress = None
+
+    def submit(self, num_iterations: int):
+        self.rounds += 1
+
+    def collect(self) -> Progress:
+        Rk, done, decimation, solved = SCRIPTS[self.start][self.rounds - 1]
+        self.progress = Progress(Rk, done, 10 * self.rounds, decimation, solved)
+        return self.progress
+
+    def stop(self) -> EstimationResult:
+        ScriptedRunner.stopped.append((self.start, self.rounds))
+        return EstimationResult(
+            iteration=self.progress.iteration,
+            R=np.zeros(1),
+            Rk=self.progress.Rk_best,
+            alpha=float(self.start),
+            beta=0.2,
+            delta=0.1,
+            sol=np.zeros((1, 5)),
+            u0=np.zeros(1),
+        )
+
+
+def test_cancel_across_promotion(monkeypatch):
+    monkeypatch.setattr(multistart, "LocalRunner", ScriptedRunner)
+    ScriptedRunner.stopped = []
+    result = estimate_multistart(
+        np.ones(10),
+        1000,
+        multistart_options=MultiStartOptions(num_starts=3, check_interval=1, cancel_margin=0.1),
+    )
+    # Start 2 is cancelled in the first round, start 1 only once it is solved at the full
+    # rate, start 0 finishes
+    assert ScriptedRunner.stopped == [(2, 1), (0, 4), (1, 4)]
+    assert result.alpha == 0.0 and result.Rk == 0.19
+
+
+def test_no_successful_start(monkeypatch):
+    monkeypatch.setattr(multistart, "LocalRunner", ScriptedRunner)
+    monkeypatch.setitem(SCRIPTS, 0, [(UNSOLVED, True, 1, False)])
+    monkeypatch.setattr(ScriptedRunner, "stop", lambda self: None)
+    with pytest.raises(RuntimeError):
+        estimate_multistart(np.ones(10), 1000, multistart_options=MultiStartOptions(num_starts=1))
+
+
+def test_multistart_decimation():
+    """ Decimated starts return a full rate result. """
+    sample_rate, beta = 8000, 0.25
+    sol = rk4_solver([0.5, beta, 0.7], [0, 0.1, 0, 0.1], 0, 200 / beta / sample_rate, 800)
+    glottal_flow = sol[:, 1] + sol[:, 3] + 0.2
+    glottal_flow /= np.linalg.norm(glottal_flow)
+    options = EstimatorOptions(
+        gradient_engine="discrete_adjoint",
+        decimation=4,
+        optim_patience=4,
+        coarse_max_iterations=4,
+        promote_window=2,
+    )
+    result = estimate_multistart(
+        glottal_flow,
+        sample_rate,
+        options=options,
+        multistart_options=MultiStartOptions(num_starts=3, check_interval=2),
+        seed=5,
+    )
+    assert len(result.R) == len(result.u0) == len(glottal_flow)
+    np.testing.assert_allclose(result.Rk, np.linalg.norm(result.R))
+
+
+def test_error_not_masked(monkeypatch):
+    """ The error of a start propagates, not that of stopping the others. """
+
+    def collect(self):
+        raise ValueError("step failed")
+
+    def stop(self):
+        raise BrokenPipeError("dead child process")
+
+    monkeypatch.setattr(multistart, "LocalRunner", ScriptedRunner)
+    monkeypatch.setattr(ScriptedRunner, "collect", collect)
+    monkeypatch.setattr(ScriptedRunner, "stop", stop)
+    with pytest.raises(ValueError):
+        estimate_multistart(np.ones(10), 1000, multistart_options=MultiStartOptions(num_starts=2))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+""" ResultsStore save/load round trip, new store directories and resumed estimate_files. """
+import datetime
+import os
+
+import numpy as np
+
+from PhonationModeling.estimation.multistart import MultiStartOptions
+from PhonationModeling.estimation.parallel import estimate_files
+from PhonationModeling.estimation.results_store import ResultsStore, config_hash, load_scalars
+from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult, EstimatorOptions
+
+OPTIONS = EstimatorOptions(gradient_engine="discrete_adjoint", optim_patience=2)
+LOADED = []  # names passed to load_data
+
+
+def load_data(name: str):
+    LOADED.append(name)
+    sample_rate = 2000
+    t = np.arange(300) / float(sample_rate)
+    flow = 1 + 0.5 * np.sin(2 * np.pi * (100 + 10 * len(name)) * t)
+    return flow / np.linalg.norm(flow), sample_rate
+
+
+def make_result(k: int) -> EstimationResult:
+    return EstimationResult(
+        iteration=k,
+        R=np.full(5, k, dtype=float),
+        Rk=0.1 * k,
+        alpha=0.5 + k,
+        beta=0.2,
+        delta=0.1 * k,
+        sol=np.arange(10.0).reshape(2, 5) * k,
+        u0=np.linspace(0, k, 5),
+    )
+
+
+def assert_same_result(result: EstimationResult, expected: EstimationResult):
+    for key in EstimationResult._fields:
+        np.testing.assert_array_equal(getattr(result, key), getattr(expected, key))
+
+
+def test_config_hash():
+    assert config_hash(OPTIONS, seed=0) == config_hash(OPTIONS, seed=0)
+    assert config_hash(OPTIONS, seed=0) != config_hash(OPTIONS, seed=1)
+    assert config_hash(OPTIONS) != config_hash(OPTIONS._replace(step_size=0.2))
+    assert config_hash(OPTIONS) == config_hash(OPTIONS._replace(metrics_dir="metrics"))
+
+
+def test_store_round_trip(tmp_path):
+    directory = str(tmp_path / "run.store")
+    store = ResultsStore(directory, "a" * 40)
+    for k, name in enumerate(["dir/x.wav", "y.wav", "z.wav"]):
+        store.save(name, make_result(k))
+    store.save("dir/x.wav", make_result(3))  # overwritten, moved to the end of the table
+
+    reopened = ResultsStore(directory, "a" * 40)
+    assert "dir/x.wav" in reopened and "w.wav" not in reopened
+    result = reopened.load("y.wav")
+    assert isinstance(result.u0, np.memmap)
+    assert_same_result(result, make_result(1))
+    assert_same_result(reopened.load("dir/x.wav", mmap_mode=None), make_result(3))
+    assert list(reopened.results(["z.wav", "w.wav", "y.wav"])) == ["z.wav", "y.wav"]
+
+    scalars = load_scalars(directory)
+    assert scalars["name"].tolist() == ["y.wav", "z.wav", "dir/x.wav"]
+    np.testing.assert_array_equal(scalars["Rk"], [0.1 * k for k in [1, 2, 3]])
+
+    other = ResultsStore(directory, "b" * 40)  # rows of another configuration
+    assert "y.wav" not in other and other.load("y.wav") is None
+
+
+def test_store_open(tmp_path):
+    directory = str(tmp_path / "run.store")
+    dated = directory + f".{datetime.datetime.now().date()}"
+    stores = []
+    for _ in range(3):
+        store = ResultsStore.open(directory, "a" * 40)
+        store.save("x.wav", make_result(1))
+        stores.append(store.directory)
+    assert stores == [directory, dated, dated + ".1"]  # non-empty directories are not reused
+
+    resumed = ResultsStore.open(directory, "a" * 40, resume=True)
+    assert resumed.directory == directory and "x.wav" in resumed
+
+    os.makedirs(str(tmp_path / "empty.store"))
+    assert ResultsStore.open(str(tmp_path / "empty.store"), "a" * 40).directory == str(
+        tmp_path / "empty.store"
+    )
+
+
+def test_estimate_files_resume(tmp_path):
+    directory = str(tmp_path / "run.store")
+    names = ["a.wav", "bb.wav"]
+    digest = config_hash(OPTIONS, MultiStartOptions(), seed=0)
+
+    store = ResultsStore.open(directory, digest)
+    del LOADED[:]
+    results = estimate_files(load_data, names[:1], options=OPTIONS, store=store)
+    assert list(results) == ["a.wav"] and LOADED == ["a.wav"]
+
+    # Resumed: a.wav is read from the store, only bb.wav is estimated
+    store = ResultsStore.open(directory, digest, resume=True)
+    del LOADED[:]
+    resumed = estimate_files(load_data, names, options=OPTIONS, store=store, resume=True)
+    assert list(resumed) == names and LOADED == ["bb.wav"]
+    assert_same_result(resumed["a.wav"], results["a.wav"])
+    assert load_scalars(directory)["name"].tolist() == names
+
+    # Not resumed: a new store, every file is estimated
+    store = ResultsStore.open(directory, digest)
+    del LOADED[:]
+    estimate_files(load_data, names, options=OPTIONS, store=store)
+    assert store.directory != directory and LOADED == names
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+""" Budget accounting of the corpus scheduler with scripted estimators. """
+import numpy as np
+
+from PhonationModeling.estimation import scheduler
+from PhonationModeling.estimation.multistart import Progress
+from PhonationModeling.estimation.scheduler import SchedulerOptions, estimate_scheduled
+from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult
+
+
+def load_data(name: str):
+    return np.ones(10), 1000
+
+
+class ScriptedRunner(object):
+    """ LocalRunner whose slices follow scripts[name]: (Rk_best, done, decimation) per slice,
+    the last entry repeated, or an exception raised by collect().
+    """
+
+    scripts = {}
+    slices = {}  # name -> submitted numbers of iterations
+
+    def __init__(self, estimator_kwargs):
+        self.name = estimator_kwargs["name"]
+        self.iteration = 0
+        self.progress = None
+        ScriptedRunner.slices[self.name] = []
+
+    def submit(self, num_iterations: int):
+        ScriptedRunner.slices[self.name].append(num_iterations)
+        self.iteration += num_iterations
+
+    def collect(self) -> Progress:
+        script = ScriptedRunner.scripts[self.name]
+        entry = script[min(len(ScriptedRunner.slices[self.name]), len(script)) - 1]
+        if isinstance(entry, Exception):
+            raise entry
+        Rk, done, decimation = entry
+        self.progress = Progress(Rk, done, self.iteration, decimation, True)
+        return self.progress
+
+    def stop(self) -> EstimationResult:
+        return EstimationResult(
+            iteration=self.iteration,
+            R=np.zeros(1),
+            Rk=self.progress.Rk_best,
+            alpha=0.5,
+            beta=0.2,
+            delta=0.1,
+            sol=np.zeros((1, 5)),
+            u0=np.zeros(1),
+        )
+
+
+def run(monkeypatch, scripts, scheduler_options, names):
+    monkeypatch.setattr(scheduler, "LocalRunner", ScriptedRunner)
+    ScriptedRunner.scripts = scripts
+    ScriptedRunner.slices = {}
+    finished = []
+    results = estimate_scheduled(
+        load_data,
+        names,
+        scheduler_options=scheduler_options,
+        on_result=lambda name, result: finished.append(name),
+    )
+    return results, finished
+
+
+def test_pool_budget(monkeypatch):
+    """ The budget left by a converged file funds the slices of an improving file. """
+    scripts = {
+        "a.wav": [(0.5, True, 1)],  # converges in its first slice
+        "b.wav": [(1.0 / k, False, 1) for k in range(1, 10)],  # always improving
+    }
+    options = SchedulerOptions(budget=10, slice_iterations=4)
+    results, finished = run(monkeypatch, scripts, options, ["dir/a.wav", "dir/b.wav"])
+    assert list(results) == ["dir/a.wav", "dir/b.wav"]
+    assert finished == ["dir/a.wav", "dir/b.wav"]
+    assert ScriptedRunner.slices["a.wav"] == [4]  # basenames
+    # own budget 10: slices 4, 4, 2, then the 6 iterations left by a.wav: 4, 2
+    assert ScriptedRunner.slices["b.wav"] == [4, 4, 2, 4, 2]
+    assert sum(sum(s) for s in ScriptedRunner.slices.values()) == 2 * options.budget
+
+
+def test_flat_slices_full_rate(monkeypatch):
+    """ Only full rate slices count as flat, a stalled coarse phase is not stopped. """
+    scripts = {
+        "c.wav": [(0.5, False, 4)] * 4  # flat at the coarse resolution
+        + [(0.4, False, 1), (0.3, False, 1)]
+        + [(0.3, False, 1)] * 10  # flat at the full rate
+    }
+    options = SchedulerOptions(budget=1000, slice_iterations=5, flat_slices=3)
+    results, finished = run(monkeypatch, scripts, options, ["c.wav"])
+    assert finished == ["c.wav"] and results["c.wav"].Rk == 0.3
+    assert len(ScriptedRunner.slices["c.wav"]) == 4 + 2 + 3
+
+
+def test_max_active(monkeypatch):
+    """ Files beyond max_active start once a budget-spent file makes room. """
+    scripts = {name: [(1.0 / k, False, 1) for k in range(1, 10)] for name in "pqr"}
+    options = SchedulerOptions(budget=5, slice_iterations=5, max_active=2)
+    results, finished = run(monkeypatch, scripts, options, list("pqr"))
+    assert list(results) == list("pqr") and sorted(finished) == list("pqr")
+    assert all(slices == [5] for slices in ScriptedRunner.slices.values())
+
+
+def test_failed_slice(monkeypatch):
+    """ A file whose slice fails is skipped, and its budget left funds the other files. """
+    scripts = {
+        "a.wav": [(0.5, False, 1), EOFError("dead child process")],
+        "b.wav": [(1.0 / k, False, 1) for k in range(1, 10)],
+    }
+    options = SchedulerOptions(budget=10, slice_iterations=4)
+    results, finished = run(monkeypatch, scripts, options, ["a.wav", "b.wav"])
+    assert list(results) == ["b.wav"] and sorted(finished) == ["a.wav", "b.wav"]
+    assert ScriptedRunner.slices["a.wav"] == [4, 4]
+    # own budget 10, then the 6 iterations left by a.wav, its failed slice uncounted: 4, 2
+    assert ScriptedRunner.slices["b.wav"] == [4, 4, 2, 4, 2]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+""" Screening classes against the amplitude of the full duration RK4 solution. """
+import numpy as np
+
+from PhonationModeling.estimation.screening import ScreeningOptions, envelope_growth, screen
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_init_state,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import rk4_solver
+
+DURATION = 0.1
+SAMPLE_RATE = 16000
+
+DECAYING = [[0.1, 0.6, 0.5], [0.1, 1.0, 0.5], [0.3, 1.5, 0.5]]  # stable rest state
+OSCILLATING = [[0.5, 0.6, 0.0], [0.8, 0.3, 0.5], [1.2, 1.0, 0.5]]  # unstable complex pair
+MARGINAL = [[0.3, 0.6, 0.0], [0.1, 0.1, 0.5]]  # Re(lambda) = 0, pre-integrated
+
+
+def amplitude_ratio(params) -> float:
+    """ Amplitude of the last tenth of the duration over the first tenth's. """
+    num_tsteps = int(DURATION * SAMPLE_RATE)
+    dt = B / (params[1] * M) / float(SAMPLE_RATE)  # time_scaling / fs
+    sol = rk4_solver(params, vdp_init_state, 0.0, dt, num_tsteps)
+    amplitude = np.maximum(np.abs(sol[:, 1]), np.abs(sol[:, 3]))
+    return amplitude[-num_tsteps // 10 :].max() / amplitude[: num_tsteps // 10].max()
+
+
+def test_screen_classes():
+    classes = screen(np.array(DECAYING + OSCILLATING + MARGINAL), DURATION)
+    assert classes == ["decaying"] * 3 + ["oscillating"] * 5
+    for params in DECAYING:
+        assert amplitude_ratio(params) < ScreeningOptions().decay_ratio
+    for params in OSCILLATING + MARGINAL:
+        assert amplitude_ratio(params) > 0.5
+
+
+def test_screen_single():
+    assert screen(np.array(DECAYING[0]), DURATION) == ["decaying"]
+
+
+def test_screen_duration():
+    """ A slow decay is not rejected over a short duration. """
+    assert screen(np.array(DECAYING[0]), DURATION / 100) == ["oscillating"]
+
+
+def test_envelope_growth():
+    options = ScreeningOptions()
+    growth = envelope_growth(np.array(DECAYING[:1] + OSCILLATING[:1] + MARGINAL[:1]), options)
+    assert growth[0] < 0 < growth[1]
+    assert abs(growth[2]) < abs(growth[0]) and abs(growth[2]) < growth[1]
+
+    # Blown up beyond max_amplitude, also with refined steps
+    options = options._replace(max_amplitude=1e-3)
+    assert np.isposinf(envelope_growth(np.array(OSCILLATING[:1]), options)[0])
+    assert screen(np.array(MARGINAL[:1]), DURATION, options) == ["diverging"]
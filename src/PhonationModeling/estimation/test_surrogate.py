@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+""" Surrogate table queries on flows of known parameters, and the table build script. """
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import PhonationModeling
+from PhonationModeling.estimation.surrogate import SurrogateTable, simulate_flows
+
+SAMPLE_RATE = 8000
+DURATION = 0.2
+GRIDS = [np.linspace(0.3, 1.2, 4), np.linspace(0.2, 0.6, 3), np.linspace(0.1, 0.9, 3)]
+
+
+@pytest.fixture(scope="module")
+def table() -> SurrogateTable:
+    return SurrogateTable.build(*GRIDS, sample_rate=SAMPLE_RATE, duration=DURATION)
+
+
+def entry_flows(params: np.ndarray) -> np.ndarray:
+    """ Glottal flows of a batch of parameters past the onset transient, as tabulated. """
+    num_tsteps = int(DURATION * SAMPLE_RATE)
+    flows = simulate_flows(params, SAMPLE_RATE, num_tsteps)[:, num_tsteps // 2 :]
+    return flows.astype(float)
+
+
+def test_query(table):
+    """ The flow of an entry's parameters, normalized as a glottal flow, returns them. """
+    assert 0 < len(table) <= np.prod([len(g) for g in GRIDS])
+    for params, flow in zip(table.params, entry_flows(table.params)):
+        nearest = table.query(flow / np.linalg.norm(flow), SAMPLE_RATE, k=3)
+        assert len(nearest) == 3
+        np.testing.assert_allclose(nearest[0], params)
+
+
+def test_query_aperiodic(table):
+    assert table.query(np.linspace(0, 1, 800), SAMPLE_RATE) == []
+
+
+def test_save_load(table, tmp_path):
+    filename = str(tmp_path / "table.npz")
+    table.save(filename)
+    loaded = SurrogateTable.load(filename)
+    assert loaded.options == table.options and loaded.sample_rate == table.sample_rate
+    np.testing.assert_array_equal(loaded.params, table.params)
+    flow = entry_flows(table.params[-1])[0]
+    np.testing.assert_array_equal(
+        loaded.query(flow, SAMPLE_RATE)[0], table.query(flow, SAMPLE_RATE)[0]
+    )
+
+
+def test_build_script(tmp_path):
+    filename = str(tmp_path / "table.npz")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(PhonationModeling.__file__)))
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "PhonationModeling.main_scripts.build_surrogate_table",
+            "-o",
+            filename,
+            "-fs",
+            str(SAMPLE_RATE),
+            "-T",
+            str(DURATION),
+            "-a",
+            "0.3",
+            "1.2",
+            "4",
+            "-b",
+            "0.2",
+            "0.6",
+            "3",
+            "-d",
+            "0.1",
+            "0.9",
+            "3",
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONPATH=root),
+    )
+    table = SurrogateTable.load(filename)
+    params = table.params[0]
+    np.testing.assert_allclose(table.query(entry_flows(params)[0], SAMPLE_RATE)[0], params)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+""" Estimator resolutions and step control on noiseless glottal flows of the model. """
+import numpy as np
+import pytest
+
+from PhonationModeling.estimation.vocal_fold_estimator import EstimatorOptions, VocalFoldEstimator
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import AdjointModel
+
+SAMPLE_RATE = 8000
+NUM_TSTEPS = 800
+TRUE_PARAMS = [0.5, 0.25, 0.7]
+OPTIONS = EstimatorOptions(gradient_engine="discrete_adjoint")
+
+
+def model_flow(params, options: EstimatorOptions = OPTIONS) -> np.ndarray:
+    """ Normalized glottal flow of the model at the full rate. """
+    estimator = VocalFoldEstimator(np.ones(NUM_TSTEPS), SAMPLE_RATE, options, init_params=params)
+    u0 = estimator._solve_forward(*params)["u0"]
+    return u0 / np.linalg.norm(u0)
+
+
+def test_coarse_fit():
+    """ The coarse samples are aligned with the coarse model grid: a noiseless coarse fit
+    recovers the true parameters, and its interpolation fits the full rate flow.
+    """
+    glottal_flow = model_flow(TRUE_PARAMS)
+    decimation = 4
+    options = OPTIONS._replace(
+        decimation=decimation,
+        optimizer="lbfgsb",
+        step_size=0.01,
+        coarse_max_iterations=100,
+        promote_window=100,
+        optim_patience=100,
+    )
+    estimator = VocalFoldEstimator(glottal_flow, SAMPLE_RATE, options, init_params=TRUE_PARAMS)
+    Rk = np.linalg.norm(estimator._solve_forward(*TRUE_PARAMS)["u0"] - estimator.glottal_flow)
+    assert Rk < 0.05  # 0.27 with the coarse samples 3 samples early
+
+    estimator = VocalFoldEstimator(
+        glottal_flow, SAMPLE_RATE, options, init_params=[0.52, 0.26, 0.68]
+    )
+    while estimator.decimation > 1 and not estimator.done:
+        estimator.step()
+    best = estimator.best if estimator.decimation > 1 else estimator.coarse_best
+    np.testing.assert_allclose([best.alpha, best.beta, best.delta], TRUE_PARAMS, atol=0.02)
+    result = estimator._interpolate(best, decimation)
+    assert len(result.u0) == NUM_TSTEPS and result.Rk < 0.02
+
+
+def test_adjoint_tables():
+    """ The adjoint engine solves the default nearest adjoint with the AdjointModel tables,
+    updated in place over the iterations.
+    """
+    pytest.importorskip("assimulo")
+    options = EstimatorOptions(optim_patience=3)
+    estimator = VocalFoldEstimator(
+        model_flow(TRUE_PARAMS), SAMPLE_RATE, options, init_params=[0.52, 0.26, 0.68]
+    )
+    estimator.step()
+    adjoint = estimator._adjoint
+    assert isinstance(adjoint, AdjointModel) and adjoint.interpolation == "nearest"
+    for _ in range(3):
+        estimator.step()
+    assert estimator._adjoint is adjoint and estimator.num_gradient_solves >= 1
+
+
+def test_abort_shrink():
+    """ The parameters of an aborted forward solve are rejected, and the step from the best
+    parameters is shrunk by abort_shrink.
+    """
+    options = EstimatorOptions(gradient_engine="sensitivity", abort_shrink=0.5)
+    estimator = VocalFoldEstimator(
+        model_flow(TRUE_PARAMS), SAMPLE_RATE, options, init_params=[0.52, 0.26, 0.68]
+    )
+    assert estimator.step()  # best parameters to shrink to
+    Rk_best, patience = estimator.Rk_best, estimator.patience
+    best = np.array([estimator.best.alpha, estimator.best.beta, estimator.best.delta])
+    trial = estimator.params.copy()
+    estimator.options = options._replace(guard_max_amplitude=1e-3)  # aborts at once
+    assert not estimator.step()
+    assert not estimator.stopped and estimator.patience == patience + 1
+    assert estimator.Rk_best == Rk_best
+    np.testing.assert_allclose(estimator.params, best + 0.5 * (trial - best))
+
+    # Without best parameters, the estimation stops
+    estimator = VocalFoldEstimator(
+        model_flow(TRUE_PARAMS), SAMPLE_RATE, options._replace(guard_nfev_per_step=0.01)
+    )
+    assert not estimator.step() and estimator.stopped and estimator.best is None
@@ -0,0 +1,1217 @@
+# -*- coding: utf-8 -*-
+""" Estimation of the asymmetric vocal fold model parameters (alpha, beta, delta) from a
+glottal flow, by fitting the normalized volume velocity flow of the displacement model.
+
+The "patience" optimizer takes a normalized gradient step from the current parameters on
+improvement of the L2 residual, otherwise a step from the best parameters in a random direction
+orthogonal to the last search direction (or gradient), until the patience is exhausted.
+The gradient is computed only on improvement. With "backtracking" step control, a rejected
+gradient step is first halved from the best parameters, needing forward solves only, and
+accepted on Armijo sufficient decrease of J = 0.5 * ||R||^2. The "lbfgsb" optimizer minimizes
+J = 0.5 * ||R||^2 within the parameter bounds by projected L-BFGS with the unnormalized
+gradient, computed only at accepted line search points.
+
+With decimation > 1, the estimation starts on the decimated glottal flow, so that the forward
+and adjoint solves of the early iterations run on a fraction of the samples, and the best
+coarse parameters are promoted to the full rate once the coarse phase has converged. The
+best coarse result is kept until the first successful full rate iteration, and is returned
+interpolated to the full rate if there is none, e.g. if the estimation is stopped in the
+coarse phase.
+
+With the "adaptive" tolerance schedule, the forward and adjoint solves start at tolerances
+loosened by tolerance_max_scale, as the early iterations only need the descent direction, and
+are tightened to the base tolerances as the relative improvement of the residual shrinks.
+The best residual is not re-evaluated on tightening: the residuals of the tighter solves are
+compared with a best residual of looser solves, which is off by up to the solver error at the
+loose tolerances, so that an improvement smaller than that error may be rejected.
+
+The LSODA forward solves are monitored by a SolverGuard, and aborted as soon as the states blow
+up or turn NaN/Inf, or the model evaluation or wall time budget is spent. The parameters of an
+aborted (or non-finite fixed-step) solve are rejected, and the step from the best parameters is
+shrunk by abort_shrink, or backtracked by the lbfgsb optimizer, instead of abandoning the file.
+With screening, the parameters proposed after the initial solve are first classified from the
+eigenvalues of the model at rest and a coarse pre-integration, and those that decay to rest or
+diverge, which cannot reproduce a voiced glottal flow, are rejected in the same way without any
+solve.
+
+With checkpoint_interval > 0, the estimator state is checkpointed every checkpoint_interval
+iterations to checkpoint_dir, and an estimator of the same options and glottal flow resumes
+from its checkpoint: the iteration and patience counters and the random state are restored,
+and the optimizer restarts from the best parameters so far.
+
+The phase timings and adaptive solver statistics of each iteration are recorded by an
+Instrumentation, exported to metrics_dir if given, and summarized with the best result.
+"""
+import logging
+import os
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from scipy import signal
+
+from PhonationModeling.estimation.instrumentation import Instrumentation, log_summary
+from PhonationModeling.estimation.results_store import (
+    UNHASHED_FIELDS,
+    atomic_pickle,
+    load_pickle,
+)
+from PhonationModeling.estimation.screening import ScreeningOptions, screen
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import (
+    AdjointModel,
+    adjoint_model,
+)
+from PhonationModeling.models.vocal_fold.jit_kernels import get_vdp_kernels
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    c,
+    d,
+    tau,
+    vdp_init_state,
+    vdp_init_t,
+    vdp_param_jacobian,
+    x0,
+)
+from PhonationModeling.solvers.gradients import (
+    GRADIENT_ENGINES,
+    adjoint_gradient,
+    sensitivity_gradient,
+)
+from PhonationModeling.solvers.ode_solvers.checkpointing import (
+    checkpointed_adjoint_gradient,
+    checkpointed_rk4_solver,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import (
+    discrete_adjoint_gradient,
+    rk4_solver,
+)
+from PhonationModeling.solvers.ode_solvers.ode_solver import (
+    IntegrationAborted,
+    SolverGuard,
+    ode_solver,
+)
+from PhonationModeling.solvers.ode_solvers.sensitivity_solver import sensitivity_solver
+from PhonationModeling.solvers.ode_solvers.trajectory import Trajectory
+from PhonationModeling.solvers.optimization import (
+    OPTIMIZERS,
+    TOLERANCE_SCHEDULES,
+    BacktrackingLineSearch,
+    ProjectedLBFGS,
+    ToleranceSchedule,
+    optim_grad_step,
+)
+
+
+class EstimatorOptions(NamedTuple):
+    """ Options of the vocal fold parameter estimator.
+    The defaults reproduce vocal_fold_estimate.py; run_e2e.py uses the configured step_size,
+    adjust_radius = 2 * step_size, adjust_distribution = "uniform" and
+    orthogonalize_to = "gradient".
+
+    Attributes:
+        optim_patience: int
+            Number of iterations of no improvement before stopping optimization.
+        step_size: float
+            Step size of the parameter updates.
+        adjust_radius: float
+            Radius of the random perturbation of the best parameters if a parameter goes
+            below 0.01.
+        adjust_distribution: str
+            Distribution of the perturbation direction, normal or uniform (positive orthant).
+        orthogonalize_to: str
+            Search direction on no improvement is orthogonal to the last search "direction"
+            or to the last "gradient".
+        model_backend: str
+            Kernel backend of the displacement model, see BACKENDS.
+        gradient_engine: str
+            Gradient engine, see GRADIENT_ENGINES.
+        adjoint_interpolation: str
+            Interpolation of the adjoint model coefficients, nearest or hermite, tabulated
+            by AdjointModel. The numba backend evaluates the nearest coefficients with the
+            compiled adjoint_model closures.
+        num_checkpoints: int
+            Number of checkpoints of the checkpointed engine. None: segments of
+            SEGMENT_LENGTH samples.
+        trajectory_dtype: str
+            Data type of the forward and adjoint solutions of the adjoint engine.
+        trajectory_dir: str
+            If given, directory of np.memmap files backing the forward solutions.
+        optimizer: str
+            Optimizer, see OPTIMIZERS. lbfgsb needs an exact gradient engine (sensitivity,
+            discrete_adjoint or checkpointed), and takes a first step of max-norm step_size.
+        param_lower: float
+            Lower bound of the parameters of the lbfgsb optimizer.
+        param_upper: float
+            Upper bound of the parameters of the lbfgsb optimizer.
+        step_control: str
+            Step control of the patience optimizer, fixed or backtracking.
+        max_backtracks: int
+            Number of step halvings along a gradient direction before a random orthogonal
+            direction, with backtracking step control.
+        decimation: int
+            Decimation factor of the glottal flow in the coarse phase. 1: full rate only.
+        coarse_max_iterations: int
+            Number of coarse iterations before promotion to the full rate.
+        promote_window: int
+            Number of coarse iterations over which the best residual is compared.
+        promote_rtol: float
+            Promote if the best residual improved by less than promote_rtol (relative) over
+            the promotion window. The coarse phase is also promoted on patience exhausted.
+        forward_atol: float
+            Absolute tolerance of the LSODA forward solves (adjoint and sensitivity engines).
+        forward_rtol: float
+            Relative tolerance of the LSODA forward solves.
+        adjoint_atol: float
+            Absolute tolerance of the IDA adjoint solves (adjoint engine).
+        adjoint_rtol: float
+            Relative tolerance of the IDA adjoint solves.
+        tolerance_schedule: str
+            Schedule of the solver tolerances, see TOLERANCE_SCHEDULES: fixed, or adaptive
+            tolerances loosened while the residual improves fast, see ToleranceSchedule.
+            The fixed-step RK4 engines have no tolerances.
+        tolerance_max_scale: float
+            Largest loosening factor of the adaptive tolerances.
+        tolerance_target_rtol: float
+            Relative improvement per iteration of the best residual at which the adaptive
+            tolerances are tightened to the base tolerances.
+        tolerance_window: int
+            Number of iterations over which the improvement of the adaptive tolerances is
+            averaged, and before which they are not tightened.
+        guard_max_amplitude: float
+            Bound of the absolute model states of the LSODA forward solves. 0: unbounded.
+        guard_nfev_per_step: float
+            Budget of model evaluations of the LSODA forward solves, per time step of the
+            glottal flow. 0: unlimited.
+        guard_max_time: float
+            Wall time budget of the LSODA forward solves, s. 0: unlimited, the default, as an
+            abort on the wall time depends on the machine load and is not reproducible.
+        abort_shrink: float
+            Factor of the step from the best parameters after an aborted forward solve or
+            screened out parameters.
+        screening: bool
+            Whether to screen the parameters before the forward solve, and reject those
+            classified as decaying or diverging over the glottal flow, see screening.
+        screen_decay_ratio: float
+            Amplitude ratio over the glottal flow below which parameters are decaying.
+        screen_periods: float
+            Number of periods of the screening pre-integration.
+        screen_steps_per_period: int
+            Number of RK4 steps per period of the screening pre-integration.
+        checkpoint_dir: str
+            If given, directory of the estimator checkpoints.
+        checkpoint_interval: int
+            Number of iterations between the checkpoints. 0: no checkpoints.
+        metrics_dir: str
+            If given, directory of the per-iteration timings and solver statistics, as JSON
+            lines files <name>.jsonl.
+    """
+
+    optim_patience: int = 400
+    step_size: float = 0.1
+    adjust_radius: float = 0.01
+    adjust_distribution: str = "normal"
+    orthogonalize_to: str = "direction"
+    model_backend: str = "python"
+    gradient_engine: str = "adjoint"
+    adjoint_interpolation: str = "nearest"
+    num_checkpoints: Optional[int] = None
+    trajectory_dtype: str = "float64"
+    trajectory_dir: Optional[str] = None
+    optimizer: str = "patience"
+    param_lower: float = 0.01
+    param_upper: float = 2.0
+    step_control: str = "fixed"
+    max_backtracks: int = 4
+    decimation: int = 1
+    coarse_max_iterations: int = 200
+    promote_window: int = 20
+    promote_rtol: float = 1e-3
+    forward_atol: float = 1e-12
+    forward_rtol: float = 1e-6
+    adjoint_atol: float = 1e-6
+    adjoint_rtol: float = 1e-6
+    tolerance_schedule: str = "fixed"
+    tolerance_max_scale: float = 100.0
+    tolerance_target_rtol: float = 1e-3
+    tolerance_window: int = 5
+    guard_max_amplitude: float = 1e3
+    guard_nfev_per_step: float = 50.0
+    guard_max_time: float = 0.0
+    abort_shrink: float = 0.5
+    screening: bool = False
+    screen_decay_ratio: float = 0.01
+    screen_periods: float = 10.0
+    screen_steps_per_period: int = 32
+    checkpoint_dir: Optional[str] = None
+    checkpoint_interval: int = 0
+    metrics_dir: Optional[str] = None
+
+    @classmethod
+    def from_configs(cls, configs: Dict, **kwargs) -> "EstimatorOptions":
+        """ Options from the keys of a configure dict, overridden by kwargs. """
+        options = {key: configs[key] for key in cls._fields if key in configs}
+        options.update(kwargs)
+        return cls(**options)
+
+
+class EstimationResult(NamedTuple):
+    """ Best estimation result.
+
+    Attributes:
+        iteration: int
+            Optimizer iteration of the best result.
+        R: np.ndarray[float], shape (T,)
+            Estimation residual.
+        Rk: float
+            L2 norm of the estimation residual.
+        alpha, beta, delta: float
+            Estimated model parameters.
+        sol: np.ndarray[float]
+            Model solution [time, model states], or the checkpoint states of the
+            checkpointed engine.
+        u0: np.ndarray[float], shape (T,)
+            Estimated glottal flow.
+    """
+
+    iteration: int
+    R: np.ndarray
+    Rk: float
+    alpha: float
+    beta: float
+    delta: float
+    sol: np.ndarray
+    u0: np.ndarray
+
+
+def checkpoint_file(options: EstimatorOptions, name: str) -> Optional[str]:
+    """ Checkpoint file of an estimation. None if checkpointing is disabled. """
+    if options.checkpoint_dir is None or options.checkpoint_interval <= 0:
+        return None
+    return os.path.join(options.checkpoint_dir, f"{name}.ckpt")
+
+
+def discard_checkpoint(options: EstimatorOptions, name: str):
+    """ Remove the checkpoint of a finished estimation. """
+    filename = checkpoint_file(options, name)
+    if filename is not None and os.path.isfile(filename):
+        os.remove(filename)
+
+
+class VocalFoldEstimator(object):
+    """ Iterative vocal fold parameter estimator for one glottal flow.
+
+    Args:
+        glottal_flow: np.ndarray[float], shape (T,)
+            Target glottal flow, normalized.
+        sample_rate: int
+            Sample rate.
+        options: EstimatorOptions
+            Estimator options.
+        init_params: List[float]
+            Initial parameters [alpha, beta, delta]. Default: delta drawn uniformly from
+            [0, 1), alpha = 0.6 * delta (stable-like oscillator), beta = 0.2.
+        rng: np.random.RandomState
+            Random state for the initial and perturbed parameters. Default: np.random.
+        logger: logging.Logger
+            Logger.
+        name: str
+            Name of the estimation, e.g. the wav file, for the memmap files.
+    """
+
+    def __init__(
+        self,
+        glottal_flow: np.ndarray,
+        sample_rate: int,
+        options: EstimatorOptions = EstimatorOptions(),
+        init_params: Optional[List[float]] = None,
+        rng: Optional[np.random.RandomState] = None,
+        logger: Optional[logging.Logger] = None,
+        name: str = "vocal_fold",
+    ):
+        assert (
+            options.gradient_engine in GRADIENT_ENGINES
+        ), f"Unknown gradient engine: {options.gradient_engine}"
+        assert options.optimizer in OPTIMIZERS, f"Unknown optimizer: {options.optimizer}"
+        assert (
+            options.optimizer != "lbfgsb" or options.gradient_engine != "adjoint"
+        ), "lbfgsb needs an exact gradient: sensitivity, discrete_adjoint or checkpointed"
+        assert (
+            options.tolerance_schedule in TOLERANCE_SCHEDULES
+        ), f"Unknown tolerance schedule: {options.tolerance_schedule}"
+        self.full_glottal_flow = glottal_flow
+        self.full_sample_rate = sample_rate
+        self.options = options
+        self.rng = rng if rng is not None else np.random
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.name = name
+        self.vdp_coupled, self.vdp_jacobian = get_vdp_kernels(options.model_backend)
+
+        # Set model initial conditions
+        if init_params is None:
+            delta = self.rng.random()  # asymmetry parameter
+            alpha = 0.6 * delta  # if > 0.5 delta, stable-like oscillator
+            beta = 0.2
+            init_params = [alpha, beta, delta]
+        self.params = np.array(init_params, dtype=float)
+
+        self.iteration = 0
+        self.stopped = False  # stopped on a solver failure
+        self.num_forward_solves = 0
+        self.num_gradient_solves = 0
+        self.solver_work = defaultdict(lambda: [0, 0])  # (phase, decimation, loose) -> work
+        self.num_screened = Counter()  # class -> number of screened out parameters
+        self.screening_options = ScreeningOptions(
+            decay_ratio=options.screen_decay_ratio,
+            num_periods=options.screen_periods,
+            steps_per_period=options.screen_steps_per_period,
+            max_amplitude=(
+                options.guard_max_amplitude if options.guard_max_amplitude > 0 else np.inf
+            ),
+        )
+        self._trajectories = None
+        self.coarse_best: Optional[EstimationResult] = None  # until the first full rate best
+        self.instrumentation = Instrumentation(
+            filename=(
+                None
+                if options.metrics_dir is None
+                else os.path.join(options.metrics_dir, f"{name}.jsonl")
+            ),
+            name=name,
+        )
+        self._flow_crc = zlib.crc32(np.ascontiguousarray(glottal_flow).tobytes())
+        state = self._load_checkpoint()
+        if state is not None:
+            self.params = state["params"]
+            self.iteration = state["iteration"]
+            self.num_forward_solves = state["num_forward_solves"]
+            self.num_gradient_solves = state["num_gradient_solves"]
+            self.rng.set_state(state["rng_state"])
+            self._set_resolution(state["decimation"])
+            self.coarse_best = state.get("coarse_best")
+            self.patience = state["patience"]
+            self.logger.info(
+                f"Resumed from checkpoint at iteration {self.iteration:d}: "
+                f"L2 Residual = {state['Rk_best']:.4f}"
+            )
+        else:
+            self._set_resolution(options.decimation)
+
+        alpha, beta, delta = self.params
+        self.logger.info(
+            f"Initial parameters: alpha = {alpha:.4f}   beta = {beta:.4f}   delta = {delta:.4f}"
+        )
+        self.logger.info("-" * 110)
+
+    def _set_resolution(self, decimation: int):
+        """ Set the glottal flow decimated by a factor, and reset the optimizer and solver
+        state of the resolution.
+        """
+        options = self.options
+        glottal_flow, sample_rate = self.full_glottal_flow, self.full_sample_rate
+        if decimation > 1:
+            # Coarse sample k at model time (k + 1) * decimation / fs, full rate sample
+            # (k + 1) * decimation - 1, as full rate sample k at (k + 1) / fs
+            coarse_flow = signal.decimate(
+                glottal_flow[decimation - 1 :], decimation, ftype="fir", zero_phase=True
+            )
+            glottal_flow = coarse_flow / np.linalg.norm(coarse_flow) * np.linalg.norm(glottal_flow)
+            sample_rate = sample_rate / float(decimation)
+        self.decimation = decimation
+        self.glottal_flow = glottal_flow
+        self.flow_norm = np.linalg.norm(glottal_flow)
+        self.sample_rate = sample_rate
+        self.num_tsteps = len(glottal_flow)  # total number of time steps
+        self.T = len(glottal_flow) / float(sample_rate)  # total time, s
+
+        # Optimizer state
+        self.patience = 0  # number of iterations of no improvement
+        self.Rk = 1e16
+        self.Rk_best = 1e16
+        self.best: Optional[EstimationResult] = None
+        self.direction = None  # last search direction
+        self.gradient = None  # last normalized gradient
+        self.Rk_history = []  # best residual after each iteration of the resolution
+        self.optimizer = None
+        if options.optimizer == "lbfgsb":
+            self.optimizer = ProjectedLBFGS(
+                self.params,
+                options.param_lower,
+                options.param_upper,
+                initial_step=options.step_size,
+            )
+            self.params = self.optimizer.ask()
+        self.line_search = None
+        if options.step_control == "backtracking":
+            self.line_search = BacktrackingLineSearch(
+                options.step_size, max_backtracks=options.max_backtracks
+            )
+        self._backtracking = False  # whether the trial steps are along the gradient
+        self.tolerance = ToleranceSchedule(
+            options.tolerance_max_scale if options.tolerance_schedule == "adaptive" else 1.0,
+            target_rtol=options.tolerance_target_rtol,
+            window=options.tolerance_window,
+        )
+
+        # Solver state, reused across iterations
+        self.close()
+        self._adjoint = None  # adjoint model tables, updated in place per iteration
+        self._adjoint_session = None  # DAE solver session of the adjoint model
+        self._trajectories = None  # current & best forward solutions, swapped on improvement
+        if options.gradient_engine == "adjoint":
+            self._trajectories = [
+                Trajectory(
+                    self.num_tsteps,
+                    len(vdp_init_state),
+                    dtype=np.dtype(options.trajectory_dtype),
+                    filename=(
+                        None
+                        if options.trajectory_dir is None
+                        else os.path.join(options.trajectory_dir, f"{self.name}.{k:d}.traj")
+                    ),
+                )
+                for k in range(2)
+            ]
+
+    def _promotion_due(self) -> bool:
+        """ Whether the coarse resolution has converged: patience exhausted, optimizer done,
+        iteration budget used, or best residual stalled over the promotion window.
+        """
+        options = self.options
+        if self.patience >= options.optim_patience:
+            return True
+        if self.optimizer is not None and self.optimizer.done:
+            return True
+        history = self.Rk_history
+        if len(history) >= options.coarse_max_iterations:
+            return True
+        window = options.promote_window
+        return (
+            len(history) > window
+            and history[-window - 1] - history[-1] < options.promote_rtol * history[-window - 1]
+        )
+
+    def _promote(self):
+        """ Continue from the best coarse parameters at the full sample rate, and keep the best
+        coarse result as the fallback until the first full rate best.
+        """
+        best = self.best
+        if best is not None:
+            self.params = np.array([best.alpha, best.beta, best.delta])
+            if isinstance(best.sol, Trajectory):  # copied out of the released buffers
+                best = best._replace(sol=best.sol.to_array())
+            self.coarse_best = best
+        decimation = self.decimation
+        self._set_resolution(1)
+        self.logger.info(
+            f"[{self.patience:d}:{self.iteration:d}] PROMOTE x{decimation:d} -> x1: "
+            f"alpha = {self.params[0]:.4f}   beta = {self.params[1]:.4f}   "
+            f"delta = {self.params[2]:.4f}"
+        )
+
+    @property
+    def has_result(self) -> bool:
+        """ Whether there is a best result, at the full rate or as the coarse fallback. """
+        return self.best is not None or self.coarse_best is not None
+
+    @property
+    def done(self) -> bool:
+        if self.decimation > 1:  # promoted on convergence of the coarse resolution
+            return self.stopped
+        if self.optimizer is not None and self.optimizer.done:
+            return True
+        return self.stopped or self.patience >= self.options.optim_patience
+
+    def step(self) -> bool:
+        """ One optimizer iteration.
+
+        Returns:
+            improved: bool
+                Whether the residual improved.
+        """
+        logger = self.logger
+        instrumentation = self.instrumentation
+        alpha, beta, delta = self.params
+        if self.options.screening and self.best is not None:  # the initial solve is kept
+            with instrumentation.phase("screen"):
+                label = screen(self.params, self.T, self.screening_options)[0]
+            if label != "oscillating":
+                return self._screened(label, alpha, beta, delta)
+        try:
+            with instrumentation.phase("forward"):
+                forward = self._solve_forward(alpha, beta, delta)
+        except IntegrationAborted as e:
+            self.num_forward_solves += 1
+            return self._aborted(e, alpha, beta, delta)
+        except AssertionError as e:
+            logger.error(f"AssertionError: {e}")
+            logger.warning("Skip")
+            self.stopped = True
+            instrumentation.end_iteration(iteration=self.iteration, stopped=True)
+            return False
+        self.num_forward_solves += 1
+
+        # Estimation residual
+        R = forward["u0"] - self.glottal_flow
+        self.Rk = Rk = np.sqrt(np.sum(R ** 2))
+
+        # Update parameters
+        logger.info("Updating parameters")
+        patience, iteration = self.patience, self.iteration
+        logger.info(
+            f"[{patience:d}:{iteration:d}] L2 Residual = {Rk:.4f} | alpha = {alpha:.4f}   "
+            f"beta = {beta:.4f}   delta = {delta:.4f}"
+        )
+        improved = Rk < self.Rk_best  # Rk_best possibly of looser adaptive tolerances
+        if improved and self.line_search is not None:
+            improved = self.line_search.accept(0.5 * Rk ** 2)
+        if improved:
+            # Record best
+            sol = forward["checkpoints"] if "checkpoints" in forward else forward["sol"]
+            if self._trajectories is not None:  # keep the best solution, solve into the other
+                self._trajectories.reverse()
+            self.best = EstimationResult(
+                iteration, R, Rk, alpha, beta, delta, sol, forward["u0"]
+            )
+            self.Rk_best = Rk
+            if self.decimation == 1:
+                self.coarse_best = None
+
+        with instrumentation.phase("update"):  # excludes the gradient
+            if self.optimizer is not None:
+                self._optimizer_update(alpha, beta, delta, forward, R, improved)
+            else:
+                self._patience_update(alpha, beta, delta, forward, R, improved)
+            self.Rk_history.append(self.Rk_best)
+            tolerance_scale = self.tolerance.scale  # of this iteration's solves
+            self.tolerance.update(self.Rk_history)
+
+            if self.decimation > 1 and not self.stopped and self._promotion_due():
+                self._promote()
+
+        interval = self.options.checkpoint_interval
+        if interval > 0 and self.iteration != iteration and self.iteration % interval == 0:
+            with instrumentation.phase("io"):
+                self._save_checkpoint()
+
+        instrumentation.end_iteration(
+            iteration=iteration,
+            decimation=self.decimation,
+            Rk=float(Rk),
+            improved=bool(improved),
+            tolerance_scale=float(tolerance_scale),
+            alpha=float(alpha),
+            beta=float(beta),
+            delta=float(delta),
+        )
+        logger.info("-" * 110)
+        return improved
+
+    def _aborted(self, error: IntegrationAborted, alpha: float, beta: float, delta: float) -> bool:
+        """ Reject the parameters of an aborted forward solve, as of infinite residual, and
+        shrink the step from the best parameters. Stops if there are no best parameters yet at
+        the current resolution (the first solve, or the first full rate solve from the best
+        coarse parameters).
+        """
+        logger = self.logger
+        instrumentation = self.instrumentation
+        patience, iteration = self.patience, self.iteration
+        logger.warning(
+            f"[{patience:d}:{iteration:d}] ABORT forward solve: {error} | alpha = {alpha:.4f}   "
+            f"beta = {beta:.4f}   delta = {delta:.4f}"
+        )
+        instrumentation.count("forward", dict(aborts=1, nfcns=error.nfev))
+        if self.best is None:  # nothing to shrink to
+            logger.warning("Skip")
+            self.stopped = True
+            instrumentation.end_iteration(iteration=iteration, stopped=True, aborted=error.reason)
+            return False
+        return self._reject(alpha, beta, delta, aborted=error.reason)
+
+    def _screened(self, label: str, alpha: float, beta: float, delta: float) -> bool:
+        """ Reject parameters screened as non-oscillating before the forward solve. """
+        self.logger.info(
+            f"[{self.patience:d}:{self.iteration:d}] SCREEN {label}: alpha = {alpha:.4f}   "
+            f"beta = {beta:.4f}   delta = {delta:.4f}"
+        )
+        self.num_screened[label] += 1
+        self.instrumentation.count("screen", {label: 1})
+        return self._reject(alpha, beta, delta, screened=label)
+
+    def _reject(self, alpha: float, beta: float, delta: float, **fields) -> bool:
+        """ Reject the trial parameters, as of infinite residual, and shrink the step from
+        the best parameters, or backtrack the lbfgsb optimizer. fields are recorded with the
+        iteration.
+        """
+        logger = self.logger
+        instrumentation = self.instrumentation
+        iteration = self.iteration
+        with instrumentation.phase("update"):
+            if self.optimizer is not None:
+                self.optimizer.tell(np.inf)  # rejected, the optimizer backtracks
+                self.params = self.optimizer.ask()
+            else:
+                best = np.array([self.best.alpha, self.best.beta, self.best.delta])
+                self.params = best + self.options.abort_shrink * (self.params - best)
+                if self._backtracking:
+                    self.line_search.t *= self.options.abort_shrink
+            self.patience += 1
+            self.iteration += 1
+            logger.info(
+                f"[{self.patience:d}:{self.iteration:d}] SHRINK: alpha = {self.params[0]:.4f}   "
+                f"beta = {self.params[1]:.4f}   delta = {self.params[2]:.4f}"
+            )
+            self.Rk_history.append(self.Rk_best)
+            self.tolerance.update(self.Rk_history)
+            if self.decimation > 1 and self._promotion_due():
+                self._promote()
+
+        instrumentation.end_iteration(
+            iteration=iteration,
+            decimation=self.decimation,
+            **fields,
+            alpha=float(alpha),
+            beta=float(beta),
+            delta=float(delta),
+        )
+        logger.info("-" * 110)
+        return False
+
+    def _patience_update(
+        self, alpha: float, beta: float, delta: float, forward: Dict, R: np.ndarray, improved: bool
+    ):
+        """ Normalized gradient step on improvement, else (after backtracking of the gradient
+        step, if enabled) a step from the best parameters in an orthogonal random direction.
+        """
+        logger = self.logger
+        if improved:
+            # Compute gradients
+            try:
+                dpv = self._gradient(alpha, beta, delta, forward, R)
+            except Exception as e:
+                logger.error(f"Exception: {e}")
+                logger.warning("Skip")
+                self.stopped = True
+                return
+            grad_norm = np.linalg.norm(dpv)
+            dpv = dpv / grad_norm  # normalize
+            self.gradient = self.direction = dpv
+
+            # Update
+            step_size = self.options.step_size
+            if self.line_search is not None:
+                # slope of the exact gradient along -dpv, unknown for normalized adjoints
+                slope = 0.0 if self.options.gradient_engine == "adjoint" else -grad_norm
+                step_size = self.line_search.start(0.5 * self.Rk ** 2, slope)
+                self._backtracking = True
+            self.params = np.array(optim_grad_step(alpha, beta, delta, *dpv, stepsize=step_size))
+            self.iteration += 1
+            logger.info(
+                f"[{self.patience:d}:{self.iteration:d}] IMPROV: alpha = {self.params[0]:.4f}   "
+                f"beta = {self.params[1]:.4f}   delta = {self.params[2]:.4f}"
+            )
+        elif self._backtracking and self.line_search.backtrack() is not None:
+            self.patience += 1
+
+            # Shrink the gradient step from the best parameters
+            best = self.best
+            self.params = np.array(
+                optim_grad_step(
+                    best.alpha, best.beta, best.delta, *self.gradient, stepsize=self.line_search.t
+                )
+            )
+            self.iteration += 1
+            logger.info(
+                f"[{self.patience:d}:{self.iteration:d}] BACKTRACK: "
+                f"alpha = {self.params[0]:.4f}   beta = {self.params[1]:.4f}   "
+                f"delta = {self.params[2]:.4f}"
+            )
+        else:  # no improvement
+            self.patience += 1
+
+            # Compute conjugate gradients
+            if self.options.orthogonalize_to == "gradient":
+                dpv = self.gradient
+            else:
+                dpv = self.direction / np.linalg.norm(self.direction)
+            ov = self.rng.randn(len(dpv))  # orthogonal vector
+            ov = ov - (np.dot(ov, dpv) / np.dot(dpv, dpv)) * dpv  # orthogonalize
+            ov = ov / np.linalg.norm(ov)  # normalize
+            self.direction = ov
+            if self.line_search is not None:  # simple decrease along a random direction
+                self.line_search.start(0.5 * self.Rk_best ** 2)
+                self._backtracking = False
+
+            # Reverse previous update & update in conjugate direction
+            best = self.best
+            self.params = np.array(
+                optim_grad_step(
+                    best.alpha, best.beta, best.delta, *ov, stepsize=self.options.step_size
+                )
+            )
+            self.iteration += 1
+            logger.info(
+                f"[{self.patience:d}:{self.iteration:d}] NO IMPROV: "
+                f"alpha = {self.params[0]:.4f}   beta = {self.params[1]:.4f}   "
+                f"delta = {self.params[2]:.4f}"
+            )
+
+        if np.any(self.params <= 0.01):  # if param goes below 0
+            pv_best = np.array([self.best.alpha, self.best.beta, self.best.delta])
+            while np.any(self.params <= 0.01):
+                if self.options.adjust_distribution == "uniform":
+                    rv = self.rng.random(len(pv_best))  # radius
+                else:
+                    rv = self.rng.randn(len(pv_best))
+                rv = rv / np.linalg.norm(rv)  # normalize to 1
+                self.params = pv_best + self.options.adjust_radius * rv  # perturb within a ball
+            logger.info(
+                f"[{self.patience:d}:{self.iteration:d}] ADJUST: alpha = {self.params[0]:.4f}   "
+                f"beta = {self.params[1]:.4f}   delta = {self.params[2]:.4f}"
+            )
+
+    def _optimizer_update(
+        self, alpha: float, beta: float, delta: float, forward: Dict, R: np.ndarray, improved: bool
+    ):
+        """ Tell the loss, and the gradient if needed, to the optimizer and ask its next
+        parameters.
+        """
+        logger = self.logger
+        loss = 0.5 * self.Rk ** 2
+        grad = None
+        if self.optimizer.needs_gradient(loss):
+            try:
+                grad = self._gradient(alpha, beta, delta, forward, R)
+            except Exception as e:
+                logger.error(f"Exception: {e}")
+                logger.warning("Skip")
+                self.stopped = True
+                return
+        self.optimizer.tell(loss, grad)
+        if not improved:
+            self.patience += 1
+        self.params = self.optimizer.ask()
+        self.iteration += 1
+        logger.info(
+            f"[{self.patience:d}:{self.iteration:d}] {'IMPROV' if improved else 'NO IMPROV'}: "
+            f"alpha = {self.params[0]:.4f}   beta = {self.params[1]:.4f}   "
+            f"delta = {self.params[2]:.4f}"
+        )
+
+    def run(self) -> EstimationResult:
+        """ Iterate until the patience is exhausted or a solver fails. The checkpoint, if
+        any, is discarded on completion.
+
+        Returns:
+            result: EstimationResult
+                Best result.
+        """
+        try:
+            while not self.done:
+                self.step()
+            result = self.result()
+            discard_checkpoint(self.options, self.name)
+            return result
+        finally:
+            self.close()
+
+    def _checkpoint_key(self) -> Dict:
+        """ Options and glottal flow that a checkpoint must match to be resumed. """
+        options = {
+            key: value
+            for key, value in self.options._asdict().items()
+            if key not in UNHASHED_FIELDS
+        }
+        return dict(options=options, flow_crc=self._flow_crc)
+
+    def _save_checkpoint(self):
+        filename = checkpoint_file(self.options, self.name)
+        if filename is None:
+            return
+        best = self.best
+        params = self.params if best is None else np.array([best.alpha, best.beta, best.delta])
+        state = dict(
+            key=self._checkpoint_key(),
+            params=params,
+            Rk_best=self.Rk_best,
+            iteration=self.iteration,
+            patience=self.patience,
+            decimation=self.decimation,
+            coarse_best=self.coarse_best,
+            num_forward_solves=self.num_forward_solves,
+            num_gradient_solves=self.num_gradient_solves,
+            rng_state=self.rng.get_state(),
+        )
+        atomic_pickle(state, filename)
+        self.logger.info(f"[{self.patience:d}:{self.iteration:d}] Checkpointed to {filename}")
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        filename = checkpoint_file(self.options, self.name)
+        if filename is None or not os.path.isfile(filename):
+            return None
+        state = load_pickle(filename)
+        if state is None or state["key"] != self._checkpoint_key():
+            self.logger.warning(f"Ignored checkpoint {filename} of another estimation")
+            return None
+        return state
+
+    def result(self) -> EstimationResult:
+        """ Best result so far, with the solution copied out of the reused buffers. The result
+        is always at the full rate: if the estimation is stopped in the coarse phase, or has no
+        full rate best yet, the best coarse result is interpolated to the full rate.
+        """
+        logger = self.logger
+        best = self.best if self.decimation == 1 else None
+        coarse_best = self.coarse_best if self.decimation == 1 else self.best
+        if best is None and coarse_best is not None:
+            logger.warning(
+                f"{self.name}: no successful full rate iteration, best coarse result "
+                f"x{self.options.decimation:d} interpolated to the full rate"
+            )
+            if isinstance(coarse_best.sol, Trajectory):
+                coarse_best = coarse_best._replace(sol=coarse_best.sol.to_array())
+            best = self._interpolate(coarse_best, self.options.decimation)
+        elif best is None:
+            raise RuntimeError(f"{self.name}: no successful iteration")
+        elif isinstance(best.sol, Trajectory):
+            best = best._replace(sol=best.sol.to_array())
+
+        logger.info("-" * 110)
+        logger.info(
+            f"BEST@{best.iteration:d}: L2 Residual = {best.Rk:.4f} | alpha = {best.alpha:.4f}   "
+            f"beta = {best.beta:.4f}   delta = {best.delta:.4f}"
+        )
+        logger.info(
+            f"Solves: forward = {self.num_forward_solves:d}   "
+            f"gradient = {self.num_gradient_solves:d}"
+        )
+        if self.num_screened:
+            logger.info(
+                f"Screened out: {sum(self.num_screened.values()):d} parameters before the "
+                "forward solve | "
+                + "   ".join(f"{k} = {n:d}" for k, n in sorted(self.num_screened.items()))
+            )
+        if self.options.tolerance_schedule == "adaptive":
+            self._log_tolerance_savings()
+        log_summary(self.instrumentation.summary(), logger)
+        logger.info("*" * 110)
+        logger.info("*" * 110)
+        return best
+
+    def _interpolate(self, best: EstimationResult, decimation: int) -> EstimationResult:
+        """ Result of a decimated resolution linearly interpolated to the full sample rate,
+        with the residual against the full rate glottal flow. The checkpoint states of the
+        checkpointed engine are kept as they are. Coarse sample k is full rate sample
+        (k + 1) * decimation - 1, the first decimation - 1 samples are held.
+        """
+        glottal_flow = self.full_glottal_flow
+        t = np.arange(len(glottal_flow), dtype=float)  # in full rate samples
+        t_coarse = decimation * np.arange(1, len(best.u0) + 1, dtype=float) - 1
+        u0 = np.interp(t, t_coarse, best.u0)
+        u0 = u0 / np.linalg.norm(u0) * np.linalg.norm(glottal_flow)  # normalize
+        R = u0 - glottal_flow
+        sol = best.sol
+        if self.options.gradient_engine != "checkpointed":  # [time, model states] per sample
+            sol = np.column_stack([np.interp(t, t_coarse, column) for column in sol.T])
+        return best._replace(R=R, Rk=np.sqrt(np.sum(R ** 2)), sol=sol, u0=u0)
+
+    def _count_solver_work(self, phase: str, stats: Dict):
+        """ Count a solve and its model evaluations, by resolution and tolerance loosening. """
+        work = self.solver_work[phase, self.decimation, self.tolerance.scale > 1.0]
+        work[0] += 1
+        work[1] += int(stats.get("nfcns", 0))
+
+    def _log_tolerance_savings(self):
+        """ Log the solves at loosened tolerances and the model evaluations they saved,
+        estimated at the mean evaluations of the base tolerance solves of the same resolution.
+        """
+        for phase in ["forward", "adjoint"]:
+            num_solves = num_loose = num_evaluations = 0
+            saved, estimated = 0.0, True
+            for (p, decimation, loose), (solves, evaluations) in self.solver_work.items():
+                if p != phase:
+                    continue
+                num_solves += solves
+                if not loose:
+                    continue
+                num_loose += solves
+                num_evaluations += evaluations
+                base = self.solver_work.get((phase, decimation, False))
+                if base is None:  # never tightened at this resolution
+                    estimated = False
+                    continue
+                saved += solves * base[1] / base[0] - evaluations
+            if num_loose == 0:
+                continue
+            self.logger.info(
+                f"Tolerance schedule: {phase}: {num_loose:d} of {num_solves:d} solves loosened, "
+                f"{num_evaluations:d} model evaluations, ~{saved:.0f} saved"
+                + ("" if estimated else " (partly unestimated, no base tolerance solve)")
+            )
+
+    def close(self):
+        """ Release the solution buffers. """
+        if self._trajectories is not None:
+            for trajectory in self._trajectories:
+                trajectory.release()
+            self._trajectories = None
+
+    def _solve_forward(self, alpha: float, beta: float, delta: float) -> Dict:
+        """ Solve the vocal fold displacement model and the estimated glottal flow. """
+        logger = self.logger
+        logger.info("Solving vocal fold displacement model")
+
+        K = B ** 2 / (beta ** 2 * M)
+        Ps = (alpha * x0 * np.sqrt(M * K)) / tau
+        time_scaling = np.sqrt(K / float(M))  # t -> s
+        logger.debug(
+            f"stiffness K = {K:.4f} dyne/cm^3    subglottal Ps = {Ps:.4f} dyne/cm^2    "
+            f"time_scaling = {time_scaling:.4f}"
+        )
+
+        options = self.options
+        engine = options.gradient_engine
+        vdp_params = [alpha, beta, delta]
+        dt = time_scaling / float(self.sample_rate)  # dt -> ds
+        forward = {"time_scaling": time_scaling, "dt": dt}
+        atol, rtol = self.tolerance.tolerances(options.forward_atol, options.forward_rtol)
+        guard = SolverGuard(
+            max_amplitude=options.guard_max_amplitude,
+            max_nfev=int(options.guard_nfev_per_step * self.num_tsteps),
+            max_time=options.guard_max_time,
+        )
+        stats = {}  # statistics of the adaptive solvers
+        if engine == "sensitivity":  # solve model & its sensitivities in one pass
+            forward["sol"], forward["sens"] = sensitivity_solver(
+                self.vdp_coupled,
+                self.vdp_jacobian,
+                vdp_param_jacobian,
+                vdp_params,
+                vdp_init_state,
+                (time_scaling * vdp_init_t),
+                solver="lsoda",
+                dt=dt,
+                num_tsteps=self.num_tsteps,
+                atol=atol,
+                rtol=rtol,
+                stats=stats,
+                guard=guard,
+            )
+        elif engine == "discrete_adjoint":  # fixed-step RK4, differentiated exactly
+            forward["sol"] = rk4_solver(
+                vdp_params, vdp_init_state, (time_scaling * vdp_init_t), dt, self.num_tsteps
+            )
+        elif engine == "checkpointed":  # RK4, model states kept at checkpoints only
+            forward["checkpoints"], forward["v"] = checkpointed_rk4_solver(
+                vdp_params,
+                vdp_init_state,
+                dt,
+                self.num_tsteps,
+                x0,
+                num_checkpoints=options.num_checkpoints,
+            )
+        else:
+            forward["sol"] = ode_solver(
+                self.vdp_coupled,
+                self.vdp_jacobian,
+                vdp_params,
+                vdp_init_state,
+                (time_scaling * vdp_init_t),
+                solver="lsoda",
+                ixpr=0,
+                dt=dt,
+                tmax=(time_scaling * self.T),
+                dense=True,
+                num_tsteps=self.num_tsteps,
+                out=self._trajectories[0],
+                atol=atol,
+                rtol=rtol,
+                stats=stats,
+                guard=guard,
+            )
+        self.instrumentation.count("forward", stats)
+        if stats:
+            self._count_solver_work("forward", stats)
+
+        # Calculate glottal flow
+        if engine == "checkpointed":
+            u0 = c * d * forward["v"]  # volume velocity flow, cm^3/s
+        else:
+            sol = forward["sol"]
+            assert len(sol) == self.num_tsteps, (
+                f"Inconsistent length: ODE sol ({len(sol):d}) / "
+                f"glottal flow ({self.num_tsteps:d})"
+            )
+            if isinstance(sol, Trajectory):  # zero-copy views of the state rows
+                X = sol.states[0::2].T  # vocal fold displacement (right, left), cm
+                dX = sol.states[1::2].T  # cm/s
+            else:
+                X = sol[:, [1, 3]]  # vocal fold displacement (right, left), cm
+                dX = sol[:, [2, 4]]  # cm/s
+            forward["X"], forward["dX"] = X, dX
+            u0 = c * d * (np.sum(X, axis=1) + 2 * x0)  # volume velocity flow, cm^3/s
+        finite = np.isfinite(u0)
+        if not finite.all():  # blow-up of the unmonitored fixed-step engines
+            k = int(np.argmin(finite))
+            raise IntegrationAborted("nonfinite", (k + 1) * dt, 4 * self.num_tsteps, 0.0)
+        forward["u0"] = u0 / np.linalg.norm(u0) * self.flow_norm  # normalize
+        return forward
+
+    def _gradient(
+        self, alpha: float, beta: float, delta: float, forward: Dict, R: np.ndarray
+    ) -> np.ndarray:
+        """ Parameter gradient of the residual, by the configured gradient engine. """
+        with self.instrumentation.phase("gradient"):  # excludes the adjoint solve
+            self.num_gradient_solves += 1
+            engine = self.options.gradient_engine
+            if engine == "adjoint":
+                L, E = self._solve_adjoint(alpha, beta, delta, forward, R)
+                return adjoint_gradient(forward["X"], forward["dX"], L, E)  # param grad vector
+            if engine == "discrete_adjoint":
+                return discrete_adjoint_gradient(
+                    forward["sol"],
+                    [alpha, beta, delta],
+                    vdp_init_state,
+                    forward["dt"],
+                    R,
+                    self.flow_norm,
+                    x0,
+                    dlog_time_scaling=[0, -1 / beta, 0],  # time_scaling ~ 1 / beta
+                )
+            if engine == "checkpointed":
+                # tracemalloc slows the gradient down, only traced for the debug log
+                memory_stats = {} if self.logger.isEnabledFor(logging.DEBUG) else None
+                grad = checkpointed_adjoint_gradient(
+                    forward["checkpoints"],
+                    forward["v"],
+                    [alpha, beta, delta],
+                    forward["dt"],
+                    R,
+                    self.flow_norm,
+                    dlog_time_scaling=[0, -1 / beta, 0],  # time_scaling ~ 1 / beta
+                    stats=memory_stats,
+                )
+                if memory_stats is not None:
+                    self.logger.debug(
+                        "Checkpointed adjoint memory: "
+                        + "    ".join(
+                            f"{k} = {b / 2 ** 20:.2f} MiB" for k, b in memory_stats.items()
+                        )
+                    )
+                return grad
+            return sensitivity_gradient(
+                forward["sol"],
+                forward["sens"],
+                R,
+                self.flow_norm,
+                x0,
+                init_t=(forward["time_scaling"] * vdp_init_t),
+                dlog_time_scaling=[0, -1 / beta, 0],  # time_scaling ~ 1 / beta
+            )
+
+    def _solve_adjoint(
+        self, alpha: float, beta: float, delta: float, forward: Dict, R: np.ndarray
+    ) -> List[np.ndarray]:
+        """ Solve the adjoint model backward for the normalized lagrange multipliers. """
+        # assimulo is only needed by the adjoint engine
+        from PhonationModeling.solvers.ode_solvers.dae_solver import DAESession
+
+        logger = self.logger
+        logger.info("Solving adjoint model")
+        options = self.options
+        X, dX = forward["X"], forward["dX"]
+
+        if options.model_backend == "python" or options.adjoint_interpolation == "hermite":
+            # coefficient tables, updated in place, and reused output buffers
+            if self._adjoint is None:
+                self._adjoint = AdjointModel(
+                    alpha, beta, delta, X, dX, R, self.sample_rate, 0,
+                    interpolation=options.adjoint_interpolation,
+                )
+            else:
+                self._adjoint.update(alpha, beta, delta, X, dX, R)
+            residual, jac = self._adjoint.residual, self._adjoint.jac
+        else:  # compiled nearest-sample closures
+            residual, jac = adjoint_model(
+                alpha, beta, delta, X, dX, R, self.sample_rate, 0, self.T,
+                backend=options.model_backend,
+            )
+        M_T = [0.0, 0.0, 0.0, 0.0]  # initial states of adjoint model at T
+        dM_T = [0.0, -R[-1], 0.0, -R[-1]]  # initial ddL = ddE = -R(T)
+        if self._adjoint_session is None:
+            self._adjoint_session = DAESession(
+                residual,
+                M_T,
+                dM_T,
+                self.T,
+                tfinal=0,  # simulate (tfinal-->t0)s backward
+                backward=True,
+                ncp=self.num_tsteps,
+                algvar=[0, 1, 0, 1],
+                suppress_alg=True,
+                atol=options.adjoint_atol,
+                rtol=options.adjoint_rtol,
+                jac=jac,
+                display_progress=True,
+                report_continuously=False,  # NOTE: report_continuously should be False
+                verbosity=50,
+                dtype=np.dtype(options.trajectory_dtype),
+            )
+        atol, rtol = self.tolerance.tolerances(options.adjoint_atol, options.adjoint_rtol)
+        stats = {}
+        with self.instrumentation.phase("adjoint"):
+            adjoint_sol = self._adjoint_session.solve(
+                M_T, dM_T, residual=residual, jac=jac, stats=stats, atol=atol, rtol=rtol
+            )
+        self.instrumentation.count("adjoint", stats)
+        self._count_solver_work("adjoint", stats)
+
+        # Compute adjoint lagrange multipliers
+        L = adjoint_sol[1][:, 0][::-1]  # reverse time 0 --> T
+        E = adjoint_sol[1][:, 2][::-1]
+        assert (len(L) == self.num_tsteps) and (len(E) == self.num_tsteps), "Size mismatch"
+        return L / np.linalg.norm(L), E / np.linalg.norm(E)  # normalize
+
+
+def estimate_parameters(
+    glottal_flow: np.ndarray,
+    sample_rate: int,
+    options: EstimatorOptions = EstimatorOptions(),
+    init_params: Optional[List[float]] = None,
+    rng: Optional[np.random.RandomState] = None,
+    logger: Optional[logging.Logger] = None,
+    name: str = "vocal_fold",
+) -> EstimationResult:
+    """ Estimate the vocal fold model parameters of a glottal flow.
+
+    Args:
+        glottal_flow: np.ndarray[float], shape (T,)
+            Target glottal flow, normalized.
+        sample_rate: int
+            Sample rate.
+        options: EstimatorOptions
+            Estimator options.
+        init_params: List[float]
+            Initial parameters [alpha, beta, delta]. Default: random, see VocalFoldEstimator.
+        rng: np.random.RandomState
+            Random state. Default: np.random.
+        logger: logging.Logger
+            Logger.
+        name: str
+            Name of the estimation.
+
+    Returns:
+        result: EstimationResult
+            Best result.
+    """
+    estimator = VocalFoldEstimator(
+        glottal_flow,
+        sample_rate,
+        options=options,
+        init_params=init_params,
+        rng=rng,
+        logger=logger,
+        name=name,
+    )
+    return estimator.run()
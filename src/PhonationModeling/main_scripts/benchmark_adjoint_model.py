@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+""" Benchmark the IDA adjoint solve with the nearest-sample adjoint_model closures vs. the
+AdjointModel tables, nearest and hermite: IDA steps, residual/jacobian calls (IDA
+statistics), wall time per solve, and the cosine of the normalized multiplier L to the
+closures'. Also compares repeated solves with dae_solver (setup per solve) vs. a DAESession
+(setup once, re-initialized per solve). Requires assimulo.
+
+Usage: python benchmark_adjoint_model.py [-fs 16000] [-T 0.2] [-n 5]
+"""
+import argparse
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import (
+    AdjointModel,
+    adjoint_model,
+)
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_coupled,
+    vdp_jacobian,
+)
+from PhonationModeling.solvers.ode_solvers.dae_solver import DAESession, dae_solver
+from PhonationModeling.solvers.ode_solvers.ode_solver import ode_solver
+
+
+def solve_adjoint(residual, jac, R, T, num_tsteps):
+    stats = {}
+    t = time.time()
+    _, y, _ = dae_solver(
+        residual,
+        [0.0, 0.0, 0.0, 0.0],
+        [0.0, -R[-1], 0.0, -R[-1]],
+        T,
+        tfinal=0,
+        backward=True,
+        ncp=num_tsteps,
+        solver="IDA",
+        algvar=[0, 1, 0, 1],
+        suppress_alg=True,
+        atol=1e-6,
+        rtol=1e-6,
+        usejac=True,
+        jac=jac,
+        display_progress=False,
+        verbosity=50,
+        stats=stats,
+    )
+    ms = (time.time() - t) * 1e3
+    L = np.asarray(y)[::-1, 0]
+    return stats, ms, L / np.linalg.norm(L)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-fs", "--sample_rate", type=int, default=16000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=0.2, help="duration in seconds")
+    parser.add_argument("-n", "--num_solves", type=int, default=5, help="number of repeated solves")
+    args = parser.parse_args()
+
+    alpha, beta, delta = 0.5, 0.2, 0.8
+    sample_rate = args.sample_rate
+    num_tsteps = int(args.duration * sample_rate)
+    T = num_tsteps / float(sample_rate)
+    time_scaling = 100 / (beta * 0.5)  # sqrt(K / M)
+
+    sol = ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        [alpha, beta, delta],
+        [0.0, 0.1, 0.0, 0.1],
+        0.0,
+        dt=(time_scaling / float(sample_rate)),
+        dense=True,
+        num_tsteps=num_tsteps,
+    )
+    X = sol[:, [1, 3]]
+    dX = sol[:, [2, 4]]
+    v = np.sum(X, axis=1) + 0.2
+    R = v / np.linalg.norm(v) - np.sin(np.linspace(0, 40 * np.pi, num_tsteps)) / np.sqrt(
+        num_tsteps / 2
+    )
+
+    variants = OrderedDict()
+    variants["closures"] = adjoint_model(alpha, beta, delta, X, dX, R, sample_rate, 0, T)
+    for interpolation in ["nearest", "hermite"]:
+        model = AdjointModel(
+            alpha, beta, delta, X, dX, R, sample_rate, 0, interpolation=interpolation
+        )
+        variants[interpolation] = (model.residual, model.jac)
+    solves = OrderedDict(
+        (name, solve_adjoint(residual, jac, R, T, num_tsteps))
+        for name, (residual, jac) in variants.items()
+    )
+
+    L_closures = solves["closures"][2]
+    table = OrderedDict()
+    for name, (stats, ms, L) in solves.items():
+        table[name] = OrderedDict(
+            [
+                ("IDA steps", stats["nsteps"]),
+                ("error test failures", stats["nerrfails"]),
+                ("residual calls", stats["nfcns"]),
+                ("jacobian calls", stats["njacs"]),
+                ("wall time (ms)", ms),
+                ("L cosine to closures", np.dot(L, L_closures)),
+            ]
+        )
+    print(f"{'':24s}" + "".join(f"{name:>12s}" for name in table))
+    for row in table["closures"]:
+        print(f"{row:24s}" + "".join(f"{column[row]:12.4g}" for column in table.values()))
+
+    # Repeated solves, as in the optimizer iterations
+    t = time.time()
+    for _ in range(args.num_solves):
+        model.update(alpha, beta, delta, X, dX, R)
+        solve_adjoint(model.residual, model.jac, R, T, num_tsteps)
+    ms_function = (time.time() - t) * 1e3
+
+    t = time.time()
+    session = DAESession(
+        model.residual,
+        [0.0, 0.0, 0.0, 0.0],
+        [0.0, -R[-1], 0.0, -R[-1]],
+        T,
+        tfinal=0,
+        backward=True,
+        ncp=num_tsteps,
+        algvar=[0, 1, 0, 1],
+        suppress_alg=True,
+        jac=model.jac,
+        verbosity=50,
+    )
+    for _ in range(args.num_solves):
+        model.update(alpha, beta, delta, X, dX, R)
+        session.solve([0.0, 0.0, 0.0, 0.0], [0.0, -R[-1], 0.0, -R[-1]])
+    ms_session = (time.time() - t) * 1e3
+
+    print(
+        f"\n{args.num_solves:d} solves: dae_solver {ms_function:.1f} ms    "
+        f"DAESession {ms_session:.1f} ms"
+    )
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+""" Benchmark the checkpointed discrete adjoint vs. the discrete adjoint over the stored
+trajectory: wall time and traced peak memory of forward + gradient, for sizing workers.
+
+Usage: python benchmark_checkpointing.py [-fs 16000] [-T 3.0] [-K 0 4 16 64]
+(K = 0 uses the default segment length)
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import vdp_init_state, x0
+from PhonationModeling.solvers.ode_solvers.checkpointing import (
+    checkpointed_adjoint_gradient,
+    checkpointed_rk4_solver,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import (
+    discrete_adjoint_gradient,
+    rk4_solver,
+)
+
+
+def stored_engine(params, dt, glottal_flow):
+    sol = rk4_solver(params, vdp_init_state, 0.0, dt, len(glottal_flow))
+    v = sol[:, 1] + sol[:, 3] + 2 * x0
+    R = v / np.linalg.norm(v) - glottal_flow
+    return discrete_adjoint_gradient(sol, params, vdp_init_state, dt, R, 1.0, x0)
+
+
+def checkpointed_engine(params, dt, glottal_flow, num_checkpoints):
+    checkpoints, v = checkpointed_rk4_solver(
+        params, vdp_init_state, dt, len(glottal_flow), x0, num_checkpoints
+    )
+    R = v / np.linalg.norm(v) - glottal_flow
+    return checkpointed_adjoint_gradient(checkpoints, v, params, dt, R, 1.0)
+
+
+def measure(engine, *args):
+    tracemalloc.start()
+    t = time.time()
+    grad = engine(*args)
+    elapsed = (time.time() - t) * 1e3
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return grad, elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-fs", "--sample_rate", type=int, default=16000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=3.0, help="duration in seconds")
+    parser.add_argument(
+        "-K", "--num_checkpoints", type=int, nargs="+", default=[0, 4, 16, 64], help="checkpoints"
+    )
+    args = parser.parse_args()
+
+    params = [0.5, 0.25, 0.7]
+    num_tsteps = int(args.duration * args.sample_rate)
+    dt = 100 / (params[1] * 0.5) / float(args.sample_rate)
+    glottal_flow = np.sin(np.linspace(0, 2 * np.pi * 120 * args.duration, num_tsteps))
+    glottal_flow = glottal_flow / np.linalg.norm(glottal_flow)
+
+    stored_engine(params, dt, glottal_flow[:16])  # compile the kernels
+    grad_ref, elapsed, peak = measure(stored_engine, params, dt, glottal_flow)
+    print(f"{'mode':16s}{'time (ms)':>12s}{'peak (MiB)':>12s}{'max |grad error|':>18s}")
+    print(f"{'stored':16s}{elapsed:12.1f}{peak:12.2f}{0:18.2e}")
+    for K in args.num_checkpoints:
+        grad, elapsed, peak = measure(
+            checkpointed_engine, params, dt, glottal_flow, (K if K > 0 else None)
+        )
+        name = f"K = {K}" if K > 0 else "K = default"
+        print(f"{name:16s}{elapsed:12.1f}{peak:12.2f}{np.max(np.abs(grad - grad_ref)):18.2e}")
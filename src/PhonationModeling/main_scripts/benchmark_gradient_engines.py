@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+""" Benchmark the gradient engines of the vocal fold parameter estimation: forward
+sensitivities vs. backward adjoint (IDA), for wall time and gradient agreement.
+A synthetic glottal flow is generated from known parameters, and gradients are evaluated
+at perturbed parameters. Central finite differences of the loss serve as reference.
+
+Usage: python benchmark_gradient_engines.py [-fs 16000] [-T 0.1] [-n 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import adjoint_model
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_coupled,
+    vdp_init_state,
+    vdp_jacobian,
+    vdp_param_jacobian,
+    x0,
+)
+from PhonationModeling.solvers.gradients import adjoint_gradient, sensitivity_gradient
+from PhonationModeling.solvers.ode_solvers.ode_solver import ode_solver
+from PhonationModeling.solvers.ode_solvers.sensitivity_solver import sensitivity_solver
+
+
+def forward(params, sample_rate, num_tsteps):
+    """ Solve the displacement model on the sample grid. """
+    time_scaling = B / (params[1] * M)
+    return ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        params,
+        vdp_init_state,
+        0.0,
+        dt=(time_scaling / float(sample_rate)),
+        dense=True,
+        num_tsteps=num_tsteps,
+    )
+
+
+def residual(sol, glottal_flow):
+    """ Estimation residual of the normalized glottal flow. """
+    v = sol[:, 1] + sol[:, 3] + 2 * x0
+    return v / np.linalg.norm(v) * np.linalg.norm(glottal_flow) - glottal_flow
+
+
+def loss(params, glottal_flow, sample_rate):
+    R = residual(forward(params, sample_rate, len(glottal_flow)), glottal_flow)
+    return 0.5 * np.dot(R, R)
+
+
+def sensitivity_engine(params, glottal_flow, sample_rate):
+    time_scaling = B / (params[1] * M)
+    sol, sens = sensitivity_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        vdp_param_jacobian,
+        params,
+        vdp_init_state,
+        0.0,
+        dt=(time_scaling / float(sample_rate)),
+        num_tsteps=len(glottal_flow),
+    )
+    R = residual(sol, glottal_flow)
+    return sensitivity_gradient(
+        sol,
+        sens,
+        R,
+        np.linalg.norm(glottal_flow),
+        x0,
+        dlog_time_scaling=[0, -1 / params[1], 0],
+    )
+
+
+def adjoint_engine(params, glottal_flow, sample_rate):
+    from PhonationModeling.solvers.ode_solvers.dae_solver import dae_solver
+
+    sol = forward(params, sample_rate, len(glottal_flow))
+    R = residual(sol, glottal_flow)
+    X = sol[:, [1, 3]]
+    dX = sol[:, [2, 4]]
+    T = len(glottal_flow) / float(sample_rate)
+    res, jac = adjoint_model(*params, X, dX, R, sample_rate, 0, T)
+    adjoint_sol = dae_solver(
+        res,
+        [0.0, 0.0, 0.0, 0.0],
+        [0.0, -R[-1], 0.0, -R[-1]],
+        T,
+        tfinal=0,
+        backward=True,
+        ncp=len(glottal_flow),
+        solver="IDA",
+        algvar=[0, 1, 0, 1],
+        suppress_alg=True,
+        usejac=True,
+        jac=jac,
+        display_progress=False,
+        verbosity=50,
+    )
+    L = adjoint_sol[1][:, 0][::-1]
+    E = adjoint_sol[1][:, 2][::-1]
+    return adjoint_gradient(X, dX, L / np.linalg.norm(L), E / np.linalg.norm(E))
+
+
+def cosine(a, b):
+    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-fs", "--sample_rate", type=int, default=16000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=0.1, help="duration in seconds")
+    parser.add_argument("-n", "--num_trials", type=int, default=5, help="number of trials")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    sample_rate = args.sample_rate
+    num_tsteps = int(args.duration * sample_rate)
+    true_params = np.array([0.5, 0.25, 0.7])
+    sol = forward(true_params, sample_rate, num_tsteps)
+    glottal_flow = sol[:, 1] + sol[:, 3] + 2 * x0
+    glottal_flow = glottal_flow / np.linalg.norm(glottal_flow)
+
+    engines = {"sensitivity": sensitivity_engine, "adjoint": adjoint_engine}
+    print(f"{'engine':12s}{'trial':>6s}{'time (ms)':>12s}{'cos(grad, fd)':>16s}")
+    for k in range(args.num_trials):
+        params = true_params * (1 + 0.2 * rng.uniform(-1, 1, 3))
+
+        h = 1e-6
+        fd_grad = np.array(
+            [
+                (
+                    loss(params + h * e, glottal_flow, sample_rate)
+                    - loss(params - h * e, glottal_flow, sample_rate)
+                )
+                / (2 * h)
+                for e in np.eye(3)
+            ]
+        )
+
+        for name, engine in engines.items():
+            try:
+                t = time.time()
+                grad = engine(params, glottal_flow, sample_rate)
+                elapsed = (time.time() - t) * 1e3
+            except ImportError as e:
+                print(f"{name:12s}{k:6d}  skipped: {e}")
+                continue
+            print(f"{name:12s}{k:6d}{elapsed:12.1f}{cosine(grad, fd_grad):16.6f}")
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+""" Benchmark the python and numba kernel backends of the vocal fold displacement model
+and its adjoint, per call and per solve.
+
+Usage: python benchmark_jit_kernels.py [-fs 16000] [-T 0.2] [-n 10000]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import adjoint_model
+from PhonationModeling.models.vocal_fold.jit_kernels import HAS_NUMBA, get_vdp_kernels
+from PhonationModeling.solvers.ode_solvers.ode_solver import ode_solver
+
+
+def time_per_call(func, args, number):
+    """ Best-of-3 time per call in microseconds. """
+    return min(timeit.repeat(lambda: func(*args), number=number, repeat=3)) / number * 1e6
+
+
+def time_per_solve(func, number=3):
+    """ Best-of-n time per solve in milliseconds. """
+    return min(timeit.repeat(func, number=1, repeat=number)) * 1e3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-fs", "--sample_rate", type=int, default=16000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=0.2, help="duration in seconds")
+    parser.add_argument("-n", "--number", type=int, default=10000, help="calls per timing")
+    args = parser.parse_args()
+
+    if not HAS_NUMBA:
+        print("numba is not available, the numba backend falls back to python")
+
+    alpha, beta, delta = 0.5, 0.2, 0.8
+    sample_rate = args.sample_rate
+    num_tsteps = int(args.duration * sample_rate)
+    T = num_tsteps / float(sample_rate)
+    time_scaling = 100 / (beta * 0.5)  # sqrt(K / M)
+    vdp_init_state = [0.0, 0.1, 0.0, 0.1]
+
+    # Forward solution shared by the adjoint benchmarks
+    vdp_coupled, vdp_jacobian = get_vdp_kernels("python")
+    sol = ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        [alpha, beta, delta],
+        vdp_init_state,
+        0.0,
+        dt=(time_scaling / float(sample_rate)),
+        tmax=(time_scaling * T),
+        dense=True,
+        num_tsteps=num_tsteps,
+    )
+    X = sol[:, [1, 3]]
+    dX = sol[:, [2, 4]]
+    R = np.sin(np.arange(num_tsteps) / 10.0) * 1e-2
+    Z = np.array([0.1, 0.2, -0.1, 0.3])
+    M = np.array([0.1, 0.2, 0.3, 0.4])
+    t = T / 2
+
+    results = {}
+    for backend in ["python", "numba"]:
+        model, model_jacobian = get_vdp_kernels(backend)
+        residual, jac = adjoint_model(
+            alpha, beta, delta, X, dX, R, sample_rate, 0, T, backend=backend
+        )
+        # Compile
+        model(0.0, Z, alpha, beta, delta)
+        model_jacobian(0.0, Z, alpha, beta, delta)
+        residual(t, M, M)
+        jac(1.0, t, M, M)
+
+        results[backend] = {
+            "vdp_coupled (us/call)": time_per_call(
+                model, (0.0, Z, alpha, beta, delta), args.number
+            ),
+            "vdp_jacobian (us/call)": time_per_call(
+                model_jacobian, (0.0, Z, alpha, beta, delta), args.number
+            ),
+            "adjoint residual (us/call)": time_per_call(residual, (t, M, M), args.number),
+            "adjoint jac (us/call)": time_per_call(jac, (1.0, t, M, M), args.number),
+            "forward lsoda solve (ms/solve)": time_per_solve(
+                lambda: ode_solver(
+                    model,
+                    model_jacobian,
+                    [alpha, beta, delta],
+                    vdp_init_state,
+                    0.0,
+                    dt=(time_scaling / float(sample_rate)),
+                    tmax=(time_scaling * T),
+                    dense=True,
+                    num_tsteps=num_tsteps,
+                )
+            ),
+        }
+
+        try:
+            from PhonationModeling.solvers.ode_solvers.dae_solver import dae_solver
+
+            results[backend]["adjoint IDA solve (ms/solve)"] = time_per_solve(
+                lambda: dae_solver(
+                    residual,
+                    [0.0, 0.0, 0.0, 0.0],
+                    [0.0, -R[-1], 0.0, -R[-1]],
+                    T,
+                    tfinal=0,
+                    backward=True,
+                    ncp=num_tsteps,
+                    solver="IDA",
+                    algvar=[0, 1, 0, 1],
+                    suppress_alg=True,
+                    usejac=True,
+                    jac=jac,
+                    display_progress=False,
+                    verbosity=50,
+                )
+            )
+        except ImportError as e:
+            print(f"Skip adjoint solve benchmark: {e}")
+
+    print(f"{'':32s}{'python':>12s}{'numba':>12s}{'speedup':>10s}")
+    for key in results["python"]:
+        py, nb = results["python"][key], results["numba"][key]
+        print(f"{key:32s}{py:12.3f}{nb:12.3f}{py / nb:9.1f}x")
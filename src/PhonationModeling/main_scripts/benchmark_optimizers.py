@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+""" Benchmark the optimizers of the vocal fold parameter estimation: the patience scheme
+(normalized gradient steps of fixed size and random orthogonal restarts), with fixed or
+backtracking step control, vs. projected L-BFGS with the unnormalized gradient, for
+forward/gradient solves to convergence.
+A synthetic glottal flow is generated from known parameters, and all optimizers start from
+the same random initial parameters of each trial.
+
+Usage: python benchmark_optimizers.py [-fs 8000] [-T 0.2] [-n 5] [-p 50] [-e discrete_adjoint]
+                                      [-q 1]
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from PhonationModeling.estimation.vocal_fold_estimator import (
+    EstimatorOptions,
+    VocalFoldEstimator,
+)
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_init_state,
+    x0,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import rk4_solver
+
+
+def run(glottal_flow, sample_rate, options, init_params, seed):
+    estimator = VocalFoldEstimator(
+        glottal_flow,
+        sample_rate,
+        options=options,
+        init_params=init_params,
+        rng=np.random.RandomState(seed),
+        logger=logging.getLogger("benchmark"),
+    )
+    t = time.time()
+    result = estimator.run()
+    elapsed = time.time() - t
+    return result, estimator.num_forward_solves, estimator.num_gradient_solves, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-fs", "--sample_rate", type=int, default=8000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=0.2, help="duration in seconds")
+    parser.add_argument("-n", "--num_trials", type=int, default=5, help="number of trials")
+    parser.add_argument("-p", "--patience", type=int, default=50, help="optim patience")
+    parser.add_argument(
+        "-e", "--gradient_engine", default="discrete_adjoint", help="exact gradient engine"
+    )
+    parser.add_argument(
+        "-q", "--decimation", type=int, default=1, help="decimation of the coarse phase"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    sample_rate = args.sample_rate
+    num_tsteps = int(args.duration * sample_rate)
+    true_params = np.array([0.5, 0.25, 0.7])
+    time_scaling = B / (true_params[1] * M)
+    sol = rk4_solver(true_params, vdp_init_state, 0.0, time_scaling / sample_rate, num_tsteps)
+    glottal_flow = sol[:, 1] + sol[:, 3] + 2 * x0
+    glottal_flow = glottal_flow / np.linalg.norm(glottal_flow)
+
+    optimizers = {
+        "patience": EstimatorOptions(
+            optim_patience=args.patience,
+            gradient_engine=args.gradient_engine,
+            decimation=args.decimation,
+        ),
+        "backtrack": EstimatorOptions(
+            optim_patience=args.patience,
+            gradient_engine=args.gradient_engine,
+            step_control="backtracking",
+            decimation=args.decimation,
+        ),
+        "lbfgsb": EstimatorOptions(
+            optim_patience=args.patience,
+            gradient_engine=args.gradient_engine,
+            optimizer="lbfgsb",
+            decimation=args.decimation,
+        ),
+    }
+    print(
+        f"{'optimizer':10s}{'trial':>6s}{'forward':>9s}{'gradient':>10s}{'to best':>9s}"
+        f"{'time (s)':>10s}{'L2 residual':>13s}{'|param error|':>15s}"
+    )
+    for k in range(args.num_trials):
+        delta = rng.uniform(0.2, 1.0)
+        init_params = [0.6 * delta, 0.2, delta]
+        for name, options in optimizers.items():
+            result, num_forward, num_gradient, elapsed = run(
+                glottal_flow, sample_rate, options, init_params, args.seed + k
+            )
+            estimate = np.array([result.alpha, result.beta, result.delta])
+            error = np.linalg.norm(estimate - true_params)
+            print(
+                f"{name:10s}{k:6d}{num_forward:9d}{num_gradient:10d}{result.iteration + 1:9d}"
+                f"{elapsed:10.2f}{result.Rk:13.6f}{error:15.6f}"
+            )
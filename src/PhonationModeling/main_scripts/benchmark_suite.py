@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+""" Synthetic ground truth benchmark suite of the end-to-end estimator.
+
+run: glottal flows are generated by the displacement model from known parameters, at several
+segment lengths and sample rates, and estimated with the estimator options of run_e2e.py (from
+its configure file, if given) and fixed seeds. Per case, the wall time, forward and gradient
+(adjoint) solves, time and solves to the residual threshold, final residual and parameter
+error are written to a JSON results file. The estimation is deterministic, so repeated runs only
+differ in time, and the minimum times over the repeats are kept.
+
+compare: match the cases of a baseline and a candidate results file, print the ratios and
+flag the regressions beyond the tolerances. Times shorter than min_time are too noisy to be
+flagged. Exits with status 1 on regression.
+
+Usage: python benchmark_suite.py run -o results.json [-cf configure.json] [-e discrete_adjoint]
+                                     [-fs 8000 16000] [-T 0.1 0.2] [-p 100] [-r 0.05] [-n 3]
+                                     [-s 0]
+       python benchmark_suite.py compare baseline.json candidate.json [-t 0.1] [-a 0.05]
+                                         [-m 0.5]
+"""
+import argparse
+import datetime
+import json
+import logging
+import platform
+import sys
+import time
+
+import numpy as np
+
+from PhonationModeling.estimation.parallel import file_rng
+from PhonationModeling.estimation.vocal_fold_estimator import (
+    EstimatorOptions,
+    VocalFoldEstimator,
+)
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_init_state,
+    x0,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import rk4_solver
+
+TRUE_PARAMS = [[0.5, 0.25, 0.7], [0.3, 0.4, 0.5], [0.8, 0.3, 1.0]]  # oscillating
+
+# Compared metrics: lower is better; relative tolerance for costs, absolute for accuracy
+COST_METRICS = ["wall_time", "num_forward_solves", "num_gradient_solves", "time_to_threshold"]
+TIME_METRICS = ["wall_time", "time_to_threshold"]
+ACCURACY_METRICS = ["Rk", "param_error"]
+
+
+def synthetic_glottal_flow(params, sample_rate, duration):
+    """ Normalized glottal flow of the displacement model. """
+    num_tsteps = int(duration * sample_rate)
+    time_scaling = B / (params[1] * M)
+    sol = rk4_solver(params, vdp_init_state, 0.0, time_scaling / sample_rate, num_tsteps)
+    glottal_flow = sol[:, 1] + sol[:, 3] + 2 * x0
+    return glottal_flow / np.linalg.norm(glottal_flow)
+
+
+def run_case(name, params, sample_rate, duration, options, threshold, seed):
+    """ Estimate a synthetic glottal flow, from the case's seeded random initial parameters. """
+    glottal_flow = synthetic_glottal_flow(params, sample_rate, duration)
+    estimator = VocalFoldEstimator(
+        glottal_flow,
+        sample_rate,
+        options=options,
+        rng=file_rng(name, seed),
+        logger=logging.getLogger("benchmark"),
+        name=name,
+    )
+    time_to_threshold, solves_to_threshold = None, None
+    t = time.perf_counter()
+    try:
+        while not estimator.done:
+            estimator.step()
+            if time_to_threshold is None and estimator.Rk_best <= threshold:
+                time_to_threshold = time.perf_counter() - t
+                solves_to_threshold = estimator.num_forward_solves
+        wall_time = time.perf_counter() - t
+        result = estimator.result()
+    finally:
+        estimator.close()
+
+    estimate = np.array([result.alpha, result.beta, result.delta])
+    return dict(
+        case=name,
+        sample_rate=sample_rate,
+        duration=duration,
+        true_params=list(params),
+        estimated_params=estimate.tolist(),
+        wall_time=wall_time,
+        num_iterations=estimator.iteration,
+        num_forward_solves=estimator.num_forward_solves,
+        num_gradient_solves=estimator.num_gradient_solves,
+        time_to_threshold=time_to_threshold,
+        solves_to_threshold=solves_to_threshold,
+        Rk=float(result.Rk),
+        param_error=float(np.linalg.norm(estimate - np.array(params))),
+    )
+
+
+def run(args):
+    configs = {}
+    if args.configure_file is not None:
+        with open(args.configure_file) as f:
+            configs = json.load(f)
+    step_size = configs.get("step_size", EstimatorOptions().step_size)
+    overrides = {}
+    if args.gradient_engine is not None:
+        overrides["gradient_engine"] = args.gradient_engine
+    if args.patience is not None:
+        overrides["optim_patience"] = args.patience
+    options = EstimatorOptions.from_configs(
+        configs,
+        adjust_radius=2 * step_size,  # as run_e2e.py
+        adjust_distribution="uniform",
+        orthogonalize_to="gradient",
+        trajectory_dir=None,
+        **overrides,
+    )
+
+    cases = []
+    for sample_rate in args.sample_rates:
+        for duration in args.durations:
+            for k, params in enumerate(TRUE_PARAMS):
+                name = f"p{k:d}_fs{sample_rate:d}_T{duration:g}"
+                repeats = [
+                    run_case(
+                        name, params, sample_rate, duration, options, args.threshold, args.seed
+                    )
+                    for _ in range(args.repeats)
+                ]
+                case = repeats[0]
+                for metric in TIME_METRICS:
+                    if case[metric] is not None:
+                        case[metric] = min(r[metric] for r in repeats)
+                print(
+                    f"{name:20s}{case['wall_time']:9.2f} s{case['num_forward_solves']:6d} fwd"
+                    f"{case['num_gradient_solves']:6d} grad   Rk = {case['Rk']:.4f}   "
+                    f"|param error| = {case['param_error']:.4f}"
+                )
+                cases.append(case)
+
+    results = dict(
+        meta=dict(
+            date=datetime.datetime.now().isoformat(),
+            python=platform.python_version(),
+            numpy=np.__version__,
+            platform=platform.platform(),
+            seed=args.seed,
+            threshold=args.threshold,
+            repeats=args.repeats,
+            options=options._asdict(),
+        ),
+        cases=cases,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = {case["case"]: case for case in json.load(f)["cases"]}
+    with open(args.candidate) as f:
+        candidate = {case["case"]: case for case in json.load(f)["cases"]}
+
+    regressions = []
+    print(
+        f"{'case':20s}"
+        + "".join(f"{metric:>22s}" for metric in COST_METRICS + ACCURACY_METRICS)
+    )
+    for name in baseline:
+        if name not in candidate:
+            print(f"{name:20s} missing in candidate")
+            continue
+        base, cand = baseline[name], candidate[name]
+        columns = []
+        for metric in COST_METRICS:  # ratio candidate / baseline
+            b, c = base[metric], cand[metric]
+            if b is None or c is None:  # threshold not reached
+                columns.append(f"{str(b)} -> {str(c)}")
+                if b is not None:
+                    regressions.append(f"{name}: {metric} threshold no longer reached")
+                continue
+            ratio = c / max(b, 1e-12)
+            flag = ratio > 1 + args.rtol and (metric not in TIME_METRICS or b >= args.min_time)
+            columns.append(f"{'!' if flag else ''}{ratio:.2f}x")
+            if flag:
+                regressions.append(f"{name}: {metric} {b:.4g} -> {c:.4g} ({ratio:.2f}x)")
+        for metric in ACCURACY_METRICS:  # difference candidate - baseline
+            b, c = base[metric], cand[metric]
+            flag = c - b > args.atol
+            columns.append(f"{'!' if flag else ''}{c - b:+.4f}")
+            if flag:
+                regressions.append(f"{name}: {metric} {b:.4f} -> {c:.4f}")
+        print(f"{name:20s}" + "".join(f"{column:>22s}" for column in columns))
+
+    if regressions:
+        print(f"{len(regressions):d} regressions:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+    print("No regression")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = subparsers.add_parser("run", help="run the benchmark suite")
+    parser_run.add_argument("-o", "--output", required=True, help="output results .json file")
+    parser_run.add_argument(
+        "-cf", "--configure_file", help="run_e2e configure file of the estimator options"
+    )
+    parser_run.add_argument("-e", "--gradient_engine", help="override the gradient engine")
+    parser_run.add_argument("-p", "--patience", type=int, help="override the optim patience")
+    parser_run.add_argument(
+        "-fs", "--sample_rates", type=int, nargs="+", default=[8000, 16000], help="sample rates"
+    )
+    parser_run.add_argument(
+        "-T", "--durations", type=float, nargs="+", default=[0.1, 0.2], help="durations in s"
+    )
+    parser_run.add_argument(
+        "-r", "--threshold", type=float, default=0.05, help="L2 residual threshold"
+    )
+    parser_run.add_argument(
+        "-n", "--repeats", type=int, default=3, help="number of timed repeats of each case"
+    )
+    parser_run.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    parser_run.set_defaults(func=run)
+
+    parser_compare = subparsers.add_parser("compare", help="compare two results files")
+    parser_compare.add_argument("baseline", help="baseline results .json file")
+    parser_compare.add_argument("candidate", help="candidate results .json file")
+    parser_compare.add_argument(
+        "-t", "--rtol", type=float, default=0.1, help="relative tolerance of the costs"
+    )
+    parser_compare.add_argument(
+        "-a", "--atol", type=float, default=0.05, help="absolute tolerance of Rk, param error"
+    )
+    parser_compare.add_argument(
+        "-m", "--min_time", type=float, default=0.5, help="shortest time in s to be compared"
+    )
+    parser_compare.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
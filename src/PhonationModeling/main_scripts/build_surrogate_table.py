@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+""" Build the surrogate lookup table of the initial parameters offline: simulate the vocal
+fold displacement model over an (alpha, beta, delta) grid and save the descriptors of the
+oscillating glottal flows with their parameters. Set "surrogate_table" of the configure file
+to the output to initialize the estimation from the table.
+
+Usage: python build_surrogate_table.py -o surrogate_table.npz [-fs 16000] [-T 0.2]
+                                       [-a 0.05 1.5 16] [-b 0.1 1.0 12] [-d 0.05 2.0 16]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from PhonationModeling.estimation.surrogate import DescriptorOptions, SurrogateTable
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output", required=True, help="output .npz file")
+    parser.add_argument("-fs", "--sample_rate", type=int, default=16000, help="sample rate")
+    parser.add_argument("-T", "--duration", type=float, default=0.2, help="duration in seconds")
+    parser.add_argument(
+        "-a", "--alpha", type=float, nargs=3, default=[0.05, 1.5, 16], help="alpha: min max num"
+    )
+    parser.add_argument(
+        "-b", "--beta", type=float, nargs=3, default=[0.1, 1.0, 12], help="beta: min max num"
+    )
+    parser.add_argument(
+        "-d", "--delta", type=float, nargs=3, default=[0.05, 2.0, 16], help="delta: min max num"
+    )
+    parser.add_argument(
+        "-t", "--transient", type=float, default=0.5, help="fraction discarded as transient"
+    )
+    args = parser.parse_args()
+
+    grids = [np.linspace(lo, hi, int(num)) for lo, hi, num in (args.alpha, args.beta, args.delta)]
+    t = time.time()
+    table = SurrogateTable.build(
+        *grids,
+        sample_rate=args.sample_rate,
+        duration=args.duration,
+        transient=args.transient,
+        options=DescriptorOptions(),
+    )
+    print(
+        f"{len(table):d} oscillating entries of {np.prod([len(g) for g in grids]):d} grid points "
+        f"in {time.time() - t:.1f} s"
+    )
+    table.save(args.output)
+    print(f"Saved to {args.output}")
@@ -7,49 +7,80 @@ import numpy as np
 from matplotlib import pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
-
-def get_experiment_result(pkl_dir, pkl_filelist):
-    # Collect experiment results
+from PhonationModeling.estimation.results_store import load_scalars
+
+
+def read_pickle_results(pkl_file):
+    # Legacy pickle of the per-file best results dicts
+    wav_files = []
+    params = []
+    alphas = []
+    betas = []
+    deltas = []
+    residuals = []
+    try:
+        with open(pkl_file, "rb") as f:
+            results = pickle.load(f)
+    except OSError as e:
+        print(f"OS error: {e}")
+        print(f"Failed to load {pkl_file}")
+        return wav_files, params, alphas, betas, deltas, residuals
+
+    for wf in results:
+        try:
+            assert ("alpha" in results[wf]) and (results[wf]["alpha"])
+
+            alpha = results[wf]["alpha"][0]
+            beta = results[wf]["beta"][0]
+            delta = results[wf]["delta"][0]
+            r = results[wf]["Rk"][0]
+
+            wav_files.append(wf)
+            params.append([alpha, beta, delta])
+            alphas.append(alpha)
+            betas.append(beta)
+            deltas.append(delta)
+            residuals.append(r)
+
+        except AssertionError as e:
+            print(e)
+            print(f"Skip {wf}")
+            continue
+
+    return wav_files, params, alphas, betas, deltas, residuals
+
+
+def read_store_results(store_dir, config_hash=None):
+    # Results store: only the scalar table is read, not the per-file arrays. Only the rows of
+    # one configuration are read, by default the configuration of the last stored row
+    scalars = load_scalars(store_dir)
+    if config_hash is None and len(scalars["config_hash"]):
+        config_hash = scalars["config_hash"][-1]
+    rows = scalars["config_hash"] == config_hash
+    alphas = scalars["alpha"][rows].tolist()
+    betas = scalars["beta"][rows].tolist()
+    deltas = scalars["delta"][rows].tolist()
+    params = [list(p) for p in zip(alphas, betas, deltas)]
+    residuals = scalars["Rk"][rows].tolist()
+    return scalars["name"][rows].tolist(), params, alphas, betas, deltas, residuals
+
+
+def get_experiment_result(pkl_dir, pkl_filelist, config_hash=None):
+    # Collect experiment results: results stores (<name>.store, or <name>.store.<date>[.<k>] of
+    # the runs that did not overwrite an existing store) or legacy pkl files
     pkl_lst = [l.rstrip() for l in open(pkl_filelist)]
 
     results_collection = dict()
     for pf in pkl_lst:
-        step_size = pf.rstrip(".pkl").split("_")[-1]
-
         pkl_file = os.path.join(pkl_dir, pf)
-        try:
-            with open(pkl_file, "rb") as f:
-                results = pickle.load(f)
-        except OSError as e:
-            print(f"OS error: {e}")
-            print(f"Failed to load {pkl_file}")
-
-        wav_files = []
-        params = []
-        alphas = []
-        betas = []
-        deltas = []
-        residuals = []
-        for wf in results:
-            try:
-                assert ("alpha" in results[wf]) and (results[wf]["alpha"])
-
-                alpha = results[wf]["alpha"][0]
-                beta = results[wf]["beta"][0]
-                delta = results[wf]["delta"][0]
-                r = results[wf]["Rk"][0]
-
-                wav_files.append(wf)
-                params.append([alpha, beta, delta])
-                alphas.append(alpha)
-                betas.append(beta)
-                deltas.append(delta)
-                residuals.append(r)
-
-            except AssertionError as e:
-                print(e)
-                print(f"Skip {wf}")
-                continue
+        if os.path.isdir(pkl_file):
+            step_size = pf.rstrip("/").split(".store")[0].split("_")[-1]
+            wav_files, params, alphas, betas, deltas, residuals = read_store_results(
+                pkl_file, config_hash
+            )
+        else:
+            step_size = pf.rstrip(".pkl").split("_")[-1]
+            wav_files, params, alphas, betas, deltas, residuals = read_pickle_results(pkl_file)
 
         results_collection[pf] = {
             "step_size": step_size,
@@ -61,27 +92,33 @@ def get_experiment_result(pkl_dir, pkl_filelist):
             "residuals": residuals,
         }
 
-    # Find best param settings across experiments
+    # Find best param settings across experiments, rows aligned by wav file: the union of the
+    # wav files of the experiments, NaN where an experiment has no result
+    wav_files = list(
+        dict.fromkeys(wf for pf in results_collection for wf in results_collection[pf]["wav_files"])
+    )
+    row = {wf: i for i, wf in enumerate(wav_files)}
     num_pf = len(pkl_lst)
-    num_wf = len(results)
+    num_wf = len(wav_files)
 
-    r_mat = np.empty((num_wf, num_pf))
-    a_mat = np.empty((num_wf, num_pf))
-    b_mat = np.empty((num_wf, num_pf))
-    d_mat = np.empty((num_wf, num_pf))
+    r_mat = np.full((num_wf, num_pf), np.nan)
+    a_mat = np.full((num_wf, num_pf), np.nan)
+    b_mat = np.full((num_wf, num_pf), np.nan)
+    d_mat = np.full((num_wf, num_pf), np.nan)
 
     for k, pf in enumerate(results_collection):
-        for i, wf in enumerate(results_collection[pf]["wav_files"]):
-            r_mat[i, k] = results_collection[pf]["residuals"][i]
-            a_mat[i, k] = results_collection[pf]["alphas"][i]
-            b_mat[i, k] = results_collection[pf]["betas"][i]
-            d_mat[i, k] = results_collection[pf]["deltas"][i]
+        for j, wf in enumerate(results_collection[pf]["wav_files"]):
+            i = row[wf]
+            r_mat[i, k] = results_collection[pf]["residuals"][j]
+            a_mat[i, k] = results_collection[pf]["alphas"][j]
+            b_mat[i, k] = results_collection[pf]["betas"][j]
+            d_mat[i, k] = results_collection[pf]["deltas"][j]
 
     alphas_best = np.empty((num_wf,))
     betas_best = np.empty((num_wf,))
     deltas_best = np.empty((num_wf,))
 
-    idx = np.argmin(r_mat, axis=1)
+    idx = np.nanargmin(r_mat, axis=1) if num_wf else []
     for i, k in enumerate(idx):
         alphas_best[i] = a_mat[i, k]
         betas_best[i] = b_mat[i, k]
@@ -101,6 +138,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "-pf", "--pkl_filelist", nargs="+", required=True, help="list of pkl files"
     )
+    parser.add_argument(
+        "-ch",
+        "--config_hash",
+        default=None,
+        help="configuration hash of the results store rows (default: of the last stored row)",
+    )
     args = parser.parse_args()
 
     (
@@ -108,13 +151,13 @@ if __name__ == "__main__":
         alphas_best_norm,
         betas_best_norm,
         deltas_best_norm,
-    ) = get_experiment_result(args.pkl_dir, args.pkl_filelist[0])
+    ) = get_experiment_result(args.pkl_dir, args.pkl_filelist[0], args.config_hash)
     (
         results_collection_disorder,
         alphas_best_disorder,
         betas_best_disorder,
         deltas_best_disorder,
-    ) = get_experiment_result(args.pkl_dir, args.pkl_filelist[1])
+    ) = get_experiment_result(args.pkl_dir, args.pkl_filelist[1], args.config_hash)
 
     # Plot
     fig = plt.figure()
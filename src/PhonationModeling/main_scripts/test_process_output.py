@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+""" process_output over results stores: configuration filter, step sizes and row alignment. """
+import pickle
+
+import numpy as np
+
+from PhonationModeling.estimation.results_store import ResultsStore
+from PhonationModeling.estimation.vocal_fold_estimator import EstimationResult
+from PhonationModeling.main_scripts.process_output import (
+    get_experiment_result,
+    read_store_results,
+)
+
+
+def make_result(alpha: float, Rk: float) -> EstimationResult:
+    return EstimationResult(
+        iteration=1,
+        R=np.zeros(3),
+        Rk=Rk,
+        alpha=alpha,
+        beta=0.2,
+        delta=0.1,
+        sol=np.zeros((3, 5)),
+        u0=np.zeros(3),
+    )
+
+
+def test_read_store_results_config_hash(tmp_path):
+    directory = str(tmp_path / "run_0.1.store")
+    ResultsStore(directory, "a" * 40).save("x.wav", make_result(0.5, 0.3))
+    ResultsStore(directory, "b" * 40).save("y.wav", make_result(0.6, 0.2))
+
+    names, params, alphas, _, _, residuals = read_store_results(directory)  # last row's
+    assert names == ["y.wav"] and alphas == [0.6] and residuals == [0.2]
+    names, params, _, _, _, _ = read_store_results(directory, "a" * 40)
+    assert names == ["x.wav"] and params == [[0.5, 0.2, 0.1]]
+    assert read_store_results(str(tmp_path / "missing.store"))[0] == []
+
+
+def test_get_experiment_result(tmp_path):
+    # Three experiments with different files and orders, one a dated store, one legacy pkl
+    experiments = {
+        "run_0.1.store": [("x.wav", 0.5, 0.3), ("y.wav", 0.6, 0.2)],
+        "run_0.2.store.2026-01-01.1": [("z.wav", 0.7, 0.4), ("x.wav", 0.8, 0.1)],
+    }
+    for pf, rows in experiments.items():
+        store = ResultsStore(str(tmp_path / pf), "a" * 40)
+        for name, alpha, Rk in rows:
+            store.save(name, make_result(alpha, Rk))
+    legacy = {"y.wav": {"alpha": [0.9], "beta": [0.2], "delta": [0.1], "Rk": [0.05]}}
+    with open(str(tmp_path / "run_0.3.pkl"), "wb") as f:
+        pickle.dump(legacy, f)
+    filelist = str(tmp_path / "filelist.txt")
+    with open(filelist, "w") as f:
+        f.write("run_0.1.store\nrun_0.2.store.2026-01-01.1/\nrun_0.3.pkl\n")
+
+    collection, alphas_best, betas_best, _ = get_experiment_result(
+        str(tmp_path), filelist
+    )
+    assert [collection[pf]["step_size"] for pf in collection] == ["0.1", "0.2", "0.3"]
+    # Rows of x.wav, y.wav, z.wav: best of the experiments that have the file
+    np.testing.assert_array_equal(alphas_best, [0.8, 0.9, 0.7])
+    np.testing.assert_array_equal(betas_best, [0.2, 0.2, 0.2])
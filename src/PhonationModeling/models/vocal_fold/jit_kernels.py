@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+""" Compiled kernels for the vocal fold displacement model and its adjoint.
+Requires numba; the pure-Python versions in vocal_fold_model_displacement and
+adjoint_model_displacement are used as fallback if numba is not available.
+"""
+from typing import Callable, Tuple
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_coupled,
+    vdp_jacobian,
+)
+
+try:
+    from numba import njit
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """ No-op replacement of numba.njit. """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+BACKENDS = ["python", "numba"]
+
+
+@njit(cache=True)
+def vdp_coupled_jit(t: float, Z: np.ndarray, alpha: float, beta: float, delta: float) -> np.ndarray:
+    """ Compiled version of vdp_coupled. """
+    dZ = np.empty(4)
+    coupling = alpha * (Z[1] + Z[3])
+
+    dZ[0] = Z[1]
+    dZ[1] = -beta * (1 + Z[0] ** 2) * Z[1] - (1 - delta / 2) * Z[0] + coupling
+    dZ[2] = Z[3]
+    dZ[3] = -beta * (1 + Z[2] ** 2) * Z[3] - (1 + delta / 2) * Z[2] + coupling
+
+    return dZ
+
+
+@njit(cache=True)
+def vdp_jacobian_jit(
+    t: float, Z: np.ndarray, alpha: float, beta: float, delta: float
+) -> np.ndarray:
+    """ Compiled version of vdp_jacobian. """
+    J = np.zeros((4, 4))
+
+    J[0, 1] = 1
+    J[1, 0] = -2 * beta * Z[1] * Z[0] - (1 - delta / 2)
+    J[1, 1] = -beta * (1 + Z[0] ** 2) + alpha
+    J[1, 3] = alpha
+    J[2, 3] = 1
+    J[3, 1] = alpha
+    J[3, 2] = -2 * beta * Z[3] * Z[2] - (1 + delta / 2)
+    J[3, 3] = -beta * (1 + Z[2] ** 2) + alpha
+
+    return J
+
+
+@njit(cache=True)
+def _vdp_rhs_scalar(u1, u2, v1, v2, alpha, beta, delta):
+    """ vdp_coupled on scalar states. """
+    coupling = alpha * (u2 + v2)
+    du2 = -beta * (1 + u1 * u1) * u2 - (1 - delta / 2) * u1 + coupling
+    dv2 = -beta * (1 + v1 * v1) * v2 - (1 + delta / 2) * v1 + coupling
+    return u2, du2, v2, dv2
+
+
+@njit(cache=True)
+def vdp_rk4_jit(
+    Z0: np.ndarray, h: float, num_tsteps: int, alpha: float, beta: float, delta: float
+) -> np.ndarray:
+    """ Fixed-step RK4 solution of vdp_coupled at times k * h, k = 1, ..., num_tsteps.
+    Scalar loop, also reasonably fast without numba.
+    """
+    sol = np.empty((num_tsteps, 4))
+    z1, z2, z3, z4 = float(Z0[0]), float(Z0[1]), float(Z0[2]), float(Z0[3])
+
+    for k in range(num_tsteps):
+        a1, a2, a3, a4 = _vdp_rhs_scalar(z1, z2, z3, z4, alpha, beta, delta)
+        b1, b2, b3, b4 = _vdp_rhs_scalar(
+            z1 + 0.5 * h * a1, z2 + 0.5 * h * a2, z3 + 0.5 * h * a3, z4 + 0.5 * h * a4,
+            alpha, beta, delta,
+        )
+        c1, c2, c3, c4 = _vdp_rhs_scalar(
+            z1 + 0.5 * h * b1, z2 + 0.5 * h * b2, z3 + 0.5 * h * b3, z4 + 0.5 * h * b4,
+            alpha, beta, delta,
+        )
+        d1, d2, d3, d4 = _vdp_rhs_scalar(
+            z1 + h * c1, z2 + h * c2, z3 + h * c3, z4 + h * c4, alpha, beta, delta
+        )
+
+        z1 += h / 6.0 * (a1 + 2 * b1 + 2 * c1 + d1)
+        z2 += h / 6.0 * (a2 + 2 * b2 + 2 * c2 + d2)
+        z3 += h / 6.0 * (a3 + 2 * b3 + 2 * c3 + d3)
+        z4 += h / 6.0 * (a4 + 2 * b4 + 2 * c4 + d4)
+        sol[k, 0] = z1
+        sol[k, 1] = z2
+        sol[k, 2] = z3
+        sol[k, 3] = z4
+
+    return sol
+
+
+@njit(cache=True)
+def linear_recurrence_jit(A: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Sequential solution of y[j] = A[j] @ y[j - 1] + b[j], y[-1] = 0. """
+    y = np.empty_like(b)
+    y[0] = b[0]
+    for j in range(1, len(b)):
+        y[j] = np.dot(A[j], y[j - 1]) + b[j]
+    return y
+
+
+@njit(cache=True)
+def adjoint_residual_jit(
+    t: float,
+    M: np.ndarray,
+    dM: np.ndarray,
+    X: np.ndarray,
+    dX: np.ndarray,
+    R: np.ndarray,
+    alpha: float,
+    beta: float,
+    delta: float,
+    fs: float,
+    t0: float,
+) -> np.ndarray:
+    """ Compiled version of the residual of adjoint_model_displacement.adjoint_model. """
+    idx = int(round((t - t0) * fs) - 1)
+    if idx < 0:
+        idx = 0
+
+    x_r = X[idx, 0]
+    x_l = X[idx, 1]
+    r = R[idx]
+    coupling = alpha * (M[0] + M[2])
+
+    res = np.empty(4)
+    res[0] = dM[1] + (2 * beta * x_r * dX[idx, 0] + 1 - 0.5 * delta) * M[0] + r
+    res[1] = beta * M[0] * (1 + x_r ** 2) - coupling
+    res[2] = dM[3] + (2 * beta * x_l * dX[idx, 1] + 1 + 0.5 * delta) * M[2] + r
+    res[3] = beta * M[2] * (1 + x_l ** 2) - coupling
+
+    return res
+
+
+@njit(cache=True)
+def adjoint_jac_jit(
+    c: float,
+    t: float,
+    X: np.ndarray,
+    dX: np.ndarray,
+    alpha: float,
+    beta: float,
+    delta: float,
+    fs: float,
+    t0: float,
+) -> np.ndarray:
+    """ Compiled version of the jacobian of adjoint_model_displacement.adjoint_model. """
+    idx = int(round((t - t0) * fs) - 1)
+    if idx < 0:
+        idx = 0
+
+    x_r = X[idx, 0]
+    x_l = X[idx, 1]
+
+    jacobian = np.zeros((4, 4))
+    jacobian[0, 0] = 2 * beta * x_r * dX[idx, 0] + 1 - 0.5 * delta
+    jacobian[0, 1] = c
+    jacobian[1, 0] = beta * (1 + x_r ** 2) - alpha
+    jacobian[1, 2] = -alpha
+    jacobian[2, 2] = 2 * beta * x_l * dX[idx, 1] + 1 + 0.5 * delta
+    jacobian[2, 3] = c
+    jacobian[3, 0] = -alpha
+    jacobian[3, 2] = beta * (1 + x_l ** 2) - alpha
+
+    return jacobian
+
+
+def get_vdp_kernels(backend: str = "python") -> Tuple[Callable, Callable]:
+    """ Get the displacement model and its jacobian for a kernel backend.
+
+    Args:
+        backend: str
+            Kernel backend. Options: python, numba.
+            Falls back to python if numba is not available.
+
+    Returns:
+        model: Callable
+            Vocal fold displacement model, same signature as vdp_coupled.
+        model_jacobian: Callable
+            Jacobian of the model, same signature as vdp_jacobian.
+    """
+    assert backend in BACKENDS, f"Unknown backend: {backend}"
+
+    if backend == "numba" and HAS_NUMBA:
+        return vdp_coupled_jit, vdp_jacobian_jit
+    return vdp_coupled, vdp_jacobian
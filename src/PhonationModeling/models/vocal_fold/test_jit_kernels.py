@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+""" Compiled kernels against the Python models. """
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+from PhonationModeling.models.vocal_fold import jit_kernels  # noqa: E402
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import (  # noqa: E402
+    adjoint_model,
+)
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (  # noqa: E402
+    vdp_coupled,
+    vdp_init_state,
+    vdp_jacobian,
+)
+from PhonationModeling.solvers.ode_solvers import discrete_adjoint  # noqa: E402
+
+PARAMS = (0.8, 0.32, 0.4)
+FS = 1000
+
+
+def test_vdp_kernels():
+    rng = np.random.RandomState(0)
+    for Z in rng.randn(10, 4):
+        np.testing.assert_allclose(
+            jit_kernels.vdp_coupled_jit(0.0, Z, *PARAMS), vdp_coupled(0.0, Z, *PARAMS)
+        )
+        np.testing.assert_allclose(
+            jit_kernels.vdp_jacobian_jit(0.0, Z, *PARAMS), vdp_jacobian(0.0, Z, *PARAMS)
+        )
+
+
+def test_vdp_rk4():
+    """ Compiled RK4 loop against classical RK4 steps of vdp_coupled. """
+    h, num_tsteps = 0.05, 200
+    sol = jit_kernels.vdp_rk4_jit(np.array(vdp_init_state), h, num_tsteps, *PARAMS)
+    Z = np.array(vdp_init_state)
+    expected = np.empty((num_tsteps, 4))
+    for k in range(num_tsteps):
+        k1 = np.asarray(vdp_coupled(0.0, Z, *PARAMS))
+        k2 = np.asarray(vdp_coupled(0.0, Z + 0.5 * h * k1, *PARAMS))
+        k3 = np.asarray(vdp_coupled(0.0, Z + 0.5 * h * k2, *PARAMS))
+        k4 = np.asarray(vdp_coupled(0.0, Z + h * k3, *PARAMS))
+        Z = Z + h / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+        expected[k] = Z
+    np.testing.assert_allclose(sol, expected, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(
+        discrete_adjoint.rk4_solver(PARAMS, vdp_init_state, 0.0, h, num_tsteps)[:, 1:], sol
+    )
+
+
+def test_linear_recurrence(monkeypatch):
+    """ Compiled sequential loop against the parallel prefix scan of linear_recurrence. """
+    rng = np.random.RandomState(1)
+    A = 0.5 * rng.randn(37, 3, 3)
+    b = rng.randn(37, 3)
+    y = jit_kernels.linear_recurrence_jit(A, b)
+    monkeypatch.setattr(discrete_adjoint, "HAS_NUMBA", False)
+    np.testing.assert_allclose(discrete_adjoint.linear_recurrence(A, b), y, rtol=1e-10)
+    expected = np.zeros(3)
+    for j in range(len(b)):
+        expected = A[j] @ expected + b[j]
+    np.testing.assert_allclose(y[-1], expected)
+
+
+def test_adjoint_kernels():
+    """ Compiled adjoint residual and jacobian against the adjoint_model closures, between
+    sample times, away from the midpoints where the rounding to the nearest sample ties.
+    """
+    rng = np.random.RandomState(2)
+    num_samples = 50
+    X, dX, R = rng.randn(num_samples, 2), rng.randn(num_samples, 2), rng.randn(num_samples)
+    T = num_samples / float(FS)
+    residual, jac = adjoint_model(*PARAMS, X, dX, R, FS, 0, T)
+    residual_jit, jac_jit = adjoint_model(*PARAMS, X, dX, R, FS, 0, T, backend="numba")
+    for t in (np.arange(4 * num_samples) / 4.0 + 0.1) / FS:
+        M, dM = rng.randn(4), rng.randn(4)
+        np.testing.assert_allclose(residual_jit(t, M, dM), residual(t, M, dM))
+        np.testing.assert_allclose(jac_jit(0.3, t, M, dM), jac(0.3, t, M, dM))
@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
 from typing import List
 
+import numpy as np
+
+# Constants of the glottal flow of the model, shared by the estimation modules
+M = 0.5  # mass, g/cm^2
+B = 100  # damping, dyne s/cm^3
+d = 1.75  # length of vocal folds, cm
+x0 = 0.1  # half glottal width at rest position, cm
+tau = 1e-3  # time delay for surface wave to travel half glottal height, ms
+c = 5000  # air particle velocity, cm/s
+eta = 1.0  # nonlinear factor for energy dissipation at large amplitude
+
+vdp_init_t = 0.0
+vdp_init_state = [0.0, 0.1, 0.0, 0.1]  # (xr, dxr, xl, dxl), xl=xr=0
+
 
 def vdp_coupled(t: float, Z: List[float], alpha: float, beta: float, delta: float) -> List[float]:
     """ Physical model of the displacement of vocal folds.
@@ -50,3 +64,97 @@ def vdp_jacobian(
     ]
 
     return J
+
+
+def vdp_param_jacobian(
+    t: float, Z: List[float], alpha: float, beta: float, delta: float
+) -> List[List[float]]:
+    """ Jacobian of the above system w.r.t. the model parameters (alpha, beta, delta):
+            Jp[i, j] = df[i] / dp[j]
+    """
+    Jp = [
+        [0, 0, 0],
+        [Z[1] + Z[3], -(1 + Z[0] ** 2) * Z[1], Z[0] / 2],
+        [0, 0, 0],
+        [Z[1] + Z[3], -(1 + Z[2] ** 2) * Z[3], -Z[2] / 2],
+    ]
+
+    return Jp
+
+
+def vdp_coupled_batch(
+    t: float, Z: np.ndarray, alpha: np.ndarray, beta: np.ndarray, delta: np.ndarray
+) -> np.ndarray:
+    """ Vectorized version of vdp_coupled for a batch of parameter vectors.
+
+    Args:
+        t: float
+            Time.
+        Z: np.ndarray[float], shape (N, 4)
+            State variables [u1(t), u2(t), v1(t), v2(t)] for each of the N systems.
+        alpha: np.ndarray[float], shape (N,)
+            Glottal pressure coupling parameters.
+        beta: np.ndarray[float], shape (N,)
+            Mass, damping, stiffness parameters.
+        delta: np.ndarray[float], shape (N,)
+            Asymmetry parameters.
+
+    Returns:
+        dZ: np.ndarray[float], shape (N, 4)
+            Drivatives of state variables [du1, du2, dv1, dv2].
+    """
+    dZ = np.empty_like(Z)
+    coupling = alpha * (Z[:, 1] + Z[:, 3])
+
+    dZ[:, 0] = Z[:, 1]
+    dZ[:, 1] = -beta * (1 + Z[:, 0] ** 2) * Z[:, 1] - (1 - delta / 2) * Z[:, 0] + coupling
+    dZ[:, 2] = Z[:, 3]
+    dZ[:, 3] = -beta * (1 + Z[:, 2] ** 2) * Z[:, 3] - (1 + delta / 2) * Z[:, 2] + coupling
+
+    return dZ
+
+
+def vdp_jacobian_batch(
+    t: float, Z: np.ndarray, alpha: np.ndarray, beta: np.ndarray, delta: np.ndarray
+) -> np.ndarray:
+    """ Vectorized version of vdp_jacobian for a batch of parameter vectors:
+            J[n, i, j] = df[n, i] / dZ[n, j]
+
+    Returns:
+        J: np.ndarray[float], shape (N, 4, 4)
+            Jacobian matrices.
+    """
+    J = np.zeros(Z.shape + (4,), dtype=Z.dtype)
+
+    J[:, 0, 1] = 1
+    J[:, 1, 0] = -2 * beta * Z[:, 1] * Z[:, 0] - (1 - delta / 2)
+    J[:, 1, 1] = -beta * (1 + Z[:, 0] ** 2) + alpha
+    J[:, 1, 3] = alpha
+    J[:, 2, 3] = 1
+    J[:, 3, 1] = alpha
+    J[:, 3, 2] = -2 * beta * Z[:, 3] * Z[:, 2] - (1 + delta / 2)
+    J[:, 3, 3] = -beta * (1 + Z[:, 2] ** 2) + alpha
+
+    return J
+
+
+def vdp_param_jacobian_batch(
+    t: float, Z: np.ndarray, alpha: np.ndarray, beta: np.ndarray, delta: np.ndarray
+) -> np.ndarray:
+    """ Vectorized version of vdp_param_jacobian for a batch of parameter vectors:
+            Jp[n, i, j] = df[n, i] / dp[n, j]
+
+    Returns:
+        Jp: np.ndarray[float], shape (N, 4, 3)
+            Jacobian matrices w.r.t. (alpha, beta, delta).
+    """
+    Jp = np.zeros(Z.shape + (3,), dtype=Z.dtype)
+
+    Jp[:, 1, 0] = Z[:, 1] + Z[:, 3]
+    Jp[:, 1, 1] = -(1 + Z[:, 0] ** 2) * Z[:, 1]
+    Jp[:, 1, 2] = Z[:, 0] / 2
+    Jp[:, 3, 0] = Z[:, 1] + Z[:, 3]
+    Jp[:, 3, 1] = -(1 + Z[:, 2] ** 2) * Z[:, 3]
+    Jp[:, 3, 2] = -Z[:, 2] / 2
+
+    return Jp
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import List, Union
+
+import numpy as np
 
 
 def vocal_fold_model(
@@ -41,3 +43,26 @@ def vdp_jacobian(
     J = [[0, 1], [-(delta + 1), -(beta - 2 * alpha)]]
 
     return J
+
+
+def vocal_fold_model_matrix(
+    alpha: Union[float, np.ndarray], beta: Union[float, np.ndarray], delta: Union[float, np.ndarray]
+) -> np.ndarray:
+    """ System matrix A of the above linear model dU = A U, for a batch of parameters.
+
+    Args:
+        alpha, beta, delta: float or np.ndarray[float], shape (N,)
+            Model parameters.
+
+    Returns:
+        A: np.ndarray[float], shape (N, 2, 2)
+            System matrices.
+    """
+    alpha, beta, delta = np.broadcast_arrays(
+        np.atleast_1d(alpha), np.atleast_1d(beta), np.atleast_1d(delta)
+    )
+    A = np.zeros((len(alpha), 2, 2))
+    A[:, 0, 1] = 1
+    A[:, 1, 0] = -(delta + 1)
+    A[:, 1, 1] = -(beta - 2 * alpha)
+    return A
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+""" Gradients of the glottal flow estimation loss w.r.t. the vocal fold model parameters
+(alpha, beta, delta).
+
+The estimated glottal flow is u0 = flow_norm * v / ||v|| with v = x_r + x_l + 2 * x0
+(the constant factor c * d cancels in the normalization), the estimation residual is
+R = u0 - glottal_flow, and the loss is J = 0.5 * ||R||^2.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+GRADIENT_ENGINES = ["adjoint", "sensitivity", "discrete_adjoint", "checkpointed"]
+
+
+def flow_residual_gradient(v: np.ndarray, R: np.ndarray, flow_norm: float) -> np.ndarray:
+    """ Gradient of the loss w.r.t. the unnormalized glottal flow v, dJ/dv.
+
+    Args:
+        v: np.ndarray[float], shape (T,)
+            Unnormalized glottal flow x_r + x_l + 2 * x0.
+        R: np.ndarray[float], shape (T,)
+            Estimation residual.
+        flow_norm: float
+            L2 norm of the target glottal flow.
+
+    Returns:
+        dJ_dv: np.ndarray[float], shape (T,)
+            Gradient of the loss.
+    """
+    v_norm = np.linalg.norm(v)
+    v_hat = v / v_norm
+    return flow_norm / v_norm * (R - v_hat * np.dot(v_hat, R))
+
+
+def adjoint_gradient(X: np.ndarray, dX: np.ndarray, L: np.ndarray, E: np.ndarray) -> np.ndarray:
+    """ Parameter gradient from the adjoint lagrange multipliers.
+
+    Args:
+        X: np.ndarray[float], shape (T, 2)
+            Vocal fold displacements [x_r, x_l].
+        dX: np.ndarray[float], shape (T, 2)
+            Vocal fold velocities [dx_r, dx_l].
+        L: np.ndarray[float], shape (T,)
+            Adjoint multiplier of the right vocal fold.
+        E: np.ndarray[float], shape (T,)
+            Adjoint multiplier of the left vocal fold.
+
+    Returns:
+        grad: np.ndarray[float], shape (3,)
+            Gradient [d_alpha, d_beta, d_delta].
+    """
+    d_alpha = -np.dot((dX[:, 0] + dX[:, 1]), (L + E))
+    d_beta = np.sum(
+        L * (1 + np.square(X[:, 0])) * dX[:, 0] + E * (1 + np.square(X[:, 1])) * dX[:, 1]
+    )
+    d_delta = np.sum(0.5 * (X[:, 1] * E - X[:, 0] * L))
+    return np.array([d_alpha, d_beta, d_delta])
+
+
+def sensitivity_gradient(
+    sol: np.ndarray,
+    sens: np.ndarray,
+    R: np.ndarray,
+    flow_norm: float,
+    x0: float,
+    init_t: float = 0.0,
+    dlog_time_scaling: Optional[List[float]] = None,
+) -> np.ndarray:
+    """ Parameter gradient from the forward sensitivities of the displacement model.
+
+    Args:
+        sol: np.ndarray[float], shape (T, 5)
+            Solution [time, x_r, dx_r, x_l, dx_l] of the displacement model.
+        sens: np.ndarray[float], shape (T, 4, 3)
+            Sensitivities of the model states w.r.t. (alpha, beta, delta).
+        R: np.ndarray[float], shape (T,)
+            Estimation residual.
+        flow_norm: float
+            L2 norm of the target glottal flow.
+        x0: float
+            Half glottal width at rest position.
+        init_t: float
+            Initial simulation time.
+        dlog_time_scaling: List[float]
+            Derivatives of log(time_scaling) w.r.t. (alpha, beta, delta), if the sample grid
+            in model time depends on the parameters, e.g. [0, -1 / beta, 0] for
+            time_scaling = B / (beta * M).
+
+    Returns:
+        grad: np.ndarray[float], shape (3,)
+            Gradient [d_alpha, d_beta, d_delta] of the loss.
+    """
+    v = sol[:, 1] + sol[:, 3] + 2 * x0
+    dv = sens[:, 0, :] + sens[:, 2, :]  # (T, 3)
+    if dlog_time_scaling is not None:  # sample k is at model time time_scaling * k / fs
+        dv = dv + np.outer((sol[:, 2] + sol[:, 4]) * (sol[:, 0] - init_t), dlog_time_scaling)
+
+    return np.dot(flow_residual_gradient(v, R, flow_norm), dv)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+""" Checkpointed discrete adjoint of the vocal fold displacement model for long recordings.
+
+The forward RK4 pass keeps the model states only at K checkpoints (segment starts) and the
+unnormalized glottal flow v = x_r + x_l + 2 * x0. The reverse sweep walks the segments
+backward, recomputes each segment's states from its checkpoint, and runs the discrete
+adjoint recurrence over that segment only, carrying the adjoint multiplier across the
+segment boundary. The recomputation is bit-identical to the forward pass, so the gradient
+equals discrete_adjoint_gradient over the full trajectory.
+
+Memory holds O(K) checkpoint states plus the O(T / K) step derivatives of one segment, at
+the cost of one extra forward pass. Each segment adds a fixed overhead of vectorized calls,
+so the default keeps segments at SEGMENT_LENGTH samples (about 1 MB of step derivatives)
+rather than minimizing memory at K = sqrt(T).
+"""
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.jit_kernels import vdp_rk4_jit
+from PhonationModeling.solvers.gradients import flow_residual_gradient
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import (
+    adjoint_recurrence,
+    rk4_step_derivatives,
+)
+
+SEGMENT_LENGTH = 4096  # default number of samples between checkpoints
+
+
+def segment_bounds(num_tsteps: int, num_checkpoints: Optional[int] = None) -> np.ndarray:
+    """ Sample indices of the segment boundaries.
+
+    Args:
+        num_tsteps: int
+            Number of time steps.
+        num_checkpoints: int
+            Number of checkpoints, i.e. segments. Default: segments of SEGMENT_LENGTH.
+
+    Returns:
+        bounds: np.ndarray[int], shape (K + 1,)
+            Segment k covers the samples bounds[k], ..., bounds[k + 1] - 1.
+    """
+    if num_checkpoints is None:
+        num_checkpoints = int(np.ceil(num_tsteps / float(SEGMENT_LENGTH)))
+    num_checkpoints = max(1, min(num_checkpoints, num_tsteps))
+    return np.linspace(0, num_tsteps, num_checkpoints + 1).astype(int)
+
+
+def checkpointed_rk4_solver(
+    model_params: List[float],
+    init_state: List[float],
+    dt: float,
+    num_tsteps: int,
+    x0: float,
+    num_checkpoints: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Fixed-step RK4 solver of the displacement model that stores the model states at
+    checkpoints only, same discretization as rk4_solver.
+
+    Args:
+        model_params: List[float]
+            Model parameters [alpha, beta, delta].
+        init_state: List[float]
+            Initial model state.
+        dt: float
+            Time step increment.
+        num_tsteps: int
+            Number of time steps.
+        x0: float
+            Half glottal width at rest position.
+        num_checkpoints: int
+            Number of checkpoints. Default: segments of SEGMENT_LENGTH.
+
+    Returns:
+        checkpoints: np.ndarray[float], shape (K, 4)
+            Model states the segments start from, checkpoints[0] = init_state.
+        v: np.ndarray[float], shape (num_tsteps,)
+            Unnormalized glottal flow x_r + x_l + 2 * x0 at the samples.
+    """
+    alpha, beta, delta = model_params
+    bounds = segment_bounds(num_tsteps, num_checkpoints)
+
+    checkpoints = np.empty((len(bounds) - 1, 4))
+    v = np.empty(num_tsteps)
+    state = np.asarray(init_state, dtype=np.float64)
+    for k in range(len(bounds) - 1):
+        checkpoints[k] = state
+        Z = vdp_rk4_jit(state, dt, bounds[k + 1] - bounds[k], alpha, beta, delta)
+        v[bounds[k] : bounds[k + 1]] = Z[:, 0] + Z[:, 2] + 2 * x0
+        state = Z[-1]
+    return checkpoints, v
+
+
+def checkpointed_adjoint_gradient(
+    checkpoints: np.ndarray,
+    v: np.ndarray,
+    model_params: List[float],
+    dt: float,
+    R: np.ndarray,
+    flow_norm: float,
+    dlog_time_scaling: Optional[List[float]] = None,
+    stats: Optional[Dict] = None,
+) -> np.ndarray:
+    """ Parameter gradient of the estimation loss from the discrete adjoint, recomputing
+    the segments between checkpoints in the reverse sweep.
+
+    Args:
+        checkpoints: np.ndarray[float], shape (K, 4)
+            Checkpoint states returned by checkpointed_rk4_solver.
+        v: np.ndarray[float], shape (T,)
+            Unnormalized glottal flow returned by checkpointed_rk4_solver.
+        model_params: List[float]
+            Model parameters [alpha, beta, delta].
+        dt: float
+            Time step increment.
+        R: np.ndarray[float], shape (T,)
+            Estimation residual.
+        flow_norm: float
+            L2 norm of the target glottal flow.
+        dlog_time_scaling: List[float]
+            Derivatives of log(time_scaling) w.r.t. (alpha, beta, delta), if the step size
+            dt = time_scaling / fs depends on the parameters.
+        stats: Dict
+            If given, filled with the memory usage: checkpoint_bytes, segment_bytes (step
+            derivatives of the longest segment) and peak_bytes (traced peak of the numpy
+            allocations during the reverse sweep, if tracemalloc is not already running).
+
+    Returns:
+        grad: np.ndarray[float], shape (3,)
+            Gradient [d_alpha, d_beta, d_delta] of the loss.
+    """
+    trace = stats is not None and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+
+    alpha, beta, delta = model_params
+    bounds = segment_bounds(len(v), len(checkpoints))
+    dJ_dv = flow_residual_gradient(v, R, flow_norm)
+
+    dJ_dq = np.zeros(4)  # (alpha, beta, delta, h)
+    carry = np.zeros(4)  # dPhi/dz^T lambda of the first step of the following segment
+    segment_bytes = 0
+    for k in reversed(range(len(checkpoints))):
+        # Recompute the states of segment k from its checkpoint
+        Z = vdp_rk4_jit(checkpoints[k], dt, bounds[k + 1] - bounds[k], alpha, beta, delta)
+        Z_prev = np.concatenate([checkpoints[k][None, :], Z[:-1]])
+        dPhi_dz, dPhi_dq = rk4_step_derivatives(Z_prev, dt, alpha, beta, delta)
+
+        dJ_dz = np.zeros_like(Z)
+        dJ_dz[:, 0] = dJ_dv[bounds[k] : bounds[k + 1]]
+        dJ_dz[:, 2] = dJ_dz[:, 0]
+        dJ_dz[-1] += carry
+
+        lambdas = adjoint_recurrence(dPhi_dz, dJ_dz)
+        dJ_dq += np.einsum("ti,tij->j", lambdas, dPhi_dq)
+        carry = np.dot(dPhi_dz[0].T, lambdas[0])
+        segment_bytes = max(segment_bytes, Z.nbytes + dPhi_dz.nbytes + dPhi_dq.nbytes)
+
+    if stats is not None:
+        stats["checkpoint_bytes"] = checkpoints.nbytes
+        stats["segment_bytes"] = segment_bytes
+        if trace:
+            stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    grad = dJ_dq[:3]
+    if dlog_time_scaling is not None:
+        grad = grad + dJ_dq[3] * dt * np.asarray(dlog_time_scaling)
+    return grad
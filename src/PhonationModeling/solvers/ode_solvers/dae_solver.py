@@ -1,10 +1,180 @@
 # -*- coding: utf-8 -*-
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, Optional
 
 import numpy as np
 from assimulo.problem import Implicit_Problem
 from matplotlib import pyplot as plt
 
+from PhonationModeling.solvers.ode_solvers.trajectory import Trajectory
+
+
+class _SessionProblem(Implicit_Problem):
+    """ Implicit problem that writes the solution at the communication points into the
+    preallocated output arrays of a DAESession.
+    """
+
+    def __init__(self, session: "DAESession", *args, **kwargs):
+        Implicit_Problem.__init__(self, *args, **kwargs)
+        self.session = session
+
+    def handle_result(self, solver, t: float, y: np.ndarray, yd: np.ndarray):
+        session = self.session
+        k = session.y.num_filled
+        if k >= session.y.capacity:
+            raise IndexError(f"More than {session.y.capacity:d} communication points")
+        session.y.buffer[:, k] = y
+        session.yd.buffer[:, k] = yd
+        session.y.num_filled = session.yd.num_filled = k + 1
+
+
+class DAESession(object):
+    """ Persistent DAE solver session.
+    The implicit problem and the solver are built and configured once, e.g. per file, and
+    re-initialized for each solve with new terminal conditions. The residual data is updated
+    behind the residual/jacobian callables (e.g. AdjointModel.update), or the callables are
+    replaced per solve. The solution is written into preallocated Trajectory outputs y and
+    yd on the uniform grid of communication points, which are overwritten by the next solve.
+
+    Args:
+        residual: Callable
+            Implicit DAE model.
+        y0: List[float]
+            Initial model state.
+        yd0: List[float]
+            Initial model state derivatives.
+        t0: float
+            Initial simulation time.
+        tfinal: float
+            Final simulation time.
+        backward: bool
+            Specifies if the simulation is done in reverse time.
+        ncp: int
+            Number of communication points (number of returned points).
+        algvar: List[bool]
+            Defines which variables are differential and which are algebraic.
+        suppress_alg: bool
+            Indicates that the error-tests are suppressed on algebraic variables.
+        atol: float
+            Absolute tolerance.
+        rtol: float
+            Relative tolerance.
+        jac: Callable
+            Model jacobian, if given.
+        display_progress: bool
+            Actives output during the integration.
+        report_continuously: bool
+            Specifies if the solver should report the solution continuously after steps.
+        verbosity: int
+            Determines the level of the output.
+        name: str
+            Model name.
+        dtype: np.dtype
+            Data type of the outputs, e.g. np.float32 to halve the memory.
+    """
+
+    def __init__(
+        self,
+        residual: Callable,
+        y0: List[float],
+        yd0: List[float],
+        t0: float,
+        tfinal: float = 10.0,
+        backward: bool = False,
+        ncp: int = 500,
+        algvar: Optional[List[bool]] = None,
+        suppress_alg: bool = False,
+        atol: float = 1e-6,
+        rtol: float = 1e-6,
+        jac: Optional[Callable] = None,
+        display_progress: bool = False,
+        report_continuously: bool = False,
+        verbosity: int = 30,
+        name: str = "DAE",
+        dtype: np.dtype = np.float64,
+    ):
+        from assimulo.solvers import IDA
+
+        self.residual = residual
+        self.jac = jac
+        self.t0 = t0
+        self.tfinal = tfinal
+        self.ncp_list = np.linspace(t0, tfinal, num=ncp, endpoint=True)
+
+        # Preallocated outputs
+        dt = (tfinal - t0) / max(ncp - 1, 1)
+        self.y = Trajectory(ncp, len(y0), t0, dt, dtype=dtype)
+        self.yd = Trajectory(ncp, len(y0), t0, dt, dtype=dtype)
+
+        # Stable entry points, dispatching to the current callables
+        model = _SessionProblem(self, lambda t, y, yd: self.residual(t, y, yd), y0, yd0, t0)
+        model.name = name
+        if algvar is not None:
+            model.algvar = algvar
+        if jac is not None:
+            model.jac = lambda c, t, y, yd: self.jac(c, t, y, yd)
+
+        sim = IDA(model)
+        sim.backward = backward
+        sim.suppress_alg = suppress_alg
+        sim.atol = atol
+        sim.rtol = rtol
+        sim.display_progress = display_progress
+        sim.report_continuously = report_continuously
+        sim.verbosity = verbosity
+        self.sim = sim
+
+    def solve(
+        self,
+        y0: List[float],
+        yd0: List[float],
+        residual: Optional[Callable] = None,
+        jac: Optional[Callable] = None,
+        stats: Optional[Dict] = None,
+        atol: Optional[float] = None,
+        rtol: Optional[float] = None,
+    ) -> List[np.ndarray]:
+        """ Re-initialize the solver at t0 and simulate to tfinal.
+
+        Args:
+            y0: List[float]
+                Initial model state.
+            yd0: List[float]
+                Initial model state derivatives.
+            residual: Callable
+                New implicit DAE model, if given.
+            jac: Callable
+                New model jacobian, if given. Requires the session to be created with one.
+            stats: Dict
+                If given, updated with the solver statistics.
+            atol: float
+                New absolute tolerance, if given.
+            rtol: float
+                New relative tolerance, if given.
+
+        Returns:
+            sol: List[np.ndarray]
+                Solution [time, model states, model state derivatives], the states as
+                (time, state) views of the preallocated outputs.
+        """
+        if residual is not None:
+            self.residual = residual
+        if jac is not None:
+            assert self.jac is not None, "Session created without jacobian"
+            self.jac = jac
+        if atol is not None:
+            self.sim.atol = atol
+        if rtol is not None:
+            self.sim.rtol = rtol
+
+        self.sim.re_init(self.t0, np.asarray(y0, dtype=float), np.asarray(yd0, dtype=float))
+        self.y.num_filled = self.yd.num_filled = 0
+        self.sim.simulate(self.tfinal, ncp=0, ncp_list=self.ncp_list)
+
+        if stats is not None:  # solver statistics
+            stats.update({key: self.sim.statistics[key] for key in self.sim.statistics.keys()})
+
+        return [self.y.t, self.y.states.T, self.yd.states.T]
+
 
 def dae_solver(
     residual: Callable,
@@ -30,6 +200,7 @@ def dae_solver(
     report_continuously: bool = False,
     verbosity: int = 30,
     name: str = "DAE",
+    stats: Optional[Dict] = None,
 ) -> List[float]:
     """ DAE solver.
 
@@ -85,6 +256,10 @@ def dae_solver(
             QUIET = 50 WHISPER = 40 NORMAL = 30 LOUD = 20 SCREAM = 10.
         name: str
             Model name.
+        stats: Dict
+            If given, updated with the solver statistics, e.g. nsteps (number of steps),
+            nfcns (residual evaluations), njacs (jacobian evaluations), nerrfails (error test
+            failures).
 
     Returns:
         sol: List[float]
@@ -126,6 +301,9 @@ def dae_solver(
     ncp_list = np.linspace(t0, tfinal, num=ncp, endpoint=True)
     t, y, yd = sim.simulate(tfinal, ncp=0, ncp_list=ncp_list)
 
+    if stats is not None:  # solver statistics
+        stats.update({key: sim.statistics[key] for key in sim.statistics.keys()})
+
     # Plot
     # plt.figure()
     # plt.subplot(221)
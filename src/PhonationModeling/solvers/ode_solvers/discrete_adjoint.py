@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+""" Discrete adjoint of the vocal fold displacement model.
+
+The forward model is discretized with fixed-step RK4 on the sample grid,
+    z[k] = Phi(z[k - 1]; p, h),  k = 1, ..., T,
+and the adjoint of exactly this discretization is solved by a reverse linear recurrence
+over the stored trajectory,
+    lambda[T] = dJ/dz[T],  lambda[k] = dJ/dz[k] + dPhi/dz(z[k])^T lambda[k + 1],
+    dJ/dp = sum_k lambda[k]^T dPhi/dp(z[k - 1]),
+so the gradient is exact for the discretized loss. The step derivatives dPhi/dz, dPhi/dp
+are precomputed for all samples at once with vectorized forward-mode differentiation of
+the RK4 stages.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.jit_kernels import (
+    HAS_NUMBA,
+    linear_recurrence_jit,
+    vdp_rk4_jit,
+)
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_coupled_batch,
+    vdp_jacobian_batch,
+    vdp_param_jacobian_batch,
+)
+from PhonationModeling.solvers.gradients import flow_residual_gradient
+
+
+def rk4_solver(
+    model_params: List[float], init_state: List[float], init_t: float, dt: float, num_tsteps: int
+) -> np.ndarray:
+    """ Fixed-step RK4 solver of the displacement model on the grid
+    init_t + k * dt, k = 1, ..., num_tsteps; the forward discretization of the discrete adjoint.
+
+    Args:
+        model_params: List[float]
+            Model parameters [alpha, beta, delta].
+        init_state: List[float]
+            Initial model state.
+        init_t: float
+            Initial simulation time.
+        dt: float
+            Time step increment.
+        num_tsteps: int
+            Number of returned time steps.
+
+    Returns:
+        sol: np.ndarray[float], shape (num_tsteps, 5)
+            Solution [time, model states], same as ode_solver.
+    """
+    alpha, beta, delta = model_params
+    sol = np.empty((num_tsteps, 5))
+    sol[:, 0] = init_t + dt * np.arange(1, num_tsteps + 1)
+    sol[:, 1:] = vdp_rk4_jit(
+        np.asarray(init_state, dtype=np.float64), dt, num_tsteps, alpha, beta, delta
+    )
+    return sol
+
+
+def rk4_step_derivatives(
+    Z: np.ndarray, h: float, alpha: float, beta: float, delta: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Derivatives of one RK4 step of the displacement model, for all steps at once.
+
+    Args:
+        Z: np.ndarray[float], shape (T, 4)
+            States the steps start from.
+        h: float
+            Step size.
+        alpha, beta, delta: float
+            Model parameters.
+
+    Returns:
+        dPhi_dz: np.ndarray[float], shape (T, 4, 4)
+            Derivatives of the next states w.r.t. the states.
+        dPhi_dq: np.ndarray[float], shape (T, 4, 4)
+            Derivatives of the next states w.r.t. (alpha, beta, delta, h).
+    """
+    num_steps = len(Z)
+
+    def stage(Y: np.ndarray, dY: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # tangents w.r.t. w = (z, alpha, beta, delta, h), shape (T, 4, 8)
+        dK = np.matmul(vdp_jacobian_batch(0.0, Y, alpha, beta, delta), dY)
+        dK[:, :, 4:7] += vdp_param_jacobian_batch(0.0, Y, alpha, beta, delta)
+        return vdp_coupled_batch(0.0, Y, alpha, beta, delta), dK
+
+    dZ = np.zeros((num_steps, 4, 8))
+    dZ[:, :, :4] = np.eye(4)
+
+    k1, dk1 = stage(Z, dZ)
+    dY = dZ + 0.5 * h * dk1
+    dY[:, :, 7] += 0.5 * k1
+    k2, dk2 = stage(Z + 0.5 * h * k1, dY)
+    dY = dZ + 0.5 * h * dk2
+    dY[:, :, 7] += 0.5 * k2
+    k3, dk3 = stage(Z + 0.5 * h * k2, dY)
+    dY = dZ + h * dk3
+    dY[:, :, 7] += k3
+    k4, dk4 = stage(Z + h * k3, dY)
+
+    dPhi = dZ + h / 6.0 * (dk1 + 2 * dk2 + 2 * dk3 + dk4)
+    dPhi[:, :, 7] += (k1 + 2 * k2 + 2 * k3 + k4) / 6.0
+    return dPhi[:, :, :4], dPhi[:, :, 4:]
+
+
+def linear_recurrence(A: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ Solve the linear recurrence y[j] = A[j] @ y[j - 1] + b[j], y[-1] = 0.
+    Compiled sequential loop with numba, otherwise a vectorized parallel prefix scan
+    (log2(T) rounds of batched matrix products).
+
+    Args:
+        A: np.ndarray[float], shape (T, n, n)
+            Transition matrices, A[0] is unused.
+        b: np.ndarray[float], shape (T, n)
+            Inputs.
+
+    Returns:
+        y: np.ndarray[float], shape (T, n)
+            Solution.
+    """
+    if HAS_NUMBA:
+        return linear_recurrence_jit(np.ascontiguousarray(A), np.ascontiguousarray(b))
+
+    A = A.copy()
+    y = b.copy()
+    s = 1
+    while s < len(b):
+        # After this round, y[j] sums the inputs b[j - 2s + 1 : j + 1] and
+        # A[j] = A[j] @ ... @ A[j - 2s + 1]
+        y[s:] += np.matmul(A[s:], y[:-s, :, None])[:, :, 0]
+        A[s:] = np.matmul(A[s:], A[:-s])
+        s *= 2
+    return y
+
+
+def adjoint_recurrence(dPhi_dz: np.ndarray, dJ_dz: np.ndarray) -> np.ndarray:
+    """ Reverse sweep lambda[k] = dJ/dz[k] + dPhi_dz[k + 1]^T lambda[k + 1], lambda[T] = dJ/dz[T].
+
+    Args:
+        dPhi_dz: np.ndarray[float], shape (T, n, n)
+            Step derivatives, dPhi_dz[k] of the step into z[k]; dPhi_dz[0] is unused.
+        dJ_dz: np.ndarray[float], shape (T, n)
+            Loss gradient w.r.t. the states.
+
+    Returns:
+        lambdas: np.ndarray[float], shape (T, n)
+            Adjoint multipliers.
+    """
+    A = np.transpose(dPhi_dz[::-1], (0, 2, 1))
+    A = np.roll(A, 1, axis=0)  # align A[j] with lambda[T - j]
+    return linear_recurrence(A, dJ_dz[::-1])[::-1]
+
+
+def discrete_adjoint_gradient(
+    sol: np.ndarray,
+    model_params: List[float],
+    init_state: List[float],
+    dt: float,
+    R: np.ndarray,
+    flow_norm: float,
+    x0: float,
+    dlog_time_scaling: Optional[List[float]] = None,
+) -> np.ndarray:
+    """ Parameter gradient of the estimation loss from the discrete adjoint.
+
+    Args:
+        sol: np.ndarray[float], shape (T, 5)
+            Solution [time, x_r, dx_r, x_l, dx_l] returned by rk4_solver.
+        model_params: List[float]
+            Model parameters [alpha, beta, delta].
+        init_state: List[float]
+            Initial model state.
+        dt: float
+            Time step increment.
+        R: np.ndarray[float], shape (T,)
+            Estimation residual.
+        flow_norm: float
+            L2 norm of the target glottal flow.
+        x0: float
+            Half glottal width at rest position.
+        dlog_time_scaling: List[float]
+            Derivatives of log(time_scaling) w.r.t. (alpha, beta, delta), if the step size
+            dt = time_scaling / fs depends on the parameters.
+
+    Returns:
+        grad: np.ndarray[float], shape (3,)
+            Gradient [d_alpha, d_beta, d_delta] of the loss.
+    """
+    alpha, beta, delta = model_params
+    Z = sol[:, 1:]
+
+    # Coefficients of all steps z[k - 1] -> z[k]
+    Z_prev = np.concatenate([np.asarray(init_state, dtype=float)[None, :], Z[:-1]])
+    dPhi_dz, dPhi_dq = rk4_step_derivatives(Z_prev, dt, alpha, beta, delta)
+
+    # Loss gradient w.r.t. the states, only x_r and x_l enter the glottal flow
+    dJ_dv = flow_residual_gradient(Z[:, 0] + Z[:, 2] + 2 * x0, R, flow_norm)
+    dJ_dz = np.zeros_like(Z)
+    dJ_dz[:, 0] = dJ_dv
+    dJ_dz[:, 2] = dJ_dv
+
+    lambdas = adjoint_recurrence(dPhi_dz, dJ_dz)
+    dJ_dq = np.einsum("ti,tij->j", lambdas, dPhi_dq)  # (alpha, beta, delta, h)
+    grad = dJ_dq[:3]
+    if dlog_time_scaling is not None:
+        grad = grad + dJ_dq[3] * dt * np.asarray(dlog_time_scaling)
+    return grad
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import functools
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+
+def rk4_step(model: Callable, t: float, Z: np.ndarray, h: np.ndarray, params: tuple) -> np.ndarray:
+    """ One classical Runge-Kutta step for a batch of systems.
+
+    Args:
+        model: Callable
+            Batched ODE model dZ = f(t, Z, *params), Z of shape (N, S).
+        t: float
+            Time.
+        Z: np.ndarray[float], shape (N, S)
+            Model states.
+        h: np.ndarray[float], shape (N, 1)
+            Step size of each system.
+        params: tuple
+            Model parameters, each of shape (N,).
+
+    Returns:
+        Z: np.ndarray[float], shape (N, S)
+            Model states after one step.
+    """
+    k1 = model(t, Z, *params)
+    k2 = model(t, Z + 0.5 * h * k1, *params)
+    k3 = model(t, Z + 0.5 * h * k2, *params)
+    k4 = model(t, Z + h * k3, *params)
+    return Z + h / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def ros2_step(
+    model: Callable,
+    model_jacobian: Callable,
+    t: float,
+    Z: np.ndarray,
+    h: np.ndarray,
+    params: tuple,
+) -> np.ndarray:
+    """ One step of the 2nd order, L-stable Rosenbrock method (ROS2) for a batch of systems.
+    Linearly implicit, so it stays stable for stiff parameter regions where RK4 blows up.
+    Stable is not accurate: the step has no error control, and at the sample step of the
+    glottal flows the 2nd order phase error accumulates over the periods into O(1) state
+    errors. Accurate trajectories need many substeps (tens per sample), far more than RK4:
+    for the vocal fold model at 8 kHz over 0.1 s, with states of amplitude up to 6, the largest
+    state error is about 5 with 1 substep, 5e-2 with 16 and 3e-3 with 64, against 5e-3 for
+    RK4 with 1.
+
+    Args:
+        model: Callable
+            Batched ODE model dZ = f(t, Z, *params), Z of shape (N, S).
+        model_jacobian: Callable
+            Batched Jacobian of the ODE model, of shape (N, S, S).
+        t: float
+            Time.
+        Z: np.ndarray[float], shape (N, S)
+            Model states.
+        h: np.ndarray[float], shape (N, 1)
+            Step size of each system.
+        params: tuple
+            Model parameters, each of shape (N,).
+
+    Returns:
+        Z: np.ndarray[float], shape (N, S)
+            Model states after one step.
+    """
+    gamma = 1.0 + 1.0 / np.sqrt(2.0)
+    J = model_jacobian(t, Z, *params)
+    W = np.eye(Z.shape[1]) - gamma * h[:, :, None] * J
+
+    k1 = np.linalg.solve(W, model(t, Z, *params)[..., None])[..., 0]
+    k2 = np.linalg.solve(W, (model(t, Z + h * k1, *params) - 2 * k1)[..., None])[..., 0]
+    return Z + h * (1.5 * k1 + 0.5 * k2)
+
+
+def ensemble_ode_solver(
+    model: Callable,
+    model_jacobian: Optional[Callable],
+    model_params: np.ndarray,
+    init_states: np.ndarray,
+    init_t: float,
+    dt: Union[float, np.ndarray],
+    num_tsteps: int,
+    method: str = "rk4",
+    num_substeps: int = 1,
+    dtype: type = np.float64,
+) -> np.ndarray:
+    """ Fixed-step ODE solver advancing an ensemble of N systems together.
+    Each system has its own parameter vector, initial state and step size, and all systems
+    are integrated in lockstep with vectorized NumPy operations, so the Python overhead per
+    time step is paid once for the whole ensemble instead of once per system.
+
+    Args:
+        model: Callable
+            Batched ODE model dZ = f(t, Z, *params), e.g. vdp_coupled_batch.
+        model_jacobian: Callable
+            Batched Jacobian of the ODE model, e.g. vdp_jacobian_batch.
+            Only required by the 'ros2' method.
+        model_params: np.ndarray[float], shape (N, P)
+            Model parameters of each system, e.g. rows of [alpha, beta, delta].
+        init_states: np.ndarray[float], shape (N, S)
+            Initial model states.
+        init_t: float
+            Initial simulation time.
+        dt: float or np.ndarray[float], shape (N,)
+            Time step increment, shared or per system.
+        num_tsteps: int
+            Number of returned time steps.
+        method: str
+            Integration method. Options: rk4 (explicit), ros2 (linearly implicit, stable but
+            inaccurate without many substeps, see ros2_step; not for fitting or seeding the
+            estimation, only e.g. for the stability of stiff parameter regions).
+        num_substeps: int
+            Number of internal steps per returned time step.
+        dtype: type
+            Data type of the returned trajectories.
+
+    Returns:
+        sol: np.ndarray[float], shape (N, num_tsteps, S)
+            Model states at times init_t + k * dt, k = 1, ..., num_tsteps, same as the grid
+            returned by ode_solver (without the time column).
+    """
+    model_params = np.atleast_2d(np.asarray(model_params, dtype=float))
+    Z = np.array(np.atleast_2d(init_states), dtype=float)
+    num_systems, num_states = Z.shape
+    assert model_params.shape[0] == num_systems, (
+        f"Inconsistent batch size: model params ({model_params.shape[0]:d}) / "
+        f"init states ({num_systems:d})"
+    )
+
+    params = tuple(model_params.T)  # (alpha, beta, delta), each (N,)
+    h = np.broadcast_to(np.asarray(dt, dtype=float), (num_systems,))[:, None] / num_substeps
+
+    if method == "rk4":
+        step = functools.partial(rk4_step, model, h=h, params=params)
+    elif method == "ros2":
+        assert model_jacobian is not None, "Method ros2 requires the model jacobian"
+        step = functools.partial(ros2_step, model, model_jacobian, h=h, params=params)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    sol = np.empty((num_systems, num_tsteps, num_states), dtype=dtype)
+    t = init_t  # nominal time, models are autonomous
+    for k in range(num_tsteps):
+        for _ in range(num_substeps):
+            Z = step(t, Z)
+        sol[:, k, :] = Z
+
+    return sol
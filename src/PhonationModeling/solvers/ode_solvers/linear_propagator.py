@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+""" Closed-form batched solver of the linear volume velocity model and its adjoint.
+
+The volume velocity model dU = A U has a constant 2x2 system matrix A(alpha, beta, delta)
+(vocal_fold_model_matrix). With s = tr(A) / 2 and q^2 = s^2 - det(A), the matrix exponential
+is
+    exp(A t) = C(t) I + S(t) (A - s I),
+    C(t) = (exp((s + q) t) + exp((s - q) t)) / 2,
+    S(t) = (exp((s + q) t) - exp((s - q) t)) / 2q,
+(cosine/sine for q^2 < 0), so trajectories of a whole batch of parameters are evaluated on the
+sample grid in one vectorized call without integration.
+
+The adjoint of a loss J = int g(U) dt,
+    dL = -A^T L - dg/dU,  L(t_T) = L_T,
+is propagated backward to the initial time with the exact step exp(A^T dt) and trapezoidal
+quadrature of the forcing, and gives the parameter gradient dJ/dp = int L^T dA/dp U dt.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_volume_velocity import (
+    vocal_fold_model_matrix,
+)
+
+
+def expm_coefficients(A: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Coefficients of the matrix exponential exp(A t) = C I + S (A - s I) of 2x2 matrices.
+
+    Args:
+        A: np.ndarray[float], shape (N, 2, 2)
+            Matrices.
+        t: np.ndarray[float], shape (T,)
+            Times.
+
+    Returns:
+        C: np.ndarray[float], shape (N, T)
+        S: np.ndarray[float], shape (N, T)
+        s: np.ndarray[float], shape (N,)
+            Half trace of A.
+    """
+    s = 0.5 * (A[:, 0, 0] + A[:, 1, 1])
+    det = A[:, 0, 0] * A[:, 1, 1] - A[:, 0, 1] * A[:, 1, 0]
+    q = np.sqrt((s ** 2 - det).astype(complex))[:, None]  # imaginary if oscillating
+    t = np.asarray(t, dtype=float)[None, :]
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        e_plus = np.exp((s[:, None] + q) * t)
+        e_minus = np.exp((s[:, None] - q) * t)
+        C = 0.5 * (e_plus + e_minus).real
+        # sinh(q t) / q, by its series if q t is small
+        qt = np.abs(q * t)
+        S = np.where(
+            qt > 1e-4,
+            ((e_plus - e_minus) / (2 * np.where(q == 0, 1, q))).real,
+            (np.exp(s[:, None] * t) * t * (1 + (q * t) ** 2 / 6).real),
+        )
+    return C, S, s
+
+
+def expm_2x2(A: np.ndarray, t: float) -> np.ndarray:
+    """ Matrix exponential exp(A t) of a batch of 2x2 matrices.
+
+    Args:
+        A: np.ndarray[float], shape (N, 2, 2)
+            Matrices.
+        t: float
+            Time.
+
+    Returns:
+        E: np.ndarray[float], shape (N, 2, 2)
+            Matrix exponentials.
+    """
+    C, S, s = expm_coefficients(A, [t])
+    I = np.eye(2)
+    return C[:, 0, None, None] * I + S[:, 0, None, None] * (A - s[:, None, None] * I)
+
+
+def linear_propagator(
+    model_params: np.ndarray, init_states: np.ndarray, dt: float, num_tsteps: int
+) -> np.ndarray:
+    """ Trajectories of the volume velocity model for a batch of parameters on the grid
+    init_t + k * dt, k = 1, ..., num_tsteps, same as the dense ode_solver.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta].
+        init_states: np.ndarray[float], shape (N, 2)
+            Initial states [u1, u2].
+        dt: float
+            Time step increment.
+        num_tsteps: int
+            Number of returned time steps.
+
+    Returns:
+        U: np.ndarray[float], shape (N, num_tsteps, 2)
+            Model states.
+    """
+    model_params = np.atleast_2d(model_params)
+    U0 = np.broadcast_to(np.asarray(init_states, dtype=float), (len(model_params), 2))
+    A = vocal_fold_model_matrix(model_params[:, 0], model_params[:, 1], model_params[:, 2])
+
+    C, S, s = expm_coefficients(A, dt * np.arange(1, num_tsteps + 1))
+    W = np.einsum("nij,nj->ni", A, U0) - s[:, None] * U0  # (A - s I) U0
+    return C[:, :, None] * U0[:, None, :] + S[:, :, None] * W[:, None, :]
+
+
+def linear_adjoint_propagator(
+    model_params: np.ndarray,
+    forcing: np.ndarray,
+    dt: float,
+    terminal_states: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """ Adjoint of the volume velocity model dL = -A^T L - forcing, solved backward from
+    the last sample to the initial time, for a batch of parameters.
+
+    Args:
+        model_params: np.ndarray[float], shape (N, 3)
+            Model parameters [alpha, beta, delta].
+        forcing: np.ndarray[float], shape (N, T, 2)
+            Loss gradient dg/dU at the samples init_t + k * dt, k = 1, ..., T.
+        dt: float
+            Time step increment.
+        terminal_states: np.ndarray[float], shape (N, 2)
+            Adjoint states at the last sample. Default: 0.
+
+    Returns:
+        L: np.ndarray[float], shape (N, T + 1, 2)
+            Adjoint states at init_t and the samples; L[:, 0] is the gradient of the loss
+            w.r.t. the initial states.
+    """
+    model_params = np.atleast_2d(model_params)
+    A = vocal_fold_model_matrix(model_params[:, 0], model_params[:, 1], model_params[:, 2])
+    E = expm_2x2(np.transpose(A, (0, 2, 1)), dt)  # exact step exp(A^T dt), L[k + 1] -> L[k]
+
+    # L[k] = E L[k + 1] + dt / 2 * (f[k] + E f[k + 1]), as y[j] = E y[j - 1] + b[j] in
+    # reversed time j = T - k
+    f = np.asarray(forcing, dtype=float)[:, ::-1]
+    f = np.concatenate([f, np.zeros((len(f), 1, 2))], axis=1)  # no forcing before the samples
+    y = np.empty_like(f)
+    y[:, 1:] = 0.5 * dt * (f[:, 1:] + np.einsum("nij,ntj->nti", E, f[:, :-1]))
+    y[:, 0] = 0 if terminal_states is None else terminal_states
+
+    # Parallel prefix scan, y[j] += E^s y[j - s] for s = 1, 2, 4, ...
+    P = E
+    step = 1
+    while step < y.shape[1]:
+        y[:, step:] += np.einsum("nij,ntj->nti", P, y[:, :-step])
+        P = np.matmul(P, P)
+        step *= 2
+    return y[:, ::-1]
+
+
+def linear_adjoint_gradient(
+    U: np.ndarray, L: np.ndarray, dt: float, init_states: np.ndarray
+) -> np.ndarray:
+    """ Parameter gradients dJ/dp = int L^T dA/dp U dt of the volume velocity model, by the
+    trapezoidal rule from the initial time over the samples.
+
+    Args:
+        U: np.ndarray[float], shape (N, T, 2)
+            Model states from linear_propagator.
+        L: np.ndarray[float], shape (N, T + 1, 2)
+            Adjoint states from linear_adjoint_propagator.
+        dt: float
+            Time step increment.
+        init_states: np.ndarray[float], shape (N, 2)
+            Initial states [u1, u2].
+
+    Returns:
+        grad: np.ndarray[float], shape (N, 3)
+            Gradients [d_alpha, d_beta, d_delta].
+    """
+    U0 = np.reshape(np.asarray(init_states, dtype=float), (-1, 1, 2))  # shared or per member
+    U0 = np.broadcast_to(U0, (len(U), 1, 2))
+    U = np.concatenate([U0, U], axis=1)
+    w = np.full(U.shape[1], dt)
+    w[[0, -1]] *= 0.5
+    l2u2 = np.dot(L[:, :, 1] * U[:, :, 1], w)
+    l2u1 = np.dot(L[:, :, 1] * U[:, :, 0], w)
+    # dA/dalpha = [[0, 0], [0, 2]], dA/dbeta = [[0, 0], [0, -1]], dA/ddelta = [[0, 0], [-1, 0]]
+    return np.stack([2 * l2u2, -l2u2, -l2u1], axis=1)
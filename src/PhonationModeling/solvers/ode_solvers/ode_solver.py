@@ -1,8 +1,99 @@
 # -*- coding: utf-8 -*-
-from typing import Callable, List
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
 
 import numpy as np
-from scipy.integrate import ode
+from scipy.integrate import BDF, DOP853, RK45, ode, odeint
+
+from PhonationModeling.solvers.ode_solvers.trajectory import Trajectory
+
+DENSE_SOLVERS = {"vode": BDF, "dopri5": RK45, "dop853": DOP853}
+
+ABORT_REASONS = ["amplitude", "nonfinite", "nfev", "time", "failed"]
+
+
+class SolverGuard(NamedTuple):
+    """ Limits of a monitored integration, checked every check_every model evaluations.
+
+    Attributes:
+        max_amplitude: float
+            Bound of the absolute model states. 0: unbounded, still checked for NaN/Inf.
+        max_nfev: int
+            Budget of model evaluations. 0: unlimited.
+        max_time: float
+            Wall time budget, s. 0: unlimited.
+        num_bounded: int
+            Number of leading states bounded and checked for NaN/Inf, e.g. the model states
+            of an augmented sensitivity system. None: all states.
+        check_every: int
+            Number of model evaluations between the checks, which cost about a model
+            evaluation of the vocal fold model.
+    """
+
+    max_amplitude: float = 0.0
+    max_nfev: int = 0
+    max_time: float = 0.0
+    num_bounded: Optional[int] = None
+    check_every: int = 10
+
+
+class IntegrationAborted(RuntimeError):
+    """ Integration aborted on a violation of its SolverGuard, or failed while guarded.
+
+    Attributes:
+        reason: str
+            Violation, see ABORT_REASONS.
+        t: float
+            Simulation time of the abort.
+        nfev: int
+            Number of model evaluations.
+        elapsed: float
+            Wall time of the integration, s.
+    """
+
+    def __init__(self, reason: str, t: float, nfev: int, elapsed: float):
+        super().__init__(
+            f"{reason} at t = {t:.4g} after {nfev:d} model evaluations, {elapsed:.2f} s"
+        )
+        self.reason = reason
+        self.t = t
+        self.nfev = nfev
+        self.elapsed = elapsed
+
+    def __reduce__(self):  # picklable across processes
+        return self.__class__, (self.reason, self.t, self.nfev, self.elapsed)
+
+
+class _Monitor(object):
+    """ Model wrapper checking the states of each evaluation against a SolverGuard. """
+
+    def __init__(self, model: Callable, guard: SolverGuard):
+        self.model = model
+        self.guard = guard
+        self.bound = guard.max_amplitude if guard.max_amplitude > 0 else np.inf
+        self.nfev = 0
+        self.next_check = 0
+        self.start = time.perf_counter()
+
+    def __call__(self, t: float, y: np.ndarray, *args) -> np.ndarray:
+        self.nfev += 1
+        if self.nfev >= self.next_check:
+            self.check(t, y)
+        return self.model(t, y, *args)
+
+    def check(self, t: float, y: np.ndarray):
+        guard = self.guard
+        self.next_check = self.nfev + guard.check_every
+        amplitude = np.abs(y[: guard.num_bounded]).max()
+        if not amplitude < self.bound:  # also NaN
+            self.abort("amplitude" if np.isfinite(amplitude) else "nonfinite", t)
+        if 0 < guard.max_nfev < self.nfev:
+            self.abort("nfev", t)
+        if guard.max_time > 0 and time.perf_counter() - self.start > guard.max_time:
+            self.abort("time", t)
+
+    def abort(self, reason: str, t: float):
+        raise IntegrationAborted(reason, float(t), self.nfev, time.perf_counter() - self.start)
 
 
 def ode_solver(
@@ -15,7 +106,14 @@ def ode_solver(
     ixpr: int = 1,
     dt: float = 0.1,
     tmax: float = 1000,
-) -> np.ndarray:
+    dense: bool = False,
+    num_tsteps: Optional[int] = None,
+    atol: float = 1e-12,
+    rtol: float = 1e-6,
+    out: Optional[Trajectory] = None,
+    stats: Optional[Dict] = None,
+    guard: Optional[SolverGuard] = None,
+) -> Union[np.ndarray, Trajectory]:
     """ ODE solver.
 
     Args:
@@ -37,11 +135,53 @@ def ode_solver(
             Time step increment.
         tmax: float
             Maximum simulation time.
+        dense: bool
+            Whether to integrate adaptively with dense output and sample all grid times
+            init_t + k * dt, k = 1, ..., num_tsteps, into a preallocated array, instead of
+            stopping the integrator at every time step.
+        num_tsteps: int
+            Number of returned time steps in dense mode. Default round((tmax - init_t) / dt).
+        atol: float
+            Absolute tolerance in dense mode. Default same as scipy.integrate.ode lsoda.
+        rtol: float
+            Relative tolerance in dense mode. Default same as scipy.integrate.ode lsoda.
+        out: Trajectory
+            Preallocated output of at least num_tsteps steps in dense mode, if given.
+        stats: Dict
+            If given, updated with the solver statistics in dense mode, as dae_solver's:
+            nsteps (number of steps), nfcns (model evaluations), njacs (jacobian evaluations).
+        guard: SolverGuard
+            If given, the integration is monitored and raises IntegrationAborted as soon as
+            a limit is violated, or on failure instead of returning a partial solution.
 
     Returns:
-        sol: np.ndarray[float]
-            Solution [time, model states].
+        sol: np.ndarray[float] or Trajectory
+            Solution [time, model states], or out filled with the model states.
+            In dense mode it has exactly num_tsteps rows, unless the integration failed.
     """
+    monitor = None
+    if guard is not None:
+        model = monitor = _Monitor(model, guard)
+
+    if dense is True:
+        return _dense_ode_solver(
+            model,
+            model_jacobian,
+            model_params,
+            init_state,
+            init_t,
+            solver=solver,
+            dt=dt,
+            num_tsteps=(
+                num_tsteps if num_tsteps is not None else int(round((tmax - init_t) / dt))
+            ),
+            atol=atol,
+            rtol=rtol,
+            out=out,
+            stats=stats,
+            monitor=monitor,
+        )
+
     sol = []
 
     r = ode(model, model_jacobian)
@@ -54,5 +194,104 @@ def ode_solver(
     while r.successful() and r.t < tmax:
         r.integrate(r.t + dt)
         sol.append([r.t, *list(r.y)])
+    if monitor is not None and not r.successful():
+        monitor.abort("failed", r.t)
 
     return np.array(sol)  # (t, [p, dp]) tangent bundle
+
+
+def _dense_ode_solver(
+    model: Callable,
+    model_jacobian: Callable,
+    model_params: List[float],
+    init_state: List[float],
+    init_t: float,
+    solver: str,
+    dt: float,
+    num_tsteps: int,
+    atol: float,
+    rtol: float,
+    out: Optional[Trajectory] = None,
+    stats: Optional[Dict] = None,
+    monitor: Optional[_Monitor] = None,
+) -> Union[np.ndarray, Trajectory]:
+    """ Dense output mode of ode_solver.
+    LSODA runs in a single odeint call, which interpolates all grid times internally.
+    Other solvers loop over their internal (adaptive) steps, which are much fewer than the
+    time steps, and evaluate the dense output of each step at all the grid times it covers.
+    The states are written into out if given, else into the legacy [time, states] array.
+    """
+    grid = init_t + dt * np.arange(1, num_tsteps + 1)
+    if out is not None:
+        assert out.capacity >= num_tsteps, (
+            f"Output capacity ({out.capacity:d}) < time steps ({num_tsteps:d})"
+        )
+        states = out.buffer[:, :num_tsteps]  # (num_states, num_tsteps) view
+    else:
+        sol = np.empty((num_tsteps, 1 + len(init_state)))
+        sol[:, 0] = grid
+        states = sol[:, 1:].T
+
+    def result(num_filled: int) -> Union[np.ndarray, Trajectory]:
+        if out is not None:
+            out.reset(init_t + dt, dt, num_filled)
+            return out
+        return sol[:num_filled]  # (t, [p, dp]) tangent bundle
+
+    if solver == "lsoda":
+        y, info = odeint(
+            model,
+            init_state,
+            np.concatenate([[init_t], grid]),
+            args=tuple(model_params),
+            Dfun=model_jacobian,
+            tfirst=True,
+            full_output=True,
+            atol=atol,
+            rtol=rtol,
+        )
+        num_filled = num_tsteps
+        if info["message"] != "Integration successful.":
+            if monitor is not None:
+                monitor.abort("failed", info["tcur"][-1])
+            # leading output times reached, tcur is left uninitialized past the failure
+            num_filled = int(np.argmin(info["tcur"] >= grid))
+        states[:, :num_filled] = y[1 : num_filled + 1].T
+        if stats is not None:  # cumulative counts at the last output time
+            stats.update(
+                nsteps=int(info["nst"][-1]), nfcns=int(info["nfe"][-1]), njacs=int(info["nje"][-1])
+            )
+        return result(num_filled)
+
+    def fun(t: float, y: np.ndarray):
+        return model(t, y, *model_params)
+
+    def jac(t: float, y: np.ndarray):
+        return model_jacobian(t, y, *model_params)
+
+    options = dict(atol=atol, rtol=rtol)
+    if solver == "vode":  # implicit method uses the jacobian
+        options["jac"] = jac
+    r = DENSE_SOLVERS[solver](fun, init_t, np.asarray(init_state, dtype=float), grid[-1], **options)
+
+    def update_stats():
+        if stats is not None:
+            stats.update(nsteps=num_steps, nfcns=r.nfev, njacs=r.njev)
+
+    k = 0  # number of filled time steps
+    num_steps = 0
+    while k < num_tsteps:
+        r.step()
+        num_steps += 1
+        if r.status == "failed":
+            update_stats()
+            if monitor is not None:
+                monitor.abort("failed", r.t)
+            return result(k)
+        k_new = num_tsteps if r.status == "finished" else np.searchsorted(grid, r.t, "right")
+        if k_new > k:
+            states[:, k:k_new] = r.dense_output()(grid[k:k_new])
+            k = k_new
+
+    update_stats()
+    return result(k)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from PhonationModeling.solvers.ode_solvers.ode_solver import SolverGuard, ode_solver
+
+
+def sensitivity_solver(
+    model: Callable,
+    model_jacobian: Callable,
+    model_param_jacobian: Callable,
+    model_params: List[float],
+    init_state: List[float],
+    init_t: float,
+    solver: str = "lsoda",
+    dt: float = 0.1,
+    num_tsteps: int = 1000,
+    atol: float = 1e-12,
+    rtol: float = 1e-6,
+    stats: Optional[Dict] = None,
+    guard: Optional[SolverGuard] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Forward sensitivity solver.
+    Integrates the model dZ = f(t, Z, p) together with its sensitivities S = dZ/dp,
+        dS = df/dZ * S + df/dp,  S(init_t) = 0,
+    in one pass on the grid init_t + k * dt, k = 1, ..., num_tsteps.
+
+    Args:
+        model: Callable
+            ODE model dZ = f(t, Z, *p).
+        model_jacobian: Callable
+            Jacobian of ODE model w.r.t. the states, df/dZ.
+        model_param_jacobian: Callable
+            Jacobian of ODE model w.r.t. the parameters, df/dp.
+        model_params: List[float]
+            Model parameters p.
+        init_state: List[float]
+            Initial model state, independent of the parameters.
+        init_t: float
+            Initial simulation time.
+        solver: str
+            Solver name. Options: vode, dopri5, dop853, lsoda.
+        dt: float
+            Time step increment.
+        num_tsteps: int
+            Number of returned time steps.
+        atol: float
+            Absolute tolerance.
+        rtol: float
+            Relative tolerance.
+        stats: Dict
+            If given, updated with the solver statistics, see ode_solver.
+        guard: SolverGuard
+            If given, monitor of the integration, see ode_solver. The amplitude bound
+            applies to the model states, not to the sensitivities, unless num_bounded is set.
+
+    Returns:
+        sol: np.ndarray[float], shape (num_tsteps, 1 + num_states)
+            Solution [time, model states], same as ode_solver.
+        sens: np.ndarray[float], shape (num_tsteps, num_states, num_params)
+            Sensitivities dZ/dp of the model states.
+    """
+    num_states = len(init_state)
+    num_params = len(model_params)
+
+    def sensitivity_model(t: float, Y: np.ndarray, *p: float) -> np.ndarray:
+        Z = Y[:num_states]
+        S = Y[num_states:].reshape(num_states, num_params)
+
+        dY = np.empty_like(Y)
+        dY[:num_states] = model(t, Z, *p)
+        dY[num_states:] = (
+            np.dot(model_jacobian(t, Z, *p), S) + np.asarray(model_param_jacobian(t, Z, *p))
+        ).ravel()
+        return dY
+
+    def sensitivity_jacobian(t: float, Y: np.ndarray, *p: float) -> np.ndarray:
+        # Block diagonal approximation, neglecting the second order terms d(df/dZ * S)/dZ,
+        # which is sufficient for the Newton iterations of the implicit solvers
+        J = np.asarray(model_jacobian(t, Y[:num_states], *p))
+        J_aug = np.zeros((len(Y), len(Y)))
+        J_aug[:num_states, :num_states] = J
+        J_aug[num_states:, num_states:] = np.kron(J, np.eye(num_params))
+        return J_aug
+
+    init_aug = np.zeros(num_states * (1 + num_params))
+    init_aug[:num_states] = init_state
+
+    sol_aug = ode_solver(
+        sensitivity_model,
+        sensitivity_jacobian,
+        model_params,
+        init_aug,
+        init_t,
+        solver=solver,
+        dt=dt,
+        dense=True,
+        num_tsteps=num_tsteps,
+        atol=atol,
+        rtol=rtol,
+        stats=stats,
+        guard=(
+            guard._replace(num_bounded=num_states)
+            if guard is not None and guard.num_bounded is None
+            else guard
+        ),
+    )
+
+    sol = sol_aug[:, : 1 + num_states]
+    sens = sol_aug[:, 1 + num_states :].reshape(len(sol_aug), num_states, num_params)
+    return sol, sens
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+""" Checkpointed discrete adjoint against the discrete adjoint over the full trajectory. """
+import numpy as np
+import pytest
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_init_state,
+    x0,
+)
+from PhonationModeling.solvers.ode_solvers.checkpointing import (
+    checkpointed_adjoint_gradient,
+    checkpointed_rk4_solver,
+    segment_bounds,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import (
+    discrete_adjoint_gradient,
+    rk4_solver,
+)
+
+PARAMS = [0.8, 0.32, 0.4]
+DT = 0.05
+NUM_TSTEPS = 1000
+
+
+def test_segment_bounds():
+    np.testing.assert_array_equal(segment_bounds(10, 3), [0, 3, 6, 10])
+    np.testing.assert_array_equal(segment_bounds(10, 20), np.arange(11))  # at most T
+    np.testing.assert_array_equal(segment_bounds(10, 0), [0, 10])  # at least 1
+    assert len(segment_bounds(10000)) == 4  # ceil(10000 / SEGMENT_LENGTH) segments
+
+
+@pytest.mark.parametrize("num_checkpoints", [1, 7, 32, NUM_TSTEPS])
+def test_checkpointed_gradient(num_checkpoints):
+    sol = rk4_solver(PARAMS, vdp_init_state, 0.0, DT, NUM_TSTEPS)
+    v_full = sol[:, 1] + sol[:, 3] + 2 * x0
+    R = v_full / np.linalg.norm(v_full) - np.cos(0.3 * np.arange(NUM_TSTEPS)) / 30
+    grad = discrete_adjoint_gradient(
+        sol, PARAMS, vdp_init_state, DT, R, 1.0, x0, dlog_time_scaling=[0, -1 / PARAMS[1], 0]
+    )
+
+    checkpoints, v = checkpointed_rk4_solver(
+        PARAMS, vdp_init_state, DT, NUM_TSTEPS, x0, num_checkpoints=num_checkpoints
+    )
+    assert checkpoints.shape == (num_checkpoints, 4)
+    np.testing.assert_array_equal(v, v_full)  # same discretization
+    stats = {}
+    grad_checkpointed = checkpointed_adjoint_gradient(
+        checkpoints,
+        v,
+        PARAMS,
+        DT,
+        R,
+        1.0,
+        dlog_time_scaling=[0, -1 / PARAMS[1], 0],
+        stats=stats,
+    )
+    np.testing.assert_allclose(grad_checkpointed, grad, rtol=1e-10, atol=1e-14)
+    assert stats["checkpoint_bytes"] == checkpoints.nbytes
+    assert stats["segment_bytes"] > 0
+
+
+def test_checkpointed_gradient_untraced():
+    """ Without stats, the memory is not traced and the gradient is unchanged. """
+    checkpoints, v = checkpointed_rk4_solver(PARAMS, vdp_init_state, DT, 200, x0, 4)
+    R = v / np.linalg.norm(v) - 1 / np.sqrt(200)
+    grads = [
+        checkpointed_adjoint_gradient(checkpoints, v, PARAMS, DT, R, 1.0, stats=stats)
+        for stats in [None, {}]
+    ]
+    np.testing.assert_array_equal(grads[0], grads[1])
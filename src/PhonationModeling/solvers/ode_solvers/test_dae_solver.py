@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+""" DAESession against the legacy dae_solver on the adjoint model of the displacement model. """
+import numpy as np
+import pytest
+
+pytest.importorskip("assimulo")
+
+from PhonationModeling.models.vocal_fold.adjoint_model_displacement import (  # noqa: E402
+    AdjointModel,
+    adjoint_model,
+)
+from PhonationModeling.solvers.ode_solvers.dae_solver import DAESession, dae_solver  # noqa: E402
+
+FS = 8000
+NUM_TSTEPS = 200
+T = NUM_TSTEPS / float(FS)
+SOLVER_KWARGS = dict(
+    tfinal=0, backward=True, ncp=NUM_TSTEPS, algvar=[0, 1, 0, 1], suppress_alg=True, verbosity=50
+)
+
+
+def adjoint_data(alpha: float, beta: float, delta: float):
+    """ Synthetic displacements, velocities and residual term of a forward solution. """
+    t = np.arange(NUM_TSTEPS) / float(FS)
+    phase = 2 * np.pi * 200 * t
+    X = 0.1 * np.stack([np.sin(phase), np.sin(phase + delta)], axis=1)
+    dX = 0.1 * np.stack([np.cos(phase), np.cos(phase + delta)], axis=1)
+    R = (X.sum(axis=1) + 0.2) * alpha - np.sin(4 * phase) * beta
+    return (alpha, beta, delta, X, dX, R / np.linalg.norm(R))
+
+
+def terminal_conditions(R: np.ndarray):
+    return [0.0, 0.0, 0.0, 0.0], [0.0, -R[-1], 0.0, -R[-1]]
+
+
+def legacy_solve(residual, jac, R):
+    stats = {}
+    y0, yd0 = terminal_conditions(R)
+    t, y, yd = dae_solver(
+        residual, y0, yd0, T, usejac=True, jac=jac, display_progress=False, stats=stats,
+        **SOLVER_KWARGS
+    )
+    return np.asarray(t), np.asarray(y), np.asarray(yd), stats
+
+
+def assert_same_solution(session_sol, session_stats, legacy_sol):
+    t, y, yd, stats = legacy_sol
+    np.testing.assert_allclose(session_sol[0], t, rtol=1e-12, atol=1e-15)
+    np.testing.assert_allclose(session_sol[1], y, rtol=1e-10, atol=1e-14)
+    np.testing.assert_allclose(session_sol[2], yd, rtol=1e-10, atol=1e-14)
+    assert session_stats["nsteps"] == stats["nsteps"]  # per solve, not cumulative
+    assert session_stats["nfcns"] == stats["nfcns"]
+
+
+def test_session_replaced_callables():
+    """ Repeated solves with new adjoint_model closures per solve, as the nearest path. """
+    params = [(0.5, 0.2, 0.8), (0.6, 0.3, 0.4), (0.5, 0.2, 0.8)]
+    session = None
+    for p in params:
+        alpha, beta, delta, X, dX, R = adjoint_data(*p)
+        residual, jac = adjoint_model(alpha, beta, delta, X, dX, R, FS, 0, T)
+        y0, yd0 = terminal_conditions(R)
+        if session is None:
+            session = DAESession(residual, y0, yd0, T, jac=jac, **SOLVER_KWARGS)
+        stats = {}
+        sol = session.solve(y0, yd0, residual=residual, jac=jac, stats=stats)
+        assert_same_solution(sol, stats, legacy_solve(residual, jac, R))
+        assert len(session.y) == len(session.yd) == session.y.capacity == NUM_TSTEPS
+
+
+def test_session_updated_model():
+    """ Repeated solves of an AdjointModel updated in place, as the hermite path. """
+    params = [(0.5, 0.2, 0.8), (0.6, 0.3, 0.4)]
+    data = adjoint_data(*params[0])
+    model = AdjointModel(*data, FS, 0, interpolation="hermite")
+    y0, yd0 = terminal_conditions(data[-1])
+    session = DAESession(model.residual, y0, yd0, T, jac=model.jac, **SOLVER_KWARGS)
+    for p in params:
+        alpha, beta, delta, X, dX, R = adjoint_data(*p)
+        y0, yd0 = terminal_conditions(R)
+        model.update(alpha, beta, delta, X, dX, R)
+        stats = {}
+        sol = [np.copy(a) for a in session.solve(y0, yd0, stats=stats)]
+        reference = AdjointModel(alpha, beta, delta, X, dX, R, FS, 0, interpolation="hermite")
+        assert_same_solution(sol, stats, legacy_solve(reference.residual, reference.jac, R))
+
+
+def test_session_float32_outputs():
+    alpha, beta, delta, X, dX, R = adjoint_data(0.5, 0.2, 0.8)
+    residual, jac = adjoint_model(alpha, beta, delta, X, dX, R, FS, 0, T)
+    y0, yd0 = terminal_conditions(R)
+    session = DAESession(residual, y0, yd0, T, jac=jac, dtype=np.float32, **SOLVER_KWARGS)
+    _, y, _ = session.solve(y0, yd0)
+    _, y_legacy, _, _ = legacy_solve(residual, jac, R)
+    assert y.dtype == np.float32
+    np.testing.assert_allclose(y, y_legacy, rtol=1e-5, atol=1e-7 * np.abs(y_legacy).max())
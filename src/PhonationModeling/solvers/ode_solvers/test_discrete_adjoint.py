@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+""" Discrete adjoint gradient against central finite differences of the RK4 loss. """
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_init_state,
+    x0,
+)
+from PhonationModeling.solvers.ode_solvers.discrete_adjoint import (
+    discrete_adjoint_gradient,
+    rk4_solver,
+)
+
+SAMPLE_RATE = 2000
+NUM_TSTEPS = 400
+
+
+def target_flow() -> np.ndarray:
+    t = np.arange(NUM_TSTEPS) / float(SAMPLE_RATE)
+    flow = 1 + 0.5 * np.sin(2 * np.pi * 120 * t) + 0.1 * np.sin(2 * np.pi * 240 * t)
+    return flow / np.linalg.norm(flow)
+
+
+def forward(params: np.ndarray):
+    """ RK4 solution, step size and residual of the normalized flow, as the estimator. """
+    dt = B / (params[1] * M) / float(SAMPLE_RATE)  # time_scaling / fs
+    sol = rk4_solver(params, vdp_init_state, 0.0, dt, NUM_TSTEPS)
+    v = sol[:, 1] + sol[:, 3] + 2 * x0
+    glottal_flow = target_flow()
+    R = v / np.linalg.norm(v) * np.linalg.norm(glottal_flow) - glottal_flow
+    return sol, dt, R
+
+
+def loss(params: np.ndarray) -> float:
+    return 0.5 * np.sum(forward(params)[2] ** 2)
+
+
+def test_discrete_adjoint_finite_differences():
+    for params in [np.array([0.8, 0.32, 0.4]), np.array([0.5, 0.2, 0.1])]:
+        sol, dt, R = forward(params)
+        grad = discrete_adjoint_gradient(
+            sol, params, vdp_init_state, dt, R, 1.0, x0, dlog_time_scaling=[0, -1 / params[1], 0]
+        )
+        eps = 1e-6
+        grad_fd = np.array(
+            [
+                (loss(params + eps * e) - loss(params - eps * e)) / (2 * eps)
+                for e in np.eye(3)
+            ]
+        )
+        np.testing.assert_allclose(grad, grad_fd, rtol=1e-5, atol=1e-8 * np.abs(grad_fd).max())
+
+
+def test_discrete_adjoint_fixed_step():
+    """ Without dlog_time_scaling, the step size is held fixed. """
+    params = np.array([0.8, 0.32, 0.4])
+    sol, dt, R = forward(params)
+    grad = discrete_adjoint_gradient(sol, params, vdp_init_state, dt, R, 1.0, x0)
+
+    def loss_fixed_step(p: np.ndarray) -> float:
+        sol = rk4_solver(p, vdp_init_state, 0.0, dt, NUM_TSTEPS)
+        v = sol[:, 1] + sol[:, 3] + 2 * x0
+        glottal_flow = target_flow()
+        return 0.5 * np.sum((v / np.linalg.norm(v) - glottal_flow) ** 2)
+
+    eps = 1e-6
+    grad_fd = np.array(
+        [
+            (loss_fixed_step(params + eps * e) - loss_fixed_step(params - eps * e)) / (2 * eps)
+            for e in np.eye(3)
+        ]
+    )
+    np.testing.assert_allclose(grad, grad_fd, rtol=1e-5, atol=1e-8 * np.abs(grad_fd).max())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+""" Ensemble solves of the vocal fold model against per-member odeint solves. """
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_coupled,
+    vdp_coupled_batch,
+    vdp_init_state,
+    vdp_jacobian,
+    vdp_jacobian_batch,
+)
+from PhonationModeling.solvers.ode_solvers.ensemble_solver import ensemble_ode_solver
+
+SAMPLE_RATE = 8000
+NUM_TSTEPS = 800
+PARAMS = np.array([[0.5, 0.25, 0.7], [0.8, 0.32, 0.4], [0.3, 0.2, 0.1]])
+DT = B / (PARAMS[:, 1] * M) / SAMPLE_RATE  # time_scaling / fs, per member
+
+
+def solve(method: str, num_substeps: int = 1, params=PARAMS, dt=DT) -> np.ndarray:
+    init_states = np.tile(vdp_init_state, (len(params), 1))
+    return ensemble_ode_solver(
+        vdp_coupled_batch,
+        vdp_jacobian_batch,
+        params,
+        init_states,
+        0.0,
+        dt,
+        NUM_TSTEPS,
+        method=method,
+        num_substeps=num_substeps,
+    )
+
+
+@pytest.fixture(scope="module")
+def reference() -> np.ndarray:
+    return np.stack(
+        [
+            odeint(
+                vdp_coupled,
+                vdp_init_state,
+                dt * np.arange(NUM_TSTEPS + 1),
+                args=tuple(params),
+                Dfun=vdp_jacobian,
+                tfirst=True,
+                atol=1e-12,
+                rtol=1e-10,
+            )[1:]
+            for params, dt in zip(PARAMS, DT)
+        ]
+    )
+
+
+def test_rk4(reference):
+    sol = solve("rk4")
+    assert sol.shape == (len(PARAMS), NUM_TSTEPS, 4)
+    np.testing.assert_allclose(sol, reference, atol=1e-2)
+    np.testing.assert_allclose(solve("rk4", 4), reference, atol=1e-4)
+
+    # Members are independent of the batch
+    np.testing.assert_allclose(solve("rk4", params=PARAMS[1:2], dt=DT[1:2])[0], sol[1])
+
+
+def test_ros2(reference):
+    """ Accurate with tens of substeps per sample only, see ros2_step. """
+    assert np.abs(solve("ros2") - reference).max() > 1.0
+    np.testing.assert_allclose(solve("ros2", 64), reference, atol=1e-2)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        solve("euler")
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+""" Closed-form batched propagator of the volume velocity model against odeint, and its
+adjoint gradient against finite differences.
+"""
+import numpy as np
+from scipy.integrate import odeint
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_volume_velocity import (
+    vdp_jacobian,
+    vocal_fold_model,
+    vocal_fold_model_matrix,
+)
+from PhonationModeling.solvers.ode_solvers.linear_propagator import (
+    expm_2x2,
+    linear_adjoint_gradient,
+    linear_adjoint_propagator,
+    linear_propagator,
+)
+
+# Oscillating, overdamped, critically damped (beta - 2 alpha = 2, delta = 0) and growing
+PARAMS = np.array([[0.5, 0.2, 0.8], [0.1, 3.0, 0.1], [0.5, 3.0, 0.0], [0.6, 0.4, 0.3]])
+INIT_STATES = np.array([[0.1, 0.0], [0.0, 0.2], [0.1, -0.1], [0.05, 0.05]])
+DT = 0.01
+NUM_TSTEPS = 500
+
+
+def test_model_matrix():
+    for (alpha, beta, delta), A in zip(PARAMS, vocal_fold_model_matrix(*PARAMS.T)):
+        np.testing.assert_array_equal(A, vdp_jacobian([0, 0], 0, alpha, beta, delta))
+    assert vocal_fold_model_matrix(0.5, 0.2, 0.8).shape == (1, 2, 2)
+
+
+def test_expm_2x2():
+    from scipy.linalg import expm
+
+    A = vocal_fold_model_matrix(*PARAMS.T)
+    for a, e in zip(A, expm_2x2(A, 0.7)):
+        np.testing.assert_allclose(e, expm(0.7 * a), rtol=1e-12, atol=1e-14)
+
+
+def test_linear_propagator_odeint():
+    U = linear_propagator(PARAMS, INIT_STATES, DT, NUM_TSTEPS)
+    assert U.shape == (len(PARAMS), NUM_TSTEPS, 2)
+    t = DT * np.arange(NUM_TSTEPS + 1)
+    for n, params in enumerate(PARAMS):
+        reference = odeint(
+            vocal_fold_model,
+            INIT_STATES[n],
+            t,
+            args=tuple(params),
+            Dfun=vdp_jacobian,
+            rtol=1e-12,
+            atol=1e-14,
+        )[1:]
+        np.testing.assert_allclose(U[n], reference, rtol=1e-8, atol=1e-12)
+
+
+def loss(params: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """ Trapezoidal J = int 0.5 * (u1 - target)^2 dt from the initial time, per parameter set. """
+    U = linear_propagator(params, INIT_STATES, DT, NUM_TSTEPS)
+    g = 0.5 * (np.concatenate([INIT_STATES[:, None, 0], U[:, :, 0]], axis=1) - target) ** 2
+    return DT * (g.sum(axis=1) - 0.5 * (g[:, 0] + g[:, -1]))
+
+
+def test_linear_adjoint_gradient():
+    target = 0.05 * np.sin(np.linspace(0, 6 * np.pi, NUM_TSTEPS + 1))
+    U = linear_propagator(PARAMS, INIT_STATES, DT, NUM_TSTEPS)
+    forcing = np.zeros_like(U)
+    forcing[:, :, 0] = U[:, :, 0] - target[1:]
+    L = linear_adjoint_propagator(PARAMS, forcing, DT)
+    assert L.shape == (len(PARAMS), NUM_TSTEPS + 1, 2)
+    grad = linear_adjoint_gradient(U, L, DT, INIT_STATES)
+
+    eps = 1e-6
+    grad_fd = np.stack(
+        [
+            (loss(PARAMS + eps * e, target) - loss(PARAMS - eps * e, target)) / (2 * eps)
+            for e in np.eye(3)
+        ],
+        axis=1,
+    )
+    np.testing.assert_allclose(grad, grad_fd, rtol=1e-3, atol=1e-4 * np.abs(grad_fd).max())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+""" Dense ode_solver against the stepping loop, and guarded integrations: aborts on the
+SolverGuard limits.
+"""
+import pickle
+import warnings
+
+import numpy as np
+import pytest
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_coupled,
+    vdp_init_state,
+    vdp_jacobian,
+)
+from PhonationModeling.solvers.ode_solvers.ode_solver import (
+    IntegrationAborted,
+    SolverGuard,
+    _Monitor,
+    ode_solver,
+)
+
+PARAMS = [0.8, 0.32, 0.4]  # oscillating, amplitude about 1
+DENSE_SOLVERS = ["lsoda", "vode", "dopri5", "dop853"]
+
+
+def solve(guard, params=PARAMS, num_tsteps=400, solver="lsoda", dt=0.05, init_t=0.0):
+    return ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        params,
+        vdp_init_state,
+        init_t,
+        solver=solver,
+        dt=dt,
+        dense=True,
+        num_tsteps=num_tsteps,
+        guard=guard,
+    )
+
+
+def blow_up(t: float, y: np.ndarray, c: float):
+    """ dy = c * y^2, y(0) = 1 / c blows up at t = 1. """
+    return [c * y[0] ** 2]
+
+
+def blow_up_jacobian(t: float, y: np.ndarray, c: float):
+    return [[2 * c * y[0]]]
+
+
+@pytest.mark.parametrize("solver", DENSE_SOLVERS)
+def test_dense(solver):
+    """ Exactly num_tsteps rows on the grid init_t + k * dt, as the stepping loop. """
+    init_t, dt, num_tsteps = 0.5, 0.05, 300
+    sol = solve(None, num_tsteps=num_tsteps, solver=solver, dt=dt, init_t=init_t)
+    assert sol.shape == (num_tsteps, 5)
+    np.testing.assert_allclose(sol[:, 0], init_t + dt * np.arange(1, num_tsteps + 1))
+    legacy = ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        PARAMS,
+        vdp_init_state,
+        init_t,
+        ixpr=0,
+        dt=dt,
+        tmax=init_t + num_tsteps * dt,
+    )
+    np.testing.assert_allclose(sol[:, 0], legacy[:num_tsteps, 0], rtol=1e-12)
+    np.testing.assert_allclose(sol[:, 1:], legacy[:num_tsteps, 1:], atol=5e-4)
+
+
+@pytest.mark.parametrize("solver", DENSE_SOLVERS)
+def test_dense_failed(solver):
+    """ A failed integration returns the grid times reached, or aborts if guarded. """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        sol = ode_solver(
+            blow_up, blow_up_jacobian, [1.0], [1.0], 0.0, solver=solver, dt=0.01, dense=True,
+            num_tsteps=200,
+        )
+        assert 90 <= len(sol) <= 100  # up to the blow-up at t = 1
+        np.testing.assert_allclose(sol[:, 0], 0.01 * np.arange(1, len(sol) + 1))
+        np.testing.assert_allclose(sol[:90, 1], 1 / (1 - sol[:90, 0]), rtol=1e-3)
+        with pytest.raises(IntegrationAborted) as info:
+            ode_solver(
+                blow_up, blow_up_jacobian, [1.0], [1.0], 0.0, solver=solver, dt=0.01, dense=True,
+                num_tsteps=200, guard=SolverGuard(),
+            )
+    assert info.value.reason == "failed"
+
+
+def test_guard_unviolated():
+    np.testing.assert_array_equal(solve(SolverGuard(1e3, 10000)), solve(None))
+
+
+@pytest.mark.parametrize("solver", ["lsoda", "dopri5"])
+def test_abort_amplitude(solver):
+    with pytest.raises(IntegrationAborted) as info:
+        solve(SolverGuard(max_amplitude=0.5), solver=solver)
+    assert info.value.reason == "amplitude" and 0 < info.value.t < 400 * 0.05
+
+
+def test_abort_nonfinite():
+    monitor = _Monitor(vdp_coupled, SolverGuard(check_every=1))
+    monitor(0.0, np.array(vdp_init_state), *PARAMS)
+    with pytest.raises(IntegrationAborted) as info:
+        monitor(0.5, np.array([0.0, np.nan, 0.0, 0.1]), *PARAMS)
+    assert info.value.reason == "nonfinite" and info.value.t == 0.5 and info.value.nfev == 2
+
+
+def test_abort_nfev():
+    with pytest.raises(IntegrationAborted) as info:
+        solve(SolverGuard(max_nfev=100, check_every=1))
+    assert info.value.reason == "nfev" and info.value.nfev == 101
+
+
+def test_abort_bounded_states():
+    """ Only the num_bounded leading states are bounded. """
+    monitor = _Monitor(vdp_coupled, SolverGuard(max_amplitude=1.0, num_bounded=4))
+    monitor.check(0.0, np.array([0.0, 0.1, 0.0, 0.1, 50.0]))
+    with pytest.raises(IntegrationAborted):
+        monitor.check(0.0, np.array([0.0, 2.0, 0.0, 0.1, 0.0]))
+
+
+def test_integration_aborted_pickle():
+    error = pickle.loads(pickle.dumps(IntegrationAborted("nfev", 1.5, 20, 0.25)))
+    assert isinstance(error, IntegrationAborted)
+    assert (error.reason, error.t, error.nfev, error.elapsed) == ("nfev", 1.5, 20, 0.25)
+    assert str(error) == "nfev at t = 1.5 after 20 model evaluations, 0.25 s"
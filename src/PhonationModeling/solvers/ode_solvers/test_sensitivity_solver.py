@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+""" Forward sensitivity gradient against central finite differences of the LSODA loss. """
+import numpy as np
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    B,
+    M,
+    vdp_coupled,
+    vdp_init_state,
+    vdp_jacobian,
+    vdp_param_jacobian,
+    x0,
+)
+from PhonationModeling.solvers.gradients import sensitivity_gradient
+from PhonationModeling.solvers.ode_solvers.ode_solver import ode_solver
+from PhonationModeling.solvers.ode_solvers.sensitivity_solver import sensitivity_solver
+
+SAMPLE_RATE = 2000
+NUM_TSTEPS = 400
+TOLERANCES = dict(atol=1e-12, rtol=1e-10)  # tight, for finite differences of the solves
+
+
+def target_flow() -> np.ndarray:
+    t = np.arange(NUM_TSTEPS) / float(SAMPLE_RATE)
+    flow = 1 + 0.5 * np.sin(2 * np.pi * 120 * t) + 0.1 * np.sin(2 * np.pi * 240 * t)
+    return flow / np.linalg.norm(flow)
+
+
+def residual(sol: np.ndarray) -> np.ndarray:
+    """ Residual of the normalized flow, as the estimator. """
+    v = sol[:, 1] + sol[:, 3] + 2 * x0
+    glottal_flow = target_flow()
+    return v / np.linalg.norm(v) * np.linalg.norm(glottal_flow) - glottal_flow
+
+
+def loss(params: np.ndarray) -> float:
+    dt = B / (params[1] * M) / float(SAMPLE_RATE)  # time_scaling / fs
+    sol = ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        params,
+        vdp_init_state,
+        0.0,
+        dt=dt,
+        dense=True,
+        num_tsteps=NUM_TSTEPS,
+        **TOLERANCES,
+    )
+    return 0.5 * np.sum(residual(sol) ** 2)
+
+
+def test_sensitivity_finite_differences():
+    for params in [np.array([0.8, 0.32, 0.4]), np.array([0.5, 0.2, 0.1])]:
+        dt = B / (params[1] * M) / float(SAMPLE_RATE)
+        sol, sens = sensitivity_solver(
+            vdp_coupled,
+            vdp_jacobian,
+            vdp_param_jacobian,
+            params,
+            vdp_init_state,
+            0.0,
+            dt=dt,
+            num_tsteps=NUM_TSTEPS,
+            **TOLERANCES,
+        )
+        assert sol.shape == (NUM_TSTEPS, 5) and sens.shape == (NUM_TSTEPS, 4, 3)
+        grad = sensitivity_gradient(
+            sol, sens, residual(sol), 1.0, x0, dlog_time_scaling=[0, -1 / params[1], 0]
+        )
+        eps = 1e-5
+        grad_fd = np.array(
+            [
+                (loss(params + eps * e) - loss(params - eps * e)) / (2 * eps)
+                for e in np.eye(3)
+            ]
+        )
+        np.testing.assert_allclose(grad, grad_fd, rtol=1e-4, atol=1e-7 * np.abs(grad_fd).max())
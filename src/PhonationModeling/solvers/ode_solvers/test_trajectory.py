@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+""" Trajectory outputs of the dense ode_solver: capacity, reuse across solves and memmap. """
+import os
+
+import numpy as np
+import pytest
+
+from PhonationModeling.models.vocal_fold.vocal_fold_model_displacement import (
+    vdp_coupled,
+    vdp_init_state,
+    vdp_jacobian,
+)
+from PhonationModeling.solvers.ode_solvers.ode_solver import ode_solver
+from PhonationModeling.solvers.ode_solvers.trajectory import Trajectory
+
+
+def solve(params, num_tsteps, out=None, solver="lsoda", dt=0.05):
+    return ode_solver(
+        vdp_coupled,
+        vdp_jacobian,
+        params,
+        vdp_init_state,
+        0.0,
+        solver=solver,
+        dt=dt,
+        dense=True,
+        num_tsteps=num_tsteps,
+        out=out,
+    )
+
+
+@pytest.mark.parametrize("solver", ["lsoda", "dopri5"])
+def test_trajectory_reuse(solver):
+    out = Trajectory(300, 4)
+    for params, num_tsteps, dt in [([0.8, 0.32, 0.4], 300, 0.05), ([0.5, 0.2, 0.1], 120, 0.1)]:
+        sol = solve(params, num_tsteps, out=out, solver=solver, dt=dt)
+        assert sol is out
+        assert len(out) == num_tsteps and out.capacity == 300
+        assert out.states.shape == (4, num_tsteps)
+        np.testing.assert_allclose(out.t, dt * np.arange(1, num_tsteps + 1))
+        reference = solve(params, num_tsteps, solver=solver, dt=dt)
+        np.testing.assert_array_equal(out.states.T, reference[:, 1:])
+        np.testing.assert_allclose(out.to_array()[:, 0], reference[:, 0], rtol=1e-14)
+
+
+def test_trajectory_capacity():
+    with pytest.raises(AssertionError):
+        solve([0.8, 0.32, 0.4], 301, out=Trajectory(300, 4))
+
+
+def test_trajectory_reset():
+    out = Trajectory(10, 2, t_start=1.0, dt=0.5)
+    assert len(out) == 0 and out.t.shape == (0,)
+    out.buffer[:] = np.arange(20).reshape(2, 10)
+    out.reset(2.0, 0.25, num_filled=4)
+    np.testing.assert_array_equal(out.t, [2.0, 2.25, 2.5, 2.75])
+    np.testing.assert_array_equal(out.states, [[0, 1, 2, 3], [10, 11, 12, 13]])
+    assert np.shares_memory(out.states[0::2], out.buffer)  # views, not copies
+
+
+def test_trajectory_memmap(tmp_path):
+    filename = str(tmp_path / "trajectory.dat")
+    out = Trajectory(200, 4, dtype=np.float32, filename=filename)
+    solve([0.8, 0.32, 0.4], 200, out=out)
+    reference = solve([0.8, 0.32, 0.4], 200)
+    assert out.states.dtype == np.float32
+    np.testing.assert_allclose(out.to_array(), reference, rtol=1e-6, atol=1e-6)
+    assert os.path.getsize(filename) == 200 * 4 * 4
+    out.release()
+    assert not os.path.exists(filename)
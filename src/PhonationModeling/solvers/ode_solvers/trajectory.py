@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class Trajectory(object):
+    """ Preallocated solution container of the ODE/DAE solvers.
+    States are stored struct-of-arrays, one contiguous row per state, so slices of states
+    (e.g. X = states[0::2] and dX = states[1::2] of the displacement model) are views instead
+    of fancy-index copies. Time is implicit, t_start + dt * k, k = 0, ..., len - 1. The buffer
+    may be float32 and backed by a np.memmap file, and is reused across solves.
+
+    Args:
+        num_tsteps: int
+            Capacity in time steps.
+        num_states: int
+            Number of states.
+        t_start: float
+            Time of the first step.
+        dt: float
+            Time step increment.
+        dtype: np.dtype
+            Storage data type, e.g. np.float32 to halve the memory.
+        filename: str
+            If given, the states are backed by a np.memmap of this file.
+    """
+
+    def __init__(
+        self,
+        num_tsteps: int,
+        num_states: int,
+        t_start: float = 0.0,
+        dt: float = 1.0,
+        dtype: np.dtype = np.float64,
+        filename: Optional[str] = None,
+    ):
+        shape = (num_states, num_tsteps)
+        if filename is not None:
+            self._buffer = np.memmap(filename, dtype=dtype, mode="w+", shape=shape)
+        else:
+            self._buffer = np.empty(shape, dtype=dtype)
+        self.filename = filename
+        self.reset(t_start, dt)
+
+    def reset(self, t_start: float, dt: float, num_filled: int = 0):
+        """ Set the time axis and the number of filled steps for a new solve. """
+        self.t_start = t_start
+        self.dt = dt
+        self.num_filled = num_filled
+
+    def __len__(self) -> int:
+        return self.num_filled
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.shape[1]
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """ Full preallocated states buffer, shape (num_states, capacity). """
+        return self._buffer
+
+    @property
+    def states(self) -> np.ndarray:
+        """ Filled states, shape (num_states, len). """
+        return self._buffer[:, : self.num_filled]
+
+    @property
+    def t(self) -> np.ndarray:
+        """ Times of the filled steps, shape (len,). """
+        return self.t_start + self.dt * np.arange(self.num_filled)
+
+    def to_array(self) -> np.ndarray:
+        """ Copy in the legacy ode_solver layout [time, model states], shape (len, 1 + num_states),
+        float64.
+        """
+        sol = np.empty((self.num_filled, 1 + self._buffer.shape[0]))
+        sol[:, 0] = self.t
+        sol[:, 1:] = self.states.T
+        return sol
+
+    def release(self):
+        """ Drop the buffer and remove the memmap file, if any. """
+        self._buffer = None
+        if self.filename is not None and os.path.isfile(self.filename):
+            os.remove(self.filename)
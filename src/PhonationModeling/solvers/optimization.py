@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from typing import List, Optional, Tuple
+
 import numpy as np
 
 
@@ -72,3 +74,274 @@ def optim_adapt_step(alpha, beta, delta, d_alpha, d_beta, d_delta, default_step=
         delta = delta - stepsize * d_delta
 
     return alpha, beta, delta
+
+
+OPTIMIZERS = ["patience", "lbfgsb"]
+
+
+class Optimizer(object):
+    """ Ask/tell interface of the parameter optimizers. The caller evaluates the loss at the
+    asked parameters, and the gradient only if needs_gradient, so that rejected trial points
+    cost one forward solve.
+    """
+
+    def ask(self) -> np.ndarray:
+        """ Parameters to evaluate next. """
+        raise NotImplementedError
+
+    def needs_gradient(self, loss: float) -> bool:
+        """ Whether tell needs the gradient at the asked parameters, given their loss. """
+        raise NotImplementedError
+
+    def tell(self, loss: float, grad: Optional[np.ndarray] = None):
+        """ Report the loss (and gradient) at the asked parameters. """
+        raise NotImplementedError
+
+    @property
+    def done(self) -> bool:
+        raise NotImplementedError
+
+
+class ProjectedLBFGS(Optimizer):
+    """ Bounded limited-memory BFGS. The search direction is the two-loop L-BFGS direction
+    restricted to the free variables (not at a bound with the gradient pointing outward), the
+    step is projected onto the bounds and accepted by Armijo backtracking on the loss only.
+
+    Args:
+        x0: np.ndarray[float], shape (P,)
+            Initial parameters.
+        lower: np.ndarray[float], shape (P,)
+            Lower bounds.
+        upper: np.ndarray[float], shape (P,)
+            Upper bounds.
+        memory: int
+            Number of stored correction pairs.
+        initial_step: float
+            Max-norm of the first step, before curvature is known.
+        c1: float
+            Armijo sufficient decrease constant.
+        max_backtracks: int
+            Number of step halvings before the memory is reset.
+        gtol: float
+            Stop if the max-norm of the projected gradient is below gtol.
+        ftol: float
+            Stop if the relative decrease of the loss is below ftol.
+    """
+
+    def __init__(
+        self,
+        x0: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        memory: int = 10,
+        initial_step: float = 0.1,
+        c1: float = 1e-4,
+        max_backtracks: int = 10,
+        gtol: float = 1e-6,
+        ftol: float = 1e-10,
+    ):
+        self.lower = np.broadcast_to(np.asarray(lower, dtype=float), np.shape(x0))
+        self.upper = np.broadcast_to(np.asarray(upper, dtype=float), np.shape(x0))
+        self.memory = memory
+        self.initial_step = initial_step
+        self.c1 = c1
+        self.max_backtracks = max_backtracks
+        self.gtol = gtol
+        self.ftol = ftol
+
+        self.x = None  # accepted parameters
+        self.f = None  # loss at x
+        self.g = None  # gradient at x
+        self.S = []  # parameter corrections
+        self.Y = []  # gradient corrections
+        self.d = None  # search direction
+        self.t = 1.0  # step length
+        self.num_backtracks = 0
+        self.x_trial = self.project(np.asarray(x0, dtype=float))
+        self._done = False
+
+    def project(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(x, self.lower, self.upper)
+
+    def projected_gradient(self, x: np.ndarray, g: np.ndarray) -> np.ndarray:
+        return self.project(x - g) - x
+
+    def ask(self) -> np.ndarray:
+        return self.x_trial.copy()
+
+    def needs_gradient(self, loss: float) -> bool:
+        if self.x is None:  # initial point
+            return True
+        return self._accepted(loss)
+
+    def tell(self, loss: float, grad: Optional[np.ndarray] = None):
+        if self.x is None:
+            self.x, self.f, self.g = self.x_trial, loss, np.asarray(grad, dtype=float)
+            self._next_direction()
+            return
+
+        if self._accepted(loss):
+            grad = np.asarray(grad, dtype=float)
+            s = self.x_trial - self.x
+            y = grad - self.g
+            if np.dot(s, y) > 1e-10 * np.dot(y, y):  # keep positive curvature pairs only
+                self.S.append(s)
+                self.Y.append(y)
+                if len(self.S) > self.memory:
+                    self.S.pop(0)
+                    self.Y.pop(0)
+            f_prev = self.f
+            self.x, self.f, self.g = self.x_trial, loss, grad
+            if (f_prev - loss) <= self.ftol * max(abs(f_prev), abs(loss), 1.0):
+                self._done = True
+                return
+            self._next_direction()
+        else:  # backtrack
+            self.num_backtracks += 1
+            if self.num_backtracks > self.max_backtracks:
+                if not self.S:  # steepest descent failed
+                    self._done = True
+                    return
+                self.S, self.Y = [], []  # restart from steepest descent
+                self._next_direction()
+                return
+            self.t *= 0.5
+            self.x_trial = self.project(self.x + self.t * self.d)
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def _accepted(self, loss: float) -> bool:
+        """ Armijo condition along the projected path. """
+        return loss <= self.f + self.c1 * np.dot(self.g, self.x_trial - self.x)
+
+    def _next_direction(self):
+        x, g = self.x, self.g
+        if np.max(np.abs(self.projected_gradient(x, g))) < self.gtol:
+            self._done = True
+            return
+        free = ~(((x <= self.lower) & (g > 0)) | ((x >= self.upper) & (g < 0)))
+        q = np.where(free, g, 0.0)
+
+        # Two-loop recursion in the subspace of the free variables
+        pairs = [
+            (s * free, y * free)
+            for s, y in zip(self.S, self.Y)
+            if np.dot(s * free, y * free) > 1e-10 * np.dot(y * free, y * free)
+        ]
+        rho = [1.0 / np.dot(y, s) for s, y in pairs]
+        a = []
+        for (s, y), r in reversed(list(zip(pairs, rho))):
+            a.append(r * np.dot(s, q))
+            q = q - a[-1] * y
+        if pairs:
+            s, y = pairs[-1]
+            q = q * np.dot(s, y) / np.dot(y, y)
+        else:  # first step of max-norm initial_step
+            q = q * self.initial_step / np.max(np.abs(q))
+        for (s, y), r, a_i in zip(pairs, rho, reversed(a)):
+            q = q + s * (a_i - r * np.dot(y, q))
+        d = -np.where(free, q, 0.0)
+
+        if np.dot(d, g) >= 0:  # not a descent direction, reset to steepest descent
+            self.S, self.Y = [], []
+            d = -np.where(free, g, 0.0)
+            d = d * self.initial_step / np.max(np.abs(d))
+        self.d = d
+        self.t = 1.0
+        self.num_backtracks = 0
+        self.x_trial = self.project(x + d)
+
+
+class BacktrackingLineSearch(object):
+    """ Armijo backtracking step control. A trial step of length t along a direction with slope
+    g^T d from a point of loss f is accepted if its loss <= f + c1 * t * min(g^T d, 0), else
+    the step is shrunk. Trials only need the loss, the gradient is needed at accepted points.
+
+    Args:
+        step_size: float
+            Initial step length along a new direction.
+        c1: float
+            Armijo sufficient decrease constant.
+        shrink: float
+            Step length factor of a backtrack.
+        max_backtracks: int
+            Number of backtracks along a direction.
+    """
+
+    def __init__(
+        self, step_size: float, c1: float = 1e-4, shrink: float = 0.5, max_backtracks: int = 4
+    ):
+        self.step_size = step_size
+        self.c1 = c1
+        self.shrink = shrink
+        self.max_backtracks = max_backtracks
+        self.f = np.inf  # accept any finite loss before the first point
+        self.slope = 0.0
+        self.t = step_size
+        self.num_backtracks = 0
+
+    def start(self, f: float, slope: float = 0.0) -> float:
+        """ Start along a new direction from a point of loss f, with directional derivative
+        slope (0 if unknown, e.g. normalized gradients). Returns the step length.
+        """
+        self.f = f
+        self.slope = min(slope, 0.0)
+        self.t = self.step_size
+        self.num_backtracks = 0
+        return self.t
+
+    def accept(self, f_trial: float) -> bool:
+        """ Armijo sufficient decrease of the trial loss. """
+        return f_trial <= self.f + self.c1 * self.t * self.slope
+
+    def backtrack(self) -> Optional[float]:
+        """ Shrink the step. Returns the step length, None if the backtracks are exhausted. """
+        if self.num_backtracks >= self.max_backtracks:
+            return None
+        self.num_backtracks += 1
+        self.t *= self.shrink
+        return self.t
+
+
+TOLERANCE_SCHEDULES = ["fixed", "adaptive"]
+
+
+class ToleranceSchedule(object):
+    """ Scale of the solver tolerances by the progress of the optimizer. Far from convergence
+    the solves only need to resolve the descent direction, so the base tolerances are loosened
+    by a scale proportional to the mean relative improvement per iteration of the best loss
+    over the last window iterations, clipped to [1, max_scale]. The scale is kept until the
+    history covers a full window, so that a single non-improving early iteration does not
+    tighten it. The scale reaches 1, the base tolerances, when the improvement per iteration
+    shrinks to target_rtol, and never loosens again.
+
+    Args:
+        max_scale: float
+            Initial and largest scale. 1: fixed base tolerances.
+        target_rtol: float
+            Relative improvement per iteration at which the base tolerances are used.
+        window: int
+            Number of iterations over which the improvement is averaged.
+    """
+
+    def __init__(self, max_scale: float = 100.0, target_rtol: float = 1e-3, window: int = 5):
+        self.max_scale = max_scale
+        self.target_rtol = target_rtol
+        self.window = window
+        self.scale = max(max_scale, 1.0)
+
+    def update(self, history: List[float]) -> float:
+        """ Update the scale from the best loss (or residual) after each iteration. Returns
+        the scale.
+        """
+        if len(history) > self.window and self.scale > 1.0:
+            k = self.window
+            improvement = (history[-k - 1] - history[-1]) / max(history[-k - 1], 1e-300) / k
+            self.scale = min(self.scale, max(1.0, improvement / self.target_rtol))
+        return self.scale
+
+    def tolerances(self, atol: float, rtol: float) -> Tuple[float, float]:
+        """ Scaled absolute and relative tolerances. """
+        return atol * self.scale, rtol * self.scale
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+""" Optimizer, line search and tolerance schedule on synthetic problems. """
+import numpy as np
+
+from PhonationModeling.solvers.optimization import (
+    BacktrackingLineSearch,
+    ProjectedLBFGS,
+    ToleranceSchedule,
+)
+
+# Bounded quadratic 0.5 * (x - c)^T H (x - c) with coupled parameters
+H = np.array([[3.0, 1.0, 0.5], [1.0, 2.0, 0.3], [0.5, 0.3, 1.0]])
+LOWER, UPPER = np.zeros(3), np.ones(3)
+
+
+def quadratic(x: np.ndarray, c: np.ndarray):
+    return 0.5 * (x - c) @ H @ (x - c), H @ (x - c)
+
+
+def run_lbfgs(optimizer: ProjectedLBFGS, c: np.ndarray, max_evaluations: int = 200):
+    """ Ask/tell loop, the gradient only at accepted points. Returns the asked points. """
+    points = []
+    while not optimizer.done and len(points) < max_evaluations:
+        x = optimizer.ask()
+        points.append(x)
+        f, g = quadratic(x, c)
+        optimizer.tell(f, g if optimizer.needs_gradient(f) else None)
+    assert optimizer.done
+    return np.array(points)
+
+
+def test_lbfgs_unconstrained():
+    c = np.array([0.3, 0.6, 0.4])
+    optimizer = ProjectedLBFGS(np.array([0.9, 0.1, 0.9]), LOWER, UPPER)
+    run_lbfgs(optimizer, c)
+    np.testing.assert_allclose(optimizer.x, c, atol=1e-5)
+
+
+def test_lbfgs_projected():
+    """ Converges to the projected minimizer, with all the iterates within the bounds, when
+    the unconstrained optimum lies outside them.
+    """
+    c = np.array([1.5, -0.5, 0.3])
+    optimizer = ProjectedLBFGS(np.array([2.0, 0.5, -1.0]), LOWER, UPPER)  # projected x0
+    points = run_lbfgs(optimizer, c)
+    assert np.all(points >= LOWER) and np.all(points <= UPPER)
+    # x_0, x_1 at their bounds, x_2 minimizes the quadratic on the face: (H (x - c))_2 = 0
+    expected = np.array([1.0, 0.0, 0.3 - 0.5 * (1.0 - 1.5) - 0.3 * (0.0 + 0.5)])
+    g = quadratic(expected, c)[1]
+    assert g[0] < 0 < g[1]  # pointing outward, KKT point
+    np.testing.assert_allclose(optimizer.x, expected, atol=1e-5)
+
+
+def test_line_search_armijo():
+    """ The step is halved until the trial loss satisfies Armijo sufficient decrease. """
+    line_search = BacktrackingLineSearch(4.0, c1=0.1)
+    x, d = 1.0, -1.0  # f = x^2, unit steepest descent direction, slope -2
+    t = line_search.start(x ** 2, slope=2 * x * d)
+    steps = [t]
+    while not line_search.accept((x + t * d) ** 2):
+        t = line_search.backtrack()
+        steps.append(t)
+    assert steps == [4.0, 2.0, 1.0]  # f = 9, then 1 > 1 - 0.1 * 2 * 2, then 0
+    assert (x + t * d) ** 2 <= x ** 2 + 0.1 * t * (2 * x * d)
+
+    # A new direction restarts at the initial step
+    assert line_search.start(0.5, slope=-1.0) == 4.0 and line_search.num_backtracks == 0
+
+
+def test_line_search_exhausted():
+    line_search = BacktrackingLineSearch(1.0, max_backtracks=2)
+    line_search.start(1.0, slope=-1.0)
+    assert not line_search.accept(1.0)  # no sufficient decrease
+    assert [line_search.backtrack() for _ in range(3)] == [0.5, 0.25, None]
+
+
+def test_line_search_unknown_slope():
+    """ With an unknown (or ascent) slope, any decrease is accepted. """
+    line_search = BacktrackingLineSearch(1.0)
+    assert line_search.accept(1e16)  # before the first point
+    line_search.start(1.0, slope=3.0)
+    assert line_search.accept(1.0 - 1e-12) and not line_search.accept(1.0 + 1e-12)
+
+
+def test_tolerance_schedule():
+    """ The scale is kept until the history covers a window, then follows the mean relative
+    improvement over the window, and never loosens again.
+    """
+    schedule = ToleranceSchedule(max_scale=100.0, target_rtol=1e-3, window=3)
+    history = [1.0, 1.0, 0.9, 0.8, 0.79, 0.789, 0.7889, 0.7889, 0.5]
+    scales = [schedule.update(history[: k + 1]) for k in range(len(history))]
+    np.testing.assert_allclose(
+        scales,
+        [
+            100.0,
+            100.0,  # a non-improving first iteration does not tighten
+            100.0,
+            (1.0 - 0.8) / 3 / 1e-3,
+            (1.0 - 0.8) / 3 / 1e-3,  # not loosened
+            (0.9 - 0.789) / 0.9 / 3 / 1e-3,
+            (0.8 - 0.7889) / 0.8 / 3 / 1e-3,
+            1.0,  # clipped at the base tolerances
+            1.0,
+        ],
+    )
+    assert schedule.tolerances(1e-12, 1e-6) == (1e-12, 1e-6)
+
+
+def test_tolerance_schedule_fixed():
+    schedule = ToleranceSchedule(max_scale=1.0)
+    assert schedule.update([1.0, 0.5, 0.1, 0.01]) == 1.0
@@ -17,7 +17,8 @@ setup(
     scripts=[],
     entry_points={
         "console_scripts": [
-            "vocal_fold_estimate = PhonationModeling.main_scripts.vocal_fold_estimate",
+            "vocal_fold_estimate = PhonationModeling.main_scripts.vocal_fold_estimate:main",
+            "run_e2e = PhonationModeling.main_scripts.run_e2e:main",
             "vocal_tract_estimate = PhonationModeling.main_scripts.vocal_tract_estimate",
         ]
     },